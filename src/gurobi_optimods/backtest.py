@@ -0,0 +1,172 @@
+"""
+Rolling-Window Backtest
+-----------------------
+"""
+
+import gurobipy as gp
+import numpy as np
+import pandas as pd
+from gurobipy import GRB
+
+from gurobi_optimods.portfolio import (
+    MeanVariancePortfolio,
+    RebalancingSession,
+    _change_coeffs,
+)
+from gurobi_optimods.sharpe_ratio import _sharpe_ratio_result
+from gurobi_optimods.utils import optimod
+
+
+@optimod()
+def rolling_backtest(
+    returns, window, step=1, gamma=None, rf_rate=0, *, create_env, **kwargs
+):
+    """Compute portfolios for a rolling window of historic returns
+
+    For each window of ``window`` consecutive periods, the expected returns
+    :math:`\\mu` and covariance matrix :math:`\\Sigma` are estimated as the
+    sample mean and covariance of the returns in the window.  The estimates
+    are updated from those of the previous window by adding the new periods
+    and removing the old ones.  The window moves ``step`` periods at a time.
+
+    If ``gamma`` is given, each window gets an efficient mean-variance
+    portfolio (see :meth:`MeanVariancePortfolio.efficient_portfolio
+    <gurobi_optimods.portfolio.MeanVariancePortfolio.efficient_portfolio>`).
+    Otherwise each window gets the portfolio that maximizes the Sharpe ratio
+    (see :func:`~gurobi_optimods.sharpe_ratio.max_sharpe_ratio`).  In both
+    cases one model is kept for all windows, and each solve starts from the
+    solution of the previous window.
+
+    Portfolios are computed while iterating over the result, so that they
+    can be processed as soon as they are available::
+
+        for date, portfolio in rolling_backtest(returns, 250, step=5, gamma=10):
+            ...
+
+    Logging and solver settings (``verbose``, ``logfile``, ...) apply until
+    the iteration ends.  Invalid arguments are reported when the iteration
+    starts.
+
+    Parameters
+    ----------
+    returns : DataFrame
+        Returns of each asset (columns) in each period (rows)
+    window : int >= 2
+        Number of periods in each window
+    step : int >= 1, optional
+        Number of periods between windows (defaults to ``1``)
+    gamma : float >= 0, optional
+        Risk aversion coefficient for efficient mean-variance portfolios
+    rf_rate : float >= 0, optional
+        Risk-free rate of return for maximum Sharpe ratio portfolios
+        (defaults to ``0``)
+    **kwargs
+        Portfolio features (``max_trades``, ``fees_buy``, ...) for efficient
+        mean-variance portfolios.  If ``initial_holdings`` is given, each
+        later window starts from the portfolio of the previous window.
+
+    Returns
+    -------
+    portfolios : iterator of (label, result)
+        The index label of the last period of each window, and a
+        :class:`~gurobi_optimods.portfolio.PortfolioResult` or
+        :class:`~gurobi_optimods.sharpe_ratio.SharpeRatioResult` for the
+        portfolio computed for this window.  The result is ``None`` if no
+        portfolio was found.
+    """
+    if not isinstance(returns, pd.DataFrame):
+        raise TypeError(f"Unknown returns type: {type(returns)}")
+    if window < 2 or window > len(returns.index):
+        raise ValueError(
+            f"window must be between 2 and the number of periods, not {window}"
+        )
+    if step < 1:
+        raise ValueError(f"step must be positive, not {step}")
+    if gamma is None and kwargs:
+        raise TypeError("Portfolio features require gamma")
+
+    moments = _rolling_moments(returns.to_numpy(dtype=float), window, step)
+    if gamma is not None:
+        yield from _efficient_portfolios(returns, moments, gamma, kwargs, create_env)
+    else:
+        yield from _sharpe_ratio_portfolios(returns, moments, rf_rate, create_env)
+
+
+def _rolling_moments(values, window, step):
+    # Yield the sample mean and covariance of each window. Running sums of the
+    # returns and of their outer products are updated between windows. The
+    # returns are shifted by the mean of the first window, which keeps the
+    # running sums small and the covariance accurate.
+    shift = values[:window].mean(axis=0)
+    values = values - shift
+    first = values[:window]
+    sums = first.sum(axis=0)
+    products = first.T @ first
+    for end in range(window, values.shape[0] + 1, step):
+        if end > window:
+            added = values[max(end - step, end - window) : end]
+            removed = values[end - step - window : min(end - window, end - step)]
+            sums += added.sum(axis=0) - removed.sum(axis=0)
+            products += added.T @ added - removed.T @ removed
+        mu = sums / window
+        cov_matrix = (products - np.outer(sums, mu)) / (window - 1)
+        yield end, mu + shift, cov_matrix
+
+
+def _efficient_portfolios(returns, moments, gamma, kwargs, create_env):
+    assets = returns.columns
+    roll_holdings = kwargs.get("initial_holdings") is not None
+    session = None
+    try:
+        for end, mu, cov_matrix in moments:
+            mu = pd.Series(mu, index=assets)
+            if session is None:
+                portfolio = MeanVariancePortfolio(
+                    mu, pd.DataFrame(cov_matrix, index=assets, columns=assets)
+                )
+                session = RebalancingSession(
+                    portfolio, gamma, portfolio._features(**kwargs), create_env()
+                )
+                result = session.rebalance()
+            else:
+                update = dict(mu=mu, cov_matrix=cov_matrix)
+                if roll_holdings and result is not None:
+                    update["initial_holdings"] = _holdings(result.x)
+                result = session.rebalance(**update)
+            yield returns.index[end - 1], result
+    finally:
+        if session is not None:
+            session.close()
+
+
+def _holdings(x):
+    # A portfolio may sum to slightly more than 1 within the solver
+    # tolerances; scale it down before it is rebalanced
+    total = x.sum()
+    return x / total if total > 1.0 else x
+
+
+def _sharpe_ratio_portfolios(returns, moments, rf_rate, create_env):
+    # Model (3) of max_sharpe_ratio, whose excess returns and objective are
+    # replaced for each window
+    n = returns.shape[1]
+    excess = np.zeros(n)
+    with create_env() as env, gp.Model("rolling_sharpe_ratio", env=env) as model:
+        y = model.addMVar(n, name="y")
+        scaled_return = model.addConstr(excess @ y == 1)
+        for end, mu, cov_matrix in moments:
+            date = returns.index[end - 1]
+            if (mu <= rf_rate).all():
+                # Only the risk-free asset has a positive excess return
+                yield date, None
+                continue
+            _change_coeffs(model, scaled_return, y, excess, mu - rf_rate)
+            excess = mu - rf_rate
+            model.setObjective(y @ cov_matrix @ y, sense=GRB.MINIMIZE)
+            model.optimize()
+            if model.Status != GRB.OPTIMAL:
+                yield date, None
+                continue
+            result = _sharpe_ratio_result(y.X, cov_matrix, mu, rf_rate)
+            result.x = pd.Series(result.x, index=returns.columns)
+            yield date, result
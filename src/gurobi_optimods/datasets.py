@@ -3,7 +3,10 @@ Module for loading datasets for use in optimods examples, in the same vein
 as sklearn.datasets.
 """
 
+import math
 import pathlib
+import struct
+import zipfile
 
 import numpy as np
 import pandas as pd
@@ -152,8 +155,15 @@ def _convert_pandas_to_scipy(
 
 def load_sharpe_ratio():
     data = pd.read_csv(DATA_FILE_DIR / "sharpe-ratio/log-returns.csv", index_col=0)
-    # Annualize covariance-variance matrix and expected returns
-    return AttrDict(cov_matrix=data.cov() * len(data.index), mu=data.sum())
+    # Annualize covariance-variance matrix and expected returns. The
+    # returns are centred and scaled such that returns.T @ returns / T
+    # equals cov_matrix.
+    T = len(data.index)
+    return AttrDict(
+        cov_matrix=data.cov() * T,
+        mu=data.sum(),
+        returns=(data - data.mean()) * (T / math.sqrt(T - 1)),
+    )
 
 
 def load_opf_example(case):
@@ -185,3 +195,175 @@ def load_opf_extra(extra):
             return row["bus_i"], (row["Vm"], row["Va"])
 
     return dict(mapper(record) for record in data.to_dict("records"))
+
+
+def load_qubo(path, format=None):
+    """Load a QUBO coefficient matrix from a file.
+
+    Three formats are supported:
+
+    - ``"coo"``: a text file with one ``i j q`` triplet per line, where ``i``
+      and ``j`` are zero-based variable indices. Lines starting with ``#``
+      are ignored.
+    - ``"npz"``: a file written by :func:`scipy.sparse.save_npz`, or by
+      :func:`numpy.savez` with ``row``, ``col`` and ``data`` arrays (and
+      optionally ``shape``). Arrays stored without compression are memory
+      mapped rather than read into memory.
+    - ``"qbsolv"``: the qbsolv format, with ``c`` comment lines, a ``p qubo 0
+      maxNodes nNodes nCouplers`` header line and ``i j q`` triplets.
+
+    By default the format is chosen by the file extension: ``.npz`` and
+    ``.qubo`` files are read as npz and qbsolv files respectively, and any
+    other file as coo triplets. Entries with the same indices are added
+    together, and ``(i, j)`` and ``(j, i)`` entries both contribute to the
+    coefficient of :math:`x_i x_j`.
+
+    Parameters
+    ----------
+    path : str or Path
+        Path to the file
+    format : str, optional
+        One of ``"coo"``, ``"npz"`` or ``"qbsolv"``
+
+    Returns
+    -------
+    coo_array
+        Coefficient matrix, which can be passed directly to
+        :func:`~gurobi_optimods.qubo.solve_qubo`
+    """
+    rows, cols, data, shape = _read_triplets(path, format)
+    return sp.coo_array((data, (rows, cols)), shape=shape)
+
+
+def load_ising(path, format=None):
+    """Load an Ising model from a file and convert it to a QUBO.
+
+    The file lists triplets ``i j J`` in any of the formats supported by
+    :func:`load_qubo`. Triplets with ``i == j`` give the field :math:`h_i`,
+    all others give a coupling :math:`J_{ij}`. The energy of a spin vector
+    :math:`s \\in \\{-1, 1\\}^n` is :math:`\\sum_i h_i s_i + \\sum_{ij} J_{ij}
+    s_i s_j`. Substituting :math:`s = 2x - 1` gives an equivalent QUBO in
+    binary variables :math:`x`, with a constant offset.
+
+    Parameters
+    ----------
+    path : str or Path
+        Path to the file
+    format : str, optional
+        One of ``"coo"``, ``"npz"`` or ``"qbsolv"``
+
+    Returns
+    -------
+    coeff_matrix : coo_array
+        Coefficient matrix of the QUBO
+    offset : float
+        Constant to add to the QUBO objective value to get the energy of the
+        spin vector :math:`s = 2x - 1`
+    """
+    rows, cols, data, shape = _read_triplets(path, format)
+    field = rows == cols
+    coupling = np.asarray(data[~field], dtype=float)
+    i, j = rows[~field], cols[~field]
+    linear = 2 * np.bincount(rows[field], weights=data[field], minlength=shape[0])
+    linear -= 2 * np.bincount(i, weights=coupling, minlength=shape[0])
+    linear -= 2 * np.bincount(j, weights=coupling, minlength=shape[0])
+    offset = coupling.sum() - data[field].sum()
+    diagonal = np.flatnonzero(linear)
+    coeff_matrix = sp.coo_array(
+        (
+            np.concatenate([4 * coupling, linear[diagonal]]),
+            (np.concatenate([i, diagonal]), np.concatenate([j, diagonal])),
+        ),
+        shape=shape,
+    )
+    return coeff_matrix, float(offset)
+
+
+def _read_triplets(path, format):
+    """Read (row, col, data) arrays and the matrix shape from a QUBO or Ising
+    file"""
+    path = pathlib.Path(path)
+    if format is None:
+        format = {".npz": "npz", ".qubo": "qbsolv"}.get(path.suffix, "coo")
+
+    if format == "npz":
+        arrays = _load_npz(path)
+        if "indptr" in arrays:
+            # csr/csc matrix saved by scipy.sparse.save_npz
+            matrix_format = arrays["format"].item()
+            if isinstance(matrix_format, bytes):
+                matrix_format = matrix_format.decode()
+            matrix = getattr(sp, f"{matrix_format}_array")(
+                (arrays["data"], arrays["indices"], arrays["indptr"]),
+                shape=tuple(int(n) for n in arrays["shape"]),
+            ).tocoo()
+            return matrix.row, matrix.col, matrix.data, matrix.shape
+        rows, cols, data = arrays["row"], arrays["col"], arrays["data"]
+        if "shape" in arrays:
+            return rows, cols, data, tuple(int(n) for n in arrays["shape"])
+        return rows, cols, data, _triplet_shape(rows, cols)
+
+    if format == "coo":
+        rows, cols, data = _read_text_triplets(path, comment="#")
+        return rows, cols, data, _triplet_shape(rows, cols)
+
+    if format == "qbsolv":
+        with open(path) as f:
+            for line in f:
+                if line.startswith("p"):
+                    max_nodes = int(line.split()[3])
+                    break
+            else:
+                raise ValueError("qbsolv file has no 'p' header line")
+            # The remaining lines are read straight from the open file
+            rows, cols, data = _read_text_triplets(f, comment="c")
+        return rows, cols, data, (max_nodes, max_nodes)
+
+    raise ValueError(f"Unknown QUBO file format '{format}'")
+
+
+def _read_text_triplets(fname, comment):
+    triplets = np.loadtxt(
+        fname,
+        dtype=[("i", np.int64), ("j", np.int64), ("q", np.float64)],
+        comments=comment,
+        ndmin=1,
+    )
+    return triplets["i"], triplets["j"], triplets["q"]
+
+
+def _triplet_shape(rows, cols):
+    n = int(max(rows.max(), cols.max())) + 1 if len(rows) else 0
+    return (n, n)
+
+
+def _load_npz(path):
+    """Load the arrays in an npz file. Arrays which are stored uncompressed
+    are memory mapped in place; others are read into memory."""
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            name = info.filename[: -len(".npy")]
+            if info.compress_type == zipfile.ZIP_STORED:
+                # Skip the local file header to reach the .npy data
+                f.seek(info.header_offset + 26)
+                name_length, extra_length = struct.unpack("<HH", f.read(4))
+                f.seek(name_length + extra_length, 1)
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+                if shape and not dtype.hasobject:
+                    arrays[name] = np.memmap(
+                        path,
+                        dtype=dtype,
+                        mode="r",
+                        offset=f.tell(),
+                        shape=shape,
+                        order="F" if fortran_order else "C",
+                    )
+                    continue
+            with archive.open(info) as member:
+                arrays[name] = np.lib.format.read_array(member)
+    return arrays
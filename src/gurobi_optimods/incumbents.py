@@ -0,0 +1,245 @@
+"""
+Incumbent Streaming
+-------------------
+"""
+
+import concurrent.futures
+import math
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from gurobipy import GRB
+
+
+@dataclass
+class Incumbent:
+    """
+    A solution found while a Mod is running.
+
+    Attributes
+    ----------
+    solution : Any
+        The solution, in the same format as in the result of the Mod
+    objective : float
+        The objective value of the solution
+    bound : float
+        The best bound on the objective value known when the solution was found
+    time : float
+        Seconds since the Mod started
+    """
+
+    solution: Any
+    objective: float
+    bound: float
+    time: float
+
+
+class IncumbentReporter:
+    """Passes improving solutions found by a Mod to an ``on_incumbent``
+    subscriber.
+
+    The subscriber is called with an Incumbent for each solution which
+    improves on the last one reported. The Mod is asked to stop if the
+    subscriber returns True, or as soon as the subscriber has a ``stopped``
+    attribute which is True. Reports from several threads are serialized.
+    A reporter without a subscriber does nothing.
+    """
+
+    def __init__(self, on_incumbent=None, sense=GRB.MINIMIZE):
+        self.on_incumbent = on_incumbent
+        self.sense = sense
+        self.start_time = time.monotonic()
+        self.best = math.inf * sense
+        self._stopped = False
+        self._lock = threading.Lock()
+
+    @property
+    def stopped(self):
+        return self._stopped or bool(getattr(self.on_incumbent, "stopped", False))
+
+    def report(self, solution, objective, bound):
+        """Report a solution, if it improves on the last one. Returns whether
+        the Mod should stop."""
+        with self._lock:
+            if self.on_incumbent is None or self.stopped:
+                return self.stopped
+            if self.sense * objective >= self.sense * self.best:
+                return False
+            self.best = objective
+            incumbent = Incumbent(
+                solution=solution,
+                objective=objective,
+                bound=bound,
+                time=time.monotonic() - self.start_time,
+            )
+            if self.on_incumbent(incumbent):
+                self._stopped = True
+            return self.stopped
+
+    def callback(self, get_incumbent, callback=None):
+        """Return a Gurobi callback which reports new MIP solutions.
+
+        get_incumbent(model, objective, bound) is called from the MIPSOL
+        callback with the objective value and bound reported by Gurobi, and
+        should return the Mod's solution with its objective value and bound.
+        The model is terminated when the subscriber asks to stop. Any other
+        callback is called first. Returns the other callback (which may be
+        None) if there is no subscriber.
+        """
+        if self.on_incumbent is None:
+            return callback
+
+        def incumbent_callback(model, where):
+            if callback is not None:
+                callback(model, where)
+            if where == GRB.Callback.MIPSOL:
+                solution, objective, bound = get_incumbent(
+                    model,
+                    model.cbGet(GRB.Callback.MIPSOL_OBJ),
+                    model.cbGet(GRB.Callback.MIPSOL_OBJBND),
+                )
+                if self.report(solution, objective, bound):
+                    model.terminate()
+            elif self.stopped:
+                model.terminate()
+
+        return incumbent_callback
+
+
+class IncumbentStream:
+    """
+    Run a Mod in a background thread and iterate over the solutions it finds.
+
+    The Mod must accept an ``on_incumbent`` keyword argument. Iterating over
+    the stream yields :class:`Incumbent` objects while the Mod is running,
+    and ends when the Mod returns. Call :meth:`stop` to interrupt the Mod,
+    for example when the solutions stop improving. The Mod's result is then
+    available as :attr:`result`::
+
+        stream = IncumbentStream(solve_qubo, Q, time_limit=60)
+        for incumbent in stream:
+            if incumbent.objective - incumbent.bound < 1.0:
+                stream.stop()
+        result = stream.result
+
+    Parameters
+    ----------
+    mod : callable
+        The Mod to run
+    *args, **kwargs
+        Arguments passed to the Mod
+    """
+
+    _done = object()
+
+    def __init__(self, mod, *args, **kwargs):
+        self._queue = queue.Queue()
+        self._stop_event = threading.Event()
+        self._result = None
+        self._error = None
+        self._thread = threading.Thread(
+            target=self._run, args=(mod, args, kwargs), daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, mod, args, kwargs):
+        try:
+            self._result = mod(*args, on_incumbent=self, **kwargs)
+        except BaseException as error:
+            self._error = error
+        finally:
+            self._queue.put(self._done)
+
+    def __call__(self, incumbent):
+        self._queue.put(incumbent)
+        return self.stopped
+
+    def __iter__(self):
+        while True:
+            incumbent = self._queue.get()
+            if incumbent is self._done:
+                return
+            yield incumbent
+
+    @property
+    def stopped(self):
+        """Whether :meth:`stop` has been called"""
+        return self._stop_event.is_set()
+
+    def stop(self):
+        """Ask the Mod to stop and return the best solution found so far"""
+        self._stop_event.set()
+
+    @property
+    def result(self):
+        """The result returned by the Mod. Waits for the Mod to finish, and
+        raises any exception raised by the Mod."""
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+def _solve_components(
+    states,
+    open_components,
+    solve,
+    update,
+    assemble,
+    reporter,
+    create_env,
+    deadline,
+    workers=1,
+    callback=None,
+    env_params=None,
+):
+    """Solve the independent components of a Mod's problem in parallel.
+
+    states holds the current state (solution and bound) of each component
+    and is updated in place. The components listed in open_components are
+    sorted by decreasing size and dealt out round-robin to up to workers
+    threads, each with its own Gurobi environment. A thread stops at the
+    deadline (in time.monotonic() seconds) or when the reporter stops.
+
+    solve(env, k, remaining, callback) solves component k within remaining
+    seconds, passing callback to Model.optimize, and returns its new state
+    (or None to keep the current one). update(k, model, objective, bound)
+    returns the state of component k for a new solution found in the
+    MIPSOL callback. assemble(states) returns the Mod's solution with its
+    objective value and bound, which are passed to the reporter.
+    """
+    state_lock = threading.Lock()
+
+    def component_callback(k):
+        def get_incumbent(model, objective, bound):
+            with state_lock:
+                states[k] = update(k, model, objective, bound)
+                return assemble(states)
+
+        return reporter.callback(get_incumbent, callback)
+
+    def solve_chunk(chunk):
+        with create_env(params=env_params) as env:
+            for k in chunk:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or reporter.stopped:
+                    break
+                state = solve(env, k, remaining, component_callback(k))
+                if state is not None:
+                    with state_lock:
+                        states[k] = state
+
+    if not open_components:
+        return
+    # Components are sorted by decreasing size; deal them out round-robin
+    chunks = [
+        open_components[i::workers] for i in range(min(workers, len(open_components)))
+    ]
+    if len(chunks) == 1:
+        solve_chunk(chunks[0])
+    else:
+        with concurrent.futures.ThreadPoolExecutor(len(chunks)) as executor:
+            list(executor.map(solve_chunk, chunks))
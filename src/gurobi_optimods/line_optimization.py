@@ -4,6 +4,7 @@ Line Optimization in Public Transportation Networks
 """
 
 import logging
+import math
 
 import gurobipy as gp
 import pandas as pd
@@ -20,6 +21,7 @@ except ImportError:
     mpl = None
 
 
+from gurobi_optimods.incumbents import IncumbentReporter
 from gurobi_optimods.utils import optimod
 
 logger = logging.getLogger(__name__)
@@ -34,6 +36,7 @@ def line_optimization(
     demand_data: pd.DataFrame,
     frequencies: list,
     shortest_paths: bool = True,
+    on_incumbent=None,
     *,
     create_env,
 ):
@@ -58,12 +61,22 @@ def line_optimization(
     frequency: List
         List with possible frequencies: How often the line can be operated in the considered
         time horizon.
+    on_incumbent: callable, optional
+        Called with an :class:`~gurobi_optimods.incumbents.Incumbent` for each
+        line concept found during the solve which has a lower cost than the
+        previous ones. The solve stops early if it returns True.
 
     Returns
     -------
     tuple
         - Cost of the optimal line concept (line frequency)
         - list of line-frequency tuples (optimal line concept)
+
+    Raises
+    ------
+    ValueError
+        If the solve is stopped through ``on_incumbent`` before any line
+        concept is found
     """
     # check for missing or wrong data
     missing_data = False
@@ -167,9 +180,18 @@ def line_optimization(
                 demand_data,
                 frequencies,
                 create_env,
+                on_incumbent,
             )
         return all_shortest_paths(
-            nodes, edges, edge_data, lines, linepaths, demands, frequencies, create_env
+            nodes,
+            edges,
+            edge_data,
+            lines,
+            linepaths,
+            demands,
+            frequencies,
+            create_env,
+            on_incumbent,
         )
     else:
         return allow_all_paths(
@@ -181,11 +203,20 @@ def line_optimization(
             demand_data,
             frequencies,
             create_env,
+            on_incumbent,
         )
 
 
 def all_shortest_paths(
-    nodes, edges, edge_data, lines, linepaths, demands, frequencies, create_env
+    nodes,
+    edges,
+    edge_data,
+    lines,
+    linepaths,
+    demands,
+    frequencies,
+    create_env,
+    on_incumbent=None,
 ):
     """
     Strategy 1:
@@ -267,12 +298,14 @@ def all_shortest_paths(
             name="one-freq",
         )
 
-        model.optimize()
+        model.optimize(_incumbent_callback(on_incumbent, x, lines))
 
-        # prepare return values
+        # prepare return values; a stopped solve returns its best solution
+        if model.Status == gp.GRB.INTERRUPTED and model.SolCount == 0:
+            raise ValueError("No line concept found before the solve stopped")
         obj_cost = -1
         lines_out = []
-        if model.Status == gp.GRB.OPTIMAL:
+        if model.Status in [gp.GRB.OPTIMAL, gp.GRB.INTERRUPTED]:
             obj_cost = model.objVal
             for i in linepaths.index:
                 for j in frequencies:
@@ -283,7 +316,15 @@ def all_shortest_paths(
 
 
 def allow_all_paths(
-    nodes, edges, lines, linepaths, demands, demand_data, frequencies, create_env
+    nodes,
+    edges,
+    lines,
+    linepaths,
+    demands,
+    demand_data,
+    frequencies,
+    create_env,
+    on_incumbent=None,
 ):
     """Strategy 2:
     - multi commodity flow formulation for the passenger demand without any restrictions
@@ -408,12 +449,16 @@ def allow_all_paths(
                 model.addConstr(cap_to_s >= demand_to_s, name="capTo" + str(s))
                 model.addConstr(lines_to_s >= 1, name="linesTo" + str(s))
 
-        model.optimize()
+        # The cost is the first of the two objectives, so Gurobi's bound
+        # does not apply to it in the second pass
+        model.optimize(_incumbent_callback(on_incumbent, x, lines, bounded=False))
 
-        # prepare return values
+        # prepare return values; a stopped solve returns its best solution
+        if model.Status == gp.GRB.INTERRUPTED and model.SolCount == 0:
+            raise ValueError("No line concept found before the solve stopped")
         obj_cost = -1
         lines_out = []
-        if model.Status == gp.GRB.OPTIMAL:
+        if model.Status in [gp.GRB.OPTIMAL, gp.GRB.INTERRUPTED]:
             obj_cost = model.objVal
             # model.setParam(gp.GRB.Param.ObjNumber, 1)
             # objTime = model.objVal
@@ -426,6 +471,23 @@ def allow_all_paths(
         return obj_cost, lines_out
 
 
+def _incumbent_callback(on_incumbent, x, lines, bounded=True):
+    """Return a Gurobi callback passing the line concept (list of
+    line-frequency tuples) of each new solution and its cost to on_incumbent.
+    The callback is None if there is no on_incumbent."""
+    keys = list(x)
+    variables = [x[key] for key in keys]
+    costs = [f * lines[l]["operatingCost"] + lines[l]["fixCost"] for l, f in keys]
+
+    def get_incumbent(model, objective, bound):
+        values = model.cbGetSolution(variables)
+        selected = [i for i, value in enumerate(values) if value > 0.5]
+        cost = sum(costs[i] for i in selected)
+        return [keys[i] for i in selected], cost, bound if bounded else -math.inf
+
+    return IncumbentReporter(on_incumbent).callback(get_incumbent)
+
+
 def plot_lineplan(
     node_data: pd.DataFrame,
     edge_data: pd.DataFrame,
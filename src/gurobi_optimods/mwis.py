@@ -3,13 +3,18 @@ Maximum Weighted Independent Set/Clique
 ---------------------------------------
 """
 
+import collections
+import heapq
+import logging
+import time
 from dataclasses import dataclass
+from typing import Optional
 
 import gurobipy as gp
-import gurobipy_pandas as gppd
 import numpy as np
 import pandas as pd
 import scipy.sparse as sp
+import scipy.sparse.csgraph as csgraph
 from gurobipy import GRB
 
 try:
@@ -17,8 +22,11 @@ try:
 except ImportError:
     nx = None
 
+from gurobi_optimods.incumbents import IncumbentReporter, _solve_components
 from gurobi_optimods.utils import optimod
 
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class Result:
@@ -32,10 +40,30 @@ class Result:
         The maximum weighted independent set (clique) array
     f : float
         The total weight of the maximum weighted independent set (clique)
+    bound : float, optional
+        Upper bound on the weight of any independent set (clique). Equal to
+        ``f`` if the set was proven optimal.
+    gap : float, optional
+        Relative gap between ``f`` and ``bound``
     """
 
     x: np.ndarray
     f: float
+    bound: Optional[float] = None
+    gap: Optional[float] = None
+
+
+def _make_result(x, f, slack):
+    """Build a Result from a solution, its weight, and the difference between
+    the upper bound and the weight"""
+    bound = f + slack
+    if slack <= 0:
+        gap = 0.0
+    elif f != 0:
+        gap = slack / abs(f)
+    else:
+        gap = float("inf")
+    return Result(x, f, bound, gap)
 
 
 def maximum_weighted_independent_set(graph, weights, **kwargs):
@@ -54,6 +82,30 @@ def maximum_weighted_independent_set(graph, weights, **kwargs):
         is a pandas dataframe graph, ``weights`` must be a dataframe too.
         The weights dataframe must include the weight information in a column
         named ``"weights"`` and must be indexed by vertex number.
+    formulation : str, optional
+        Either ``"edge"`` (default), which adds one conflict constraint per
+        edge, or ``"clique"``, which covers the edges with cliques found by a
+        greedy heuristic and separates further clique cuts during the solve.
+        The clique formulation has a tighter relaxation and is usually faster
+        on dense graphs.
+    reductions : bool, optional
+        Whether to reduce the graph before building the model (default
+        ``True``). Reductions take vertices into the set or remove them when
+        this is provably optimal, and fold simple structures into single
+        vertices. The remaining graph is split into connected components which
+        are solved independently.
+    workers : int, optional
+        Number of threads solving connected components in parallel (default
+        ``1``). Each thread uses its own Gurobi environment.
+    on_incumbent : callable, optional
+        Called with an :class:`~gurobi_optimods.incumbents.Incumbent` for each
+        improving independent set found during the solve. The solve stops
+        early if it returns True.
+
+    Each model is warm started from a greedy solution improved by local
+    search. If a ``time_limit`` is given, the best solution found within the
+    time limit is returned, and its quality is reported by the ``bound`` and
+    ``gap`` attributes of the result.
 
     Returns
     -------
@@ -61,94 +113,650 @@ def maximum_weighted_independent_set(graph, weights, **kwargs):
         A data class representing the maximum weighted independent set array
         and its weight.
     """
+    mwis, slack = _solve_mwis(*_graph_arrays(graph, weights), **kwargs)
+    return _make_result(mwis, _total_weight(weights, mwis), slack)
+
+
+def _graph_arrays(graph, weights):
+    """Convert any supported graph input to (num_vertices, rows, cols, weights)
+    where rows and cols are integer edge arrays and weights is a numpy array.
+    Vertices of a pandas graph are identified by their position in the weights
+    dataframe."""
     if sp.issparse(graph):
-        return _maximum_weighted_independent_set_scipy(graph, weights, **kwargs)
+        graph = graph.tocoo()
+        rows, cols = graph.row, graph.col
+        weights = np.asarray(weights)
     elif isinstance(graph, pd.DataFrame):
-        return _maximum_weighted_independent_set_pandas(graph, weights, **kwargs)
+        # Hash-based lookup of all edge endpoints in a single pass
+        codes = weights.index.get_indexer(
+            pd.concat([graph["node1"], graph["node2"]], ignore_index=True)
+        )
+        if (codes < 0).any():
+            raise ValueError("Graph contains vertices which have no weight")
+        rows, cols = np.split(codes, 2)
+        weights = weights["weights"].to_numpy()
     elif nx is not None and isinstance(graph, nx.Graph):
-        return _maximum_weighted_independent_set_networkx(graph, weights, **kwargs)
+        edges = np.fromiter(
+            (v for edge in graph.edges for v in edge),
+            dtype=np.int64,
+            count=2 * graph.number_of_edges(),
+        ).reshape(-1, 2)
+        rows, cols = edges[:, 0], edges[:, 1]
+        weights = np.asarray(weights)
     else:
         raise ValueError(f"Unknown graph type: {type(graph)}")
+    return len(weights), rows, cols, weights
+
+
+def _total_weight(weights, vertices):
+    """Weight of the given vertices, as the type of the input weights"""
+    if isinstance(weights, pd.DataFrame):
+        return weights["weights"].iloc[vertices].sum()
+    return np.asarray(weights)[vertices].sum()
 
 
 @optimod()
-def _maximum_weighted_independent_set_scipy(adjacency_matrix, weights, *, create_env):
-    """This implementation uses the gurobipy matrix friendly APIs which are well
-    suited for the input data in scipy data structures."""
-    with create_env() as env, gp.Model("mwis", env=env) as model:
-        rows, cols = adjacency_matrix.tocoo().row, adjacency_matrix.tocoo().col
-        num_vertices, num_edges = len(weights), len(rows)
+def _solve_mwis(
+    num_vertices,
+    rows,
+    cols,
+    weights,
+    formulation="edge",
+    reductions=True,
+    workers=1,
+    on_incumbent=None,
+    *,
+    create_env,
+):
+    """Solve the MWIS problem for the graph given by edge arrays (rows, cols).
+
+    If reductions is True, the graph is first reduced to a (usually much
+    smaller) kernel by the exact reductions in _reduce_graph. The kernel is
+    split into connected components, which are solved as independent models
+    by up to workers threads, each with its own environment. The kernel
+    solution is then mapped back to the input graph.
+
+    Each component model is warm started from a heuristic solution. All
+    components share the time limit; components which are not reached within
+    it keep their heuristic solution. Returns the solution and the difference
+    between its upper bound and its weight.
+
+    Improving solutions of the input graph are passed to on_incumbent, made
+    up of the current solution of each component.
+    """
+    start_time = time.monotonic()
+    reporter = IncumbentReporter(on_incumbent, sense=GRB.MAXIMIZE)
+    _check_formulation(formulation)
+    adjacency = _symmetric_adjacency(num_vertices, rows, cols)
+    if reductions:
+        kernel, kernel_adjacency, kernel_weights, decisions = _reduce_graph(
+            adjacency, weights
+        )
+    else:
+        kernel, kernel_adjacency, kernel_weights, decisions = (
+            np.arange(num_vertices),
+            adjacency,
+            weights,
+            [],
+        )
+    components = _connected_components(kernel_adjacency)
+    if reductions:
+        logger.info(
+            f"Graph reductions removed {num_vertices - len(kernel)} of "
+            f"{num_vertices} vertices, {len(components)} components remain"
+        )
+
+    # Components without edges need no model
+    selected = [
+        vertices[kernel_weights[vertices] > 0]
+        for vertices, rows, _ in components
+        if len(rows) == 0
+    ]
+    components = [component for component in components if len(component[1]) > 0]
+
+    # Current solution and upper bound of each component, starting from a
+    # heuristic solution and the trivial bound
+    states = [
+        (
+            _heuristic_independent_set(
+                _symmetric_adjacency(len(vertices), rows, cols),
+                kernel_weights[vertices],
+            ),
+            np.maximum(kernel_weights[vertices], 0).sum(),
+        )
+        for vertices, rows, cols in components
+    ]
+
+    def incumbent(states):
+        kernel_solution = np.concatenate(
+            selected
+            + [
+                vertices[mwis]
+                for (vertices, _, _), (mwis, _) in zip(components, states)
+            ]
+        )
+        solution = np.sort(_reconstruct_solution(kernel[kernel_solution], decisions))
+        slack = sum(
+            bound - kernel_weights[vertices[mwis]].sum()
+            for (vertices, _, _), (mwis, bound) in zip(components, states)
+        )
+        objective = weights[solution].sum()
+        return solution, objective, objective + slack
+
+    if on_incumbent is not None:
+        reporter.report(*incumbent(states))
+
+    def solve_component(env, k, remaining, component_callback):
+        vertices, rows, cols = components[k]
+        mwis, bound = _solve_mwis_arrays(
+            env,
+            len(vertices),
+            rows,
+            cols,
+            kernel_weights[vertices],
+            formulation,
+            params={"TimeLimit": remaining},
+            start=states[k][0],
+            callback=component_callback,
+        )
+        # Without a solution, keep the heuristic solution
+        return None if mwis is None else (mwis, bound)
+
+    def update_component(k, model, objective, bound):
+        return np.flatnonzero(model.cbGetSolution(model._x) >= 0.5), bound
+
+    with create_env() as env, gp.Model(env=env) as model:
+        deadline = start_time + model.Params.TimeLimit
+    _solve_components(
+        states,
+        list(range(len(components))),
+        solve_component,
+        update_component,
+        incumbent,
+        reporter,
+        create_env,
+        deadline=deadline,
+        workers=workers,
+    )
+
+    slack = 0.0
+    for (vertices, _, _), (mwis, bound) in zip(components, states):
+        selected.append(vertices[mwis])
+        slack += max(bound - kernel_weights[vertices[mwis]].sum(), 0.0)
+
+    mwis = kernel[np.concatenate(selected)] if selected else np.array([], dtype=int)
+    return _reconstruct_solution(mwis, decisions), slack
+
+
+def _heuristic_independent_set(adjacency, weights, max_rounds=20):
+    """Find a good independent set quickly. A greedy solution is built
+    and then improved by local search, see _greedy_independent_set and
+    _improve_independent_set. Returns the selected vertices."""
+    selected = _greedy_independent_set(adjacency, weights)
+    selected = _improve_independent_set(adjacency, weights, selected, max_rounds)
+    return np.flatnonzero(selected)
+
+
+def _greedy_independent_set(adjacency, weights):
+    """Greedy independent set, taking vertices in order of decreasing
+    weight / (degree + 1). The greedy choices are made in vectorized rounds:
+    in each round, all undecided vertices which come before all of their
+    undecided neighbours are taken, and their neighbours are discarded. This
+    gives the same set as the sequential greedy algorithm. Returns a boolean
+    mask of the selected vertices."""
+    num_vertices = adjacency.shape[0]
+    degree = np.diff(adjacency.indptr)
+    order = np.argsort(-weights / (degree + 1), kind="stable")
+    score = np.empty(num_vertices)
+    score[order] = np.arange(num_vertices, 0, -1)
+
+    coo = adjacency.tocoo()
+    src, dst = coo.row, coo.col
+    selected = np.zeros(num_vertices, dtype=bool)
+    undecided = np.asarray(weights) > 0
+    while undecided.any():
+        keep = undecided[src] & undecided[dst]
+        src, dst = src[keep], dst[keep]
+        best_neighbour = np.zeros(num_vertices)
+        np.maximum.at(best_neighbour, src, score[dst])
+        winners = undecided & (score > best_neighbour)
+        selected |= winners
+        undecided &= ~winners
+        undecided[dst[winners[src]]] = False
+    return selected
+
+
+def _improve_independent_set(adjacency, weights, selected, max_rounds):
+    """Local search for the weighted independent set problem.
+
+    Two moves are used, until neither improves the solution or max_rounds
+    rounds have been made:
+
+    - (1, *)-swap: insert a vertex which is heavier than its selected
+      neighbours, and remove those neighbours;
+    - (*, 1)-swap: remove a selected vertex u and insert an independent set of
+      vertices whose only selected neighbour is u, if it is heavier than u.
+
+    The weight of the selected neighbours and the number of selected
+    neighbours of each vertex are maintained incrementally, so a move costs
+    O(degree). Returns a boolean mask of the selected vertices.
+    """
+    indptr, indices = adjacency.indptr, adjacency.indices
+    weights = np.asarray(weights, dtype=float)
+    selected = selected.copy()
+    selected_weight = adjacency @ (weights * selected)
+    selected_count = adjacency @ selected.astype(np.int64)
+
+    def neighbours(v):
+        return indices[indptr[v] : indptr[v + 1]]
+
+    def insert(v):
+        selected[v] = True
+        selected_weight[neighbours(v)] += weights[v]
+        selected_count[neighbours(v)] += 1
+
+    def remove(v):
+        selected[v] = False
+        selected_weight[neighbours(v)] -= weights[v]
+        selected_count[neighbours(v)] -= 1
+
+    for _ in range(max_rounds):
+        improved = False
+
+        gain = np.where(selected, 0.0, weights - selected_weight)
+        for v in np.flatnonzero(gain > 0)[np.argsort(-gain[gain > 0])]:
+            if selected[v] or weights[v] <= selected_weight[v]:
+                continue
+            for u in neighbours(v)[selected[neighbours(v)]]:
+                remove(u)
+            insert(v)
+            improved = True
+
+        # Vertices with a single selected neighbour can replace it; the sum of
+        # the indices of the selected neighbours identifies that neighbour
+        tight = ~selected & (selected_count == 1) & (weights > 0)
+        owner = np.rint(adjacency @ np.where(selected, np.arange(len(weights)), 0))
+        tight_weight = np.bincount(
+            owner[tight].astype(np.int64), weights[tight], minlength=len(weights)
+        )
+        for u in np.flatnonzero(selected & (tight_weight > weights)):
+            if not selected[u]:
+                continue
+            candidates = neighbours(u)
+            candidates = candidates[
+                ~selected[candidates]
+                & (selected_count[candidates] == 1)
+                & (weights[candidates] > 0)
+            ]
+            chosen = []
+            for v in candidates[np.argsort(-weights[candidates], kind="stable")]:
+                if not np.isin(neighbours(v), chosen).any():
+                    chosen.append(v)
+            if weights[chosen].sum() > weights[u]:
+                remove(u)
+                for v in chosen:
+                    insert(v)
+                improved = True
+
+        if not improved:
+            break
+    return selected
+
+
+def _connected_components(adjacency):
+    """Split a graph into connected components. Returns a list of (vertices,
+    rows, cols) triples, where rows and cols are the component's edges with
+    vertices numbered by their position in the vertices array. Components are
+    sorted by decreasing number of vertices."""
+    num_components, labels = csgraph.connected_components(adjacency, directed=False)
+    order = np.argsort(labels, kind="stable")
+    sizes = np.bincount(labels, minlength=num_components)
+    starts = np.concatenate([[0], np.cumsum(sizes)])
+    local = np.empty(len(labels), dtype=np.int64)
+    local[order] = np.arange(len(labels)) - starts[labels[order]]
+
+    upper = sp.triu(adjacency, k=1).tocoo()
+    edge_order = np.argsort(labels[upper.row], kind="stable")
+    edge_rows, edge_cols = local[upper.row[edge_order]], local[upper.col[edge_order]]
+    edge_starts = np.concatenate(
+        [[0], np.cumsum(np.bincount(labels[upper.row], minlength=num_components))]
+    )
+    components = [
+        (
+            order[starts[c] : starts[c + 1]],
+            edge_rows[edge_starts[c] : edge_starts[c + 1]],
+            edge_cols[edge_starts[c] : edge_starts[c + 1]],
+        )
+        for c in range(num_components)
+    ]
+    components.sort(key=lambda component: -len(component[0]))
+    return components
+
+
+def _reduce_graph(adjacency, weights, max_degree=32):
+    """Reduce a weighted graph to a kernel, using exact reductions for the
+    maximum weighted independent set problem.
+
+    The following reductions are applied until none of them applies:
+
+    - vertices with nonpositive weight are removed;
+    - a vertex which weighs at least as much as its neighbourhood (this
+      includes isolated vertices) is taken into the independent set, and its
+      neighbours are removed;
+    - a neighbour u of v with N[v] a subset of N[u] and w(u) <= w(v) is
+      removed (domination). Repeated domination removes all neighbours of a
+      simplicial vertex which is at least as heavy as its neighbours;
+    - a pendant vertex v lighter than its neighbour u is removed and its
+      weight subtracted from u: v is taken if and only if u is not;
+    - a vertex v with an independent neighbourhood of 2 or 3 vertices and
+      w(N(v)) - min(w(N(v))) <= w(v) < w(N(v)) is folded with its neighbours
+      into a single vertex of weight w(N(v)) - w(v): the folded vertex
+      stands for all of N(v), and v is taken if the folded vertex is not.
+
+    Domination and folding are only tried for vertices of degree at most
+    max_degree. Returns the kernel vertices, the kernel adjacency (relabelled
+    by position in the kernel array), the kernel weights, and the list of
+    decisions to map a kernel solution back (see _reconstruct_solution).
+    """
+    indptr, indices = adjacency.indptr, adjacency.indices
+    num_vertices = adjacency.shape[0]
+    neighbours = [
+        set(indices[indptr[i] : indptr[i + 1]].tolist()) for i in range(num_vertices)
+    ]
+    weights = np.asarray(weights, dtype=float).tolist()
+    removed = [False] * num_vertices
+    queued = [True] * num_vertices
+    queue = collections.deque(range(num_vertices))
+    decisions = []
+
+    def push(vertices):
+        for u in vertices:
+            if not removed[u] and not queued[u]:
+                queued[u] = True
+                queue.append(u)
+
+    def remove(v):
+        removed[v] = True
+        for u in neighbours[v]:
+            neighbours[u].discard(v)
+        push(neighbours[v])
+        neighbours[v] = set()
+
+    def include(v):
+        decisions.append(("include", v))
+        for u in list(neighbours[v]):
+            remove(u)
+        remove(v)
+
+    while queue:
+        v = queue.popleft()
+        queued[v] = False
+        if removed[v]:
+            continue
+        weight, nbrs = weights[v], neighbours[v]
+        if weight <= 0:
+            remove(v)
+            continue
+        nbrs_weight = sum(weights[u] for u in nbrs)
+        if weight >= nbrs_weight:
+            include(v)
+            continue
+        if len(nbrs) > max_degree:
+            continue
+
+        closed = nbrs | {v}
+        dominated = [
+            u for u in nbrs if weights[u] <= weight and closed <= neighbours[u] | {u}
+        ]
+        if dominated:
+            for u in dominated:
+                remove(u)
+            continue
+
+        if len(nbrs) == 1:
+            (u,) = nbrs
+            decisions.append(("pendant", v, u))
+            weights[u] -= weight
+            remove(v)
+            continue
+
+        if (
+            len(nbrs) <= 3
+            and weight >= nbrs_weight - min(weights[u] for u in nbrs)
+            and all(not (neighbours[u] & nbrs) for u in nbrs)
+        ):
+            folded = set().union(*(neighbours[u] for u in nbrs)) - closed
+            decisions.append(("fold", v, tuple(nbrs)))
+            for u in list(nbrs):
+                remove(u)
+            neighbours[v] = folded
+            for u in folded:
+                neighbours[u].add(v)
+            weights[v] = nbrs_weight - weight
+            push(folded | {v})
+
+    kernel = np.array(
+        [v for v in range(num_vertices) if not removed[v]], dtype=np.int64
+    )
+    position = np.full(num_vertices, -1, dtype=np.int64)
+    position[kernel] = np.arange(len(kernel))
+    degrees = [len(neighbours[v]) for v in kernel.tolist()]
+    kernel_rows = np.repeat(np.arange(len(kernel)), degrees)
+    kernel_cols = position[
+        np.fromiter(
+            (u for v in kernel.tolist() for u in neighbours[v]),
+            dtype=np.int64,
+            count=sum(degrees),
+        )
+    ]
+    kernel_adjacency = sp.csr_array(
+        (np.ones(len(kernel_rows), dtype=np.int8), (kernel_rows, kernel_cols)),
+        shape=(len(kernel), len(kernel)),
+    )
+    kernel_weights = np.array(weights)[kernel]
+    return kernel, kernel_adjacency, kernel_weights, decisions
+
+
+def _reconstruct_solution(kernel_solution, decisions):
+    """Map an independent set of the reduced graph back to the input graph by
+    replaying the reduction decisions in reverse order"""
+    solution = set(kernel_solution.tolist())
+    for decision in reversed(decisions):
+        if decision[0] == "include":
+            solution.add(decision[1])
+        elif decision[0] == "pendant":
+            _, v, u = decision
+            if u not in solution:
+                solution.add(v)
+        elif decision[0] == "fold":
+            _, v, nbrs = decision
+            if v in solution:
+                solution.remove(v)
+                solution.update(nbrs)
+            else:
+                solution.add(v)
+    return np.array(sorted(solution), dtype=np.int64)
+
+
+def _solve_mwis_arrays(
+    env,
+    num_vertices,
+    rows,
+    cols,
+    weights,
+    formulation,
+    params=None,
+    start=None,
+    callback=None,
+):
+    """Solve the MWIS problem for the graph given by edge arrays (rows, cols)
+    over vertices 0, ..., num_vertices - 1. Any params are set on the model
+    before solving, the vertices in start are used as a MIP start, and
+    callback is called from the Gurobi callback (with model._x holding the
+    variables).
+    Returns the selected vertices and the objective bound, or (None, None) if
+    the solve ended without a solution (e.g. because of a cutoff)."""
+    with gp.Model("mwis", env=env) as model:
+        for name, value in (params or {}).items():
+            model.setParam(name, value)
+        num_edges = len(rows)
         # x_i: 1 if vertex i is in the independent set and 0 otherwise
         x = model.addMVar(num_vertices, vtype=GRB.BINARY, name="x")
         # Maximize the sum of the vertex weights in the independent set
         model.setObjective(weights @ x, sense=GRB.MAXIMIZE)
-        # Get the incident matrix from the adjacency matrix where
-        # there is a column for each edge
-        indices = []
-        for i, j in zip(rows, cols):
-            indices.extend([i, j])
-        indptr = range(0, len(indices) + 2, 2)
-        data = np.ones(2 * num_edges)
-        A = sp.csc_array((data, indices, indptr), shape=(num_vertices, num_edges))
-        # The independent set contains non-adjacent vertices
-        model.addMConstr(
-            A.T,
-            x,
-            GRB.LESS_EQUAL,
-            np.ones(A.shape[1]),
-            name="no_adjacent_vertices",
-        )
-        model.optimize()
+        if start is not None:
+            x_start = np.zeros(num_vertices)
+            x_start[start] = 1.0
+            x.Start = x_start
+        model._x = x
+        if formulation == "clique":
+            separation = _add_clique_constraints(model, x, num_vertices, rows, cols)
+        else:
+            separation = None
+            # Edge-vertex incidence matrix, with one row per edge holding
+            # its two endpoints
+            A = sp.csr_array(
+                (
+                    np.ones(2 * num_edges),
+                    np.column_stack([rows, cols]).ravel(),
+                    np.arange(0, 2 * num_edges + 1, 2),
+                ),
+                shape=(num_edges, num_vertices),
+            )
+            # The independent set contains non-adjacent vertices
+            model.addMConstr(
+                A, x, GRB.LESS_EQUAL, np.ones(num_edges), name="no_adjacent_vertices"
+            )
+        if separation is None or callback is None:
+            model.optimize(separation or callback)
+        else:
+
+            def combined_callback(model, where):
+                separation(model, where)
+                callback(model, where)
+
+            model.optimize(combined_callback)
+        if model.SolCount == 0:
+            return None, None
         (mwis,) = np.where(x.X >= 0.5)
-        return Result(mwis, sum(weights[mwis]))
+        return mwis, model.ObjBound
 
 
-@optimod()
-def _maximum_weighted_independent_set_pandas(frame, weights, *, create_env):
-    """This implementation uses the gurobipy-pandas APIs which are well
-    suited for the input data in pandas dataframes structures."""
-    with create_env() as env, gp.Model("mwis", env=env) as model:
-        # x_i: 1 if vertex i is in the independent set and 0 otherwise
-        x = gppd.add_vars(model, weights, name="x", vtype=GRB.BINARY)
-        # Maximize the sum of the vertex weights in the independent set
-        model.setObjective((x * weights["weights"]).sum(), sense=GRB.MAXIMIZE)
-
-        # The independent set contains only non-adjacent vertices
-        if len(frame) > 0:
-            df = frame.join(x.rename("x1"), on="node1").join(x.rename("x2"), on="node2")
-            gppd.add_constrs(
-                model,
-                df["x1"] + df["x2"],
-                GRB.LESS_EQUAL,
-                1,
-                name="no_adjacent_vertices",
-            )
-        model.optimize()
-        (mwis,) = np.where(x.gppd.X >= 0.5)
-        return Result(mwis, weights["weights"].iloc[mwis].sum())
+def _check_formulation(formulation):
+    if formulation not in ("edge", "clique"):
+        raise ValueError(f"Unknown formulation: {formulation}")
 
 
-@optimod()
-def _maximum_weighted_independent_set_networkx(graph, weights, *, create_env):
-    """This implementation uses the gurobipy term-based APIs which are well
-    suited for the input data in networkx data structures."""
-    with create_env() as env, gp.Model("mwis", env=env) as model:
-        num_nodes, edges = len(weights), graph.edges
-        # x_i: 1 if vertex i is in the independent set and 0 otherwise
-        x = model.addVars(num_nodes, vtype=GRB.BINARY, name="x")
-        # Maximize the sum of the vertex weights in the independent set
-        model.setObjective(
-            gp.quicksum(x[node] * weights[node] for node in range(num_nodes)),
-            sense=GRB.MAXIMIZE,
+def _symmetric_adjacency(num_vertices, rows, cols):
+    """Return the symmetric adjacency structure (without self loops) of the
+    graph with the given edge arrays as a csr array"""
+    rows, cols = np.asarray(rows), np.asarray(cols)
+    keep = rows != cols
+    rows, cols = rows[keep], cols[keep]
+    adjacency = sp.coo_array(
+        (
+            np.ones(2 * len(rows), dtype=np.int8),
+            (np.concatenate([rows, cols]), np.concatenate([cols, rows])),
+        ),
+        shape=(num_vertices, num_vertices),
+    ).tocsr()
+    adjacency.sum_duplicates()
+    return adjacency
+
+
+def _greedy_clique_cover(adjacency):
+    """Cover all edges of a graph by cliques.
+
+    Vertices are visited in order of decreasing degree. Each uncovered edge
+    incident to the current vertex seeds a clique which is greedily extended
+    by the common neighbour with the most uncovered edges into the clique.
+    Returns a list of cliques as lists of vertices, each of size at least 2.
+    """
+    indptr, indices = adjacency.indptr, adjacency.indices
+    neighbours = [
+        set(indices[indptr[i] : indptr[i + 1]].tolist())
+        for i in range(adjacency.shape[0])
+    ]
+    uncovered = [set(neighbourhood) for neighbourhood in neighbours]
+    cliques = []
+    for u in np.argsort(-np.diff(indptr), kind="stable").tolist():
+        while uncovered[u]:
+            v = max(uncovered[u], key=lambda k: len(uncovered[k]))
+            clique = [u, v]
+            candidates = neighbours[u] & neighbours[v]
+            while candidates:
+                w = max(
+                    candidates,
+                    key=lambda k: (
+                        sum(member in uncovered[k] for member in clique),
+                        len(uncovered[k]),
+                    ),
+                )
+                clique.append(w)
+                candidates &= neighbours[w]
+            for i, a in enumerate(clique):
+                for b in clique[i + 1 :]:
+                    uncovered[a].discard(b)
+                    uncovered[b].discard(a)
+            cliques.append(clique)
+    return cliques
+
+
+def _add_clique_constraints(model, x, num_vertices, rows, cols):
+    """Add clique cover constraints sum(x[clique]) <= 1 for the graph given by
+    the edge arrays, and return a callback separating further clique cuts"""
+    adjacency = _symmetric_adjacency(num_vertices, rows, cols)
+    cliques = _greedy_clique_cover(adjacency)
+    if cliques:
+        clique_ids = np.repeat(np.arange(len(cliques)), [len(c) for c in cliques])
+        A = sp.csr_array(
+            (
+                np.ones(len(clique_ids)),
+                (clique_ids, np.concatenate(cliques)),
+            ),
+            shape=(len(cliques), num_vertices),
         )
-        # The independent set contains non-adjacent vertices
-        model.addConstrs(
-            (x[node1] + x[node2] <= 1 for (node1, node2) in edges),
-            name="no_adjacent_vertices",
+        model.addMConstr(
+            A, x, GRB.LESS_EQUAL, np.ones(len(cliques)), name="clique_cover"
         )
-        model.optimize()
-        (mwis,) = np.where(np.array(model.getAttr("X", model.getVars())) >= 0.5)
-        return Result(mwis, sum(weights[mwis]))
+    model.Params.PreCrush = 1
+    model._adjacency = adjacency
+    model._cliques_added = {frozenset(c) for c in cliques}
+    return _separate_clique_cuts
+
+
+def _separate_clique_cuts(model, where, max_cuts=50, tolerance=1e-6):
+    """Callback which greedily grows cliques around the fractional vertices of
+    the node relaxation and adds those violated as user cuts"""
+    if where != GRB.Callback.MIPNODE:
+        return
+    if model.cbGet(GRB.Callback.MIPNODE_STATUS) != GRB.OPTIMAL:
+        return
+    x = model._x
+    indptr, indices = model._adjacency.indptr, model._adjacency.indices
+    x_rel = np.asarray(model.cbGetNodeRel(x))
+    (fractional,) = np.where((x_rel > tolerance) & (x_rel < 1 - tolerance))
+    num_cuts = 0
+    for seed in fractional[np.argsort(-x_rel[fractional])]:
+        candidates = indices[indptr[seed] : indptr[seed + 1]]
+        candidates = candidates[x_rel[candidates] > tolerance]
+        clique = [seed]
+        while candidates.size:
+            best = candidates[np.argmax(x_rel[candidates])]
+            clique.append(best)
+            candidates = np.intersect1d(
+                candidates, indices[indptr[best] : indptr[best + 1]]
+            )
+        if x_rel[clique].sum() <= 1 + tolerance:
+            continue
+        key = frozenset(clique)
+        if key in model._cliques_added:
+            continue
+        model._cliques_added.add(key)
+        model.cbCut(x[np.array(clique)].sum() <= 1)
+        num_cuts += 1
+        if num_cuts >= max_cuts:
+            break
 
 
 def maximum_weighted_clique(graph, weights, **kwargs):
@@ -167,6 +775,17 @@ def maximum_weighted_clique(graph, weights, **kwargs):
         is a pandas dataframe graph, ``weights`` must be a dataframe too.
         The weights dataframe must include the weight information in a column
         named ``"weights"`` and must be indexed by vertex number.
+    formulation : str, optional
+        Formulation of the independent set subproblems, see
+        :func:`maximum_weighted_independent_set`.
+    on_incumbent : callable, optional
+        Called with an :class:`~gurobi_optimods.incumbents.Incumbent` for each
+        improving clique found during the search. The search stops early if
+        it returns True.
+
+    If a ``time_limit`` is given, the best clique found within the time limit
+    is returned, and its quality is reported by the ``bound`` and ``gap``
+    attributes of the result.
 
     Returns
     -------
@@ -174,27 +793,193 @@ def maximum_weighted_clique(graph, weights, **kwargs):
         A data class representing the maximum weighted clique array
         and its weight.
     """
-    if sp.issparse(graph):
-        num_vertices, _ = graph.shape
-        complement_matrix = sp.triu(np.ones((num_vertices, num_vertices)), k=1) - graph
-        return _maximum_weighted_independent_set_scipy(
-            complement_matrix, weights, **kwargs
-        )
-    elif isinstance(graph, pd.DataFrame):
-        num_vertices = len(weights)
-        data = (
-            [node1, node2]
-            for node1 in range(num_vertices)
-            for node2 in range(node1 + 1, num_vertices)
-            if (node1, node2) not in zip(graph["node1"], graph["node2"])
-        )
-        complement_frame = pd.DataFrame(data, columns=["node1", "node2"])
-        return _maximum_weighted_independent_set_pandas(
-            complement_frame, weights, **kwargs
+    mwc, slack = _maximum_weighted_clique_decomposition(
+        *_graph_arrays(graph, weights), **kwargs
+    )
+    return _make_result(mwc, _total_weight(weights, mwc), slack)
+
+
+def _degeneracy_ordering(adjacency):
+    """Return a degeneracy (smallest-last) ordering of the vertices of the
+    graph with the given symmetric csr adjacency structure"""
+    indptr, indices = adjacency.indptr, adjacency.indices
+    degree = np.diff(indptr).tolist()
+    heap = [(d, v) for v, d in enumerate(degree)]
+    heapq.heapify(heap)
+    removed = [False] * len(degree)
+    ordering = []
+    while heap:
+        d, v = heapq.heappop(heap)
+        if removed[v] or d != degree[v]:
+            continue
+        removed[v] = True
+        ordering.append(v)
+        for u in indices[indptr[v] : indptr[v + 1]].tolist():
+            if not removed[u]:
+                degree[u] -= 1
+                heapq.heappush(heap, (degree[u], u))
+    return np.array(ordering, dtype=np.int64)
+
+
+def _coloring_bound(subgraph, weights):
+    """Upper bound on the weight of a clique in a graph given by its dense
+    adjacency matrix. Vertices are greedily coloured in order of decreasing
+    weight; a clique contains at most one vertex per colour class, and the
+    first vertex of each class is the heaviest one."""
+    colors = np.full(len(weights), -1)
+    num_colors, bound = 0, 0.0
+    for i in np.argsort(-weights, kind="stable"):
+        used = set(colors[subgraph[i]].tolist())
+        color = 0
+        while color in used:
+            color += 1
+        if color == num_colors:
+            num_colors += 1
+            bound += weights[i]
+        colors[i] = color
+    return bound
+
+
+def _max_weighted_clique_subproblem(
+    env, adjacency, vertices, weights, cutoff, formulation, params
+):
+    """Find a maximum weighted clique among the given vertices with weight
+    above cutoff, by solving an independent set problem in the complement of
+    their induced subgraph. Returns the clique (or None if no clique beats the
+    cutoff) and an upper bound on the weight of any clique."""
+    vertices = vertices[weights[vertices] > 0]
+    subgraph = adjacency[vertices][:, vertices].toarray() != 0
+    bound = _coloring_bound(subgraph, weights[vertices])
+    if bound <= cutoff:
+        return None, bound
+    rows, cols = np.nonzero(np.triu(~subgraph, k=1))
+    if len(rows) == 0:
+        # The vertices already form a clique
+        return vertices, bound
+    start = _heuristic_independent_set(
+        _symmetric_adjacency(len(vertices), rows, cols), weights[vertices]
+    )
+    params = dict(params, Cutoff=cutoff)
+    mwis, mwis_bound = _solve_mwis_arrays(
+        env, len(vertices), rows, cols, weights[vertices], formulation, params, start
+    )
+    if mwis is None:
+        return None, bound
+    return vertices[mwis], min(bound, mwis_bound)
+
+
+def _greedy_clique(adjacency, weights, seed):
+    """Grow a clique from the seed vertex by repeatedly adding the heaviest
+    common neighbour with positive weight"""
+    indptr, indices = adjacency.indptr, adjacency.indices
+    clique = [seed]
+    candidates = indices[indptr[seed] : indptr[seed + 1]]
+    candidates = candidates[weights[candidates] > 0]
+    while candidates.size:
+        best = candidates[np.argmax(weights[candidates])]
+        clique.append(best)
+        candidates = np.intersect1d(
+            candidates, indices[indptr[best] : indptr[best + 1]]
         )
-    elif nx is not None and isinstance(graph, nx.Graph):
-        return _maximum_weighted_independent_set_networkx(
-            nx.complement(graph), weights, **kwargs
+    return np.array(clique, dtype=np.int64)
+
+
+@optimod()
+def _maximum_weighted_clique_decomposition(
+    num_vertices,
+    rows,
+    cols,
+    weights,
+    formulation="edge",
+    on_incumbent=None,
+    *,
+    create_env,
+):
+    """Find a maximum weighted clique without building the complement graph.
+
+    Every clique has a unique vertex v which comes first in a degeneracy
+    ordering, and the remaining clique vertices are neighbours of v later in
+    the ordering. There are at most degeneracy(G) such neighbours, so the
+    clique problem decomposes into one small subproblem per vertex (solved as
+    an independent set problem in the complement of the neighbourhood). The
+    subproblems are solved in order of decreasing weight bound, and pruned
+    once the bound cannot beat the incumbent. Memory use is proportional to
+    the number of edges plus the square of the degeneracy.
+
+    The search starts from a greedy clique and each subproblem is warm
+    started, so the best clique found so far can be returned when the time
+    limit is reached. Returns the clique and the difference between an upper
+    bound on the clique weight and the weight of the clique. Each improving
+    clique is passed to on_incumbent, with the largest bound of the
+    subproblems which remain to be solved.
+    """
+    reporter = IncumbentReporter(on_incumbent, sense=GRB.MAXIMIZE)
+    _check_formulation(formulation)
+    adjacency = _symmetric_adjacency(num_vertices, rows, cols)
+
+    # Keep only the arcs pointing forward in the degeneracy ordering
+    position = np.empty(num_vertices, dtype=np.int64)
+    position[_degeneracy_ordering(adjacency)] = np.arange(num_vertices)
+    forward = adjacency.tocoo()
+    keep = position[forward.row] < position[forward.col]
+    forward = sp.csr_array(
+        (forward.data[keep], (forward.row[keep], forward.col[keep])),
+        shape=adjacency.shape,
+    )
+
+    # Upper bound on the weight of a clique led by each vertex
+    positive_weights = np.maximum(weights, 0)
+    bounds = weights + forward @ positive_weights
+
+    # Start from a greedy clique around the heaviest vertex
+    best_clique, best_weight = np.array([], dtype=np.int64), 0.0
+    if num_vertices > 0 and weights.max() > 0:
+        best_clique = _greedy_clique(adjacency, weights, np.argmax(weights))
+        best_weight = weights[best_clique].sum()
+        reporter.report(
+            np.sort(best_clique), best_weight, max(best_weight, bounds.max())
         )
-    else:
-        raise ValueError(f"Unknown graph type: {type(graph)}")
+    open_bound = 0.0
+    num_solved = 0
+    with create_env() as env:
+        with gp.Model(env=env) as model:
+            deadline = time.monotonic() + model.Params.TimeLimit
+        for v in np.argsort(-bounds, kind="stable"):
+            if bounds[v] <= best_weight:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or reporter.stopped:
+                # All remaining subproblems have a bound of at most bounds[v]
+                logger.info("Search stopped, returning best clique found")
+                open_bound = max(open_bound, bounds[v])
+                break
+            neighbours = forward.indices[forward.indptr[v] : forward.indptr[v + 1]]
+            clique, bound = _max_weighted_clique_subproblem(
+                env,
+                adjacency,
+                neighbours,
+                weights,
+                best_weight - weights[v],
+                formulation,
+                {"OutputFlag": 0, "TimeLimit": remaining},
+            )
+            num_solved += 1
+            if time.monotonic() >= deadline:
+                # The subproblem may have been stopped by the time limit
+                open_bound = max(open_bound, weights[v] + bound)
+            if clique is None:
+                continue
+            clique = np.append(clique, v)
+            if weights[clique].sum() > best_weight:
+                best_clique, best_weight = clique, weights[clique].sum()
+                reporter.report(
+                    np.sort(best_clique),
+                    best_weight,
+                    max(best_weight, open_bound, bounds[v]),
+                )
+
+    logger.info(
+        f"Solved {num_solved} of {num_vertices} clique subproblems, "
+        f"best clique weight {best_weight}"
+    )
+    return np.sort(best_clique), max(open_bound - best_weight, 0.0)
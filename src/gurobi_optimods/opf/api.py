@@ -20,6 +20,7 @@ def solve_opf(
     branch_switching=False,
     min_active_branches=0.9,
     use_mip_start=False,
+    on_incumbent=None,
     *,
     create_env,
 ):
@@ -66,6 +67,12 @@ def solve_opf(
         (Advanced) If set to True, try various MIP starts for branch switching
         models. Has no effect if ``branchswitching`` is set to False. For DC
         models, this setting is ignored, and the mip start is always used.
+    on_incumbent : callable, optional
+        Called with an :class:`~gurobi_optimods.incumbents.Incumbent` for each
+        improving solution found during a branch switching solve. The solution
+        is a list holding the switching state of each branch, in the same
+        order as ``result["branch"]``. The solve stops early if it
+        returns True. Has no effect if ``branch_switching`` is set to False.
 
     Returns
     -------
@@ -108,6 +115,7 @@ def solve_opf(
             polar=False,
             ivtype="aggressive",
             useactivelossineqs=False,
+            on_incumbent=on_incumbent,
         )
 
 
@@ -123,6 +131,7 @@ def _solve_opf_model_internal(
     usemipstart,
     minactivebranches,
     useactivelossineqs,
+    on_incumbent=None,
 ):
     # Initialize settings dictionary
     settings = converters.build_internal_settings(
@@ -142,7 +151,7 @@ def _solve_opf_model_internal(
     alldata.update(settings)
 
     # Construct and solve model using given case data and user settings
-    solution = grbformulator.construct_and_solve_model(env, alldata)
+    solution = grbformulator.construct_and_solve_model(env, alldata, on_incumbent)
 
     # TODO solution data is populated into 'alldata' then extracted by another
     # function. It may make more sense to have construct_and_solve_model return
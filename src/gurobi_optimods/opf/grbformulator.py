@@ -6,6 +6,7 @@ from enum import Enum
 import gurobipy as gp
 from gurobipy import GRB
 
+from gurobi_optimods.incumbents import IncumbentReporter
 from gurobi_optimods.opf.grbformulator_ac import lpformulator_ac_body
 from gurobi_optimods.opf.grbformulator_dc import lpformulator_dc_body
 from gurobi_optimods.opf.grbformulator_iv import lpformulator_iv_body
@@ -23,9 +24,10 @@ class OpfType(Enum):
     IV = "IV"
 
 
-def construct_and_solve_model(env, alldata):
+def construct_and_solve_model(env, alldata, on_incumbent=None):
     """Construct OPF model for given data and solve it. Return the solution
-    dictionary."""
+    dictionary. For branch switching models, the branch switching states of
+    improving solutions are passed to on_incumbent during the solve."""
 
     if alldata["doac"]:
         opftype = OpfType.AC
@@ -61,14 +63,17 @@ def construct_and_solve_model(env, alldata):
         model.printStats()
 
         # Solve the OPF model, return a dictionary following MATPOWER notation
-        lpformulator_optimize(alldata, model, opftype)
+        lpformulator_optimize(alldata, model, opftype, on_incumbent)
         return turn_solution_into_result_dict(alldata, model, opftype, "result")
 
 
-def lpformulator_optimize(alldata, model, opftype):
+def lpformulator_optimize(alldata, model, opftype, on_incumbent=None):
     """
     Optimizes constructed OPF model.
 
+    For branch switching models, on_incumbent is called for each improving
+    solution with a list holding the switching state of each branch.
+
     Resolves model with DualReductions=0 when model is found to
     be infeasible or unbounded in order to get more information.
 
@@ -99,18 +104,35 @@ def lpformulator_optimize(alldata, model, opftype):
             branch = branches[j]
             zvar[branch].Start = 1.0
 
-    model.optimize()
+    callback = None
+    if alldata["branchswitching_mip"] or (
+        opftype == OpfType.AC and alldata["branchswitching_comp"]
+    ):
+        zvar = alldata["MIP"]["zvar"]
+        branches = alldata["branches"]
+        variables = [zvar[branches[index]] for index in sorted(branches)]
+
+        def get_incumbent(model, objective, bound):
+            values = model.cbGetSolution(variables)
+            return [1 if value > 0.5 else 0 for value in values], objective, bound
+
+        callback = IncumbentReporter(on_incumbent).callback(get_incumbent)
+
+    model.optimize(callback)
 
     # Check model status and re-optimize if numerical trouble or inconclusive results.
     if model.status == GRB.INF_OR_UNBD:
         logger.info("Model Status: infeasible or unbounded.")
         logger.info("Re-optimizing with DualReductions turned off.")
         model.Params.DualReductions = 0
-        model.optimize()
+        model.optimize(callback)
 
     if model.status == GRB.INFEASIBLE:
         raise ValueError("Infeasible model")
 
+    if model.status == GRB.INTERRUPTED and model.SolCount == 0:
+        raise ValueError("No feasible solution found before the solve stopped")
+
     if model.status == GRB.NUMERIC:
         logger.info("Solve failed due to numerical issues.")
         logger.info(
@@ -119,7 +141,7 @@ def lpformulator_optimize(alldata, model, opftype):
         model.Params.NumericFocus = 2
         model.Params.BarHomogeneous = 1
         model.reset()
-        model.optimize()
+        model.optimize(callback)
 
     # Only print objective value and solution quality if at least
     # one feasible point is available
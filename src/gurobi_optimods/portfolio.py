@@ -3,6 +3,12 @@ Mean-Variance Portfolio
 -----------------------
 """
 
+import collections
+import concurrent.futures
+import copy
+import functools
+import hashlib
+import numbers
 from dataclasses import dataclass
 from typing import Optional
 
@@ -13,9 +19,31 @@ from gurobipy import GRB
 
 from gurobi_optimods.utils import optimod
 
+# With risk_model="auto", a factor model must match the covariance matrix up
+# to this relative error (in Frobenius norm)
+_FACTOR_RTOL = 1e-8
+
+# Number of factor models kept for reuse, by covariance matrix fingerprint
+_FACTOR_CACHE_SIZE = 8
+_factor_models = collections.OrderedDict()
+
+# Initial holdings may sum to slightly more than 1, as the portfolios
+# returned by the solver do
+_HOLDINGS_TOL = 1e-9
+
+# Portfolio features which are never vectors
+_SCALAR_FEATURES = {
+    "max_trades",
+    "max_positions",
+    "min_long",
+    "min_short",
+    "max_total_short",
+    "rf_return",
+}
+
 
 class MeanVariancePortfolio:
-    """Optimal mean-variance portfolio solver.
+    r"""Optimal mean-variance portfolio solver.
 
     Instantiate an object of :class:`MeanVariancePortfolio` for given
     covariance matrix and return vector.  Use
@@ -34,6 +62,17 @@ class MeanVariancePortfolio:
             * ``cov_factors[0]``: (n, k) ndarray :math:`B`
             * ``cov_factors[1]``: (k, k) ndarray :math:`K`, SPD
             * ``cov_factors[2]``: (n,) ndarray :math:`d`, nonnegative
+    returns : 2-d ndarray or DataFrame
+        (T, n) matrix :math:`R` of centred returns over :math:`T` periods,
+        such that :math:`\Sigma = R^T R / T`.  Preferable to ``cov_matrix``
+        if there are more assets than periods.
+    risk_model : str or int, optional
+        How a ``cov_matrix`` is modelled.  With ``"dense"`` (the default),
+        the matrix is used as given.  With ``"auto"``, it is replaced by a
+        factor model :math:`\Sigma = F F^T + diag(d)` from its leading
+        eigenvectors, if this model matches :math:`\Sigma` up to numerical
+        noise and is smaller.  An integer sets the number of factors
+        instead, which approximates :math:`\Sigma`.
 
     Raises
     ------
@@ -47,9 +86,15 @@ class MeanVariancePortfolio:
         mu,
         cov_matrix=None,
         cov_factors=None,
+        returns=None,
+        risk_model="dense",
     ):
-        if cov_matrix is not None and cov_factors is not None:
-            raise TypeError("Both cov_matrix and cov_factors given")
+        if sum(data is not None for data in [cov_matrix, cov_factors, returns]) > 1:
+            raise TypeError(
+                "Only one of cov_matrix, cov_factors and returns can be given"
+            )
+        if risk_model != "dense" and cov_matrix is None:
+            raise TypeError("risk_model can only be given with cov_matrix")
 
         if cov_matrix is not None:
             if isinstance(cov_matrix, pd.DataFrame):
@@ -59,8 +104,13 @@ class MeanVariancePortfolio:
             elif isinstance(cov_matrix, np.ndarray):
                 self._covariance = cov_matrix
                 self._result_type = "numpy"
+                self._index = None
             else:
                 raise TypeError("Incompatible type of cov_matrix")
+            if risk_model != "dense":
+                factors = _factor_model(self._covariance, risk_model)
+                if factors is not None:
+                    self._covariance = factors
         elif cov_factors is not None:
             # Given: (B, K, d) such that Sigma = B @ K @ B.T + diag(d)
             # Internally we store (F, sqrt(d)) with F = B @ chol(K) so that
@@ -72,6 +122,22 @@ class MeanVariancePortfolio:
             F = B @ np.linalg.cholesky(K)
             self._covariance = (F, np.sqrt(d))
             self._index = None
+        elif returns is not None:
+            # Given: R such that Sigma = R.T @ R / T
+            # Internally we store (F, None) with F = R.T / sqrt(T), i.e., a
+            # factor model without idiosyncratic risk
+            if isinstance(returns, pd.DataFrame):
+                self._result_type = "pandas"
+                self._index = returns.columns
+                returns = returns.to_numpy()
+            elif isinstance(returns, np.ndarray):
+                self._result_type = "numpy"
+                self._index = None
+            else:
+                raise TypeError("Incompatible type of returns")
+            if returns.ndim != 2:
+                raise ValueError("returns must be a 2-d matrix")
+            self._covariance = (returns.T / np.sqrt(returns.shape[0]), None)
         else:
             raise TypeError("No covariace data given")
 
@@ -99,10 +165,18 @@ class MeanVariancePortfolio:
         max_total_short=0.0,
         initial_holdings=None,
         rf_return=None,
+        workers=1,
         *,
         create_env,
     ):
-        """Compute efficient portfolio for given parameters
+        r"""Compute efficient portfolio for given parameters
+
+        Several accounts can be rebalanced at once by passing a matrix of
+        ``initial_holdings`` with one row per account.  The accounts are
+        solved one after another with a single model, which only changes
+        the data that differs between accounts.  Limits and minimum trade
+        sizes may then be given per account as vectors, and fees and costs
+        per account as matrices of the same shape as ``initial_holdings``.
 
         Parameters
         ----------
@@ -136,9 +210,14 @@ class MeanVariancePortfolio:
         max_total_short : float >= 0, optional
             Maximum total short positions, relative to total investment.
         initial_holdings : 1-d ndarray, optional
-            Initial portfolio holdings (sum needs to be <= 1)
+            Initial portfolio holdings (sum needs to be <= 1).  A 2-d
+            ndarray or DataFrame holds the initial holdings of several
+            accounts, one row per account.
         rf_return : float, optional
             Include a risk-free asset having return rate ``rf_return``.
+        workers : int, optional
+            Number of worker processes which share the accounts, if
+            ``initial_holdings`` is 2-d
 
         Returns
         -------
@@ -158,6 +237,13 @@ class MeanVariancePortfolio:
             **all** possible portfolios.  In this corner case the value
             ``None`` is returned.
 
+            If ``initial_holdings`` is 2-d, a DataFrame with one row per
+            account is returned instead, holding the relative investment into
+            each asset, the ``risk`` and the ``return`` of the portfolio, and
+            the investment ``x_rf`` into the risk-free asset if ``rf_return``
+            was given.  Rows of accounts for which no portfolio was found hold
+            NaN values.
+
         Notes
         -----
         Refer to :ref:`portfolio features` for a detailed discussion of all
@@ -165,34 +251,42 @@ class MeanVariancePortfolio:
 
         """
 
-        fees_buy = self._homogenize_input(fees_buy)
-        fees_sell = self._homogenize_input(fees_sell)
-        costs_buy = self._homogenize_input(costs_buy)
-        costs_sell = self._homogenize_input(costs_sell)
-        initial_holdings = self._homogenize_input(initial_holdings)
+        if np.ndim(initial_holdings) == 2:
+            return self._efficient_portfolios(
+                gamma,
+                dict(
+                    max_trades=max_trades,
+                    max_positions=max_positions,
+                    fees_buy=fees_buy,
+                    fees_sell=fees_sell,
+                    costs_buy=costs_buy,
+                    costs_sell=costs_sell,
+                    min_long=min_long,
+                    min_short=min_short,
+                    max_total_short=max_total_short,
+                    initial_holdings=initial_holdings,
+                    rf_return=rf_return,
+                ),
+                workers,
+                create_env,
+            )
 
-        if initial_holdings is not None:
-            if initial_holdings.sum() > 1.0:
-                raise ValueError("Initial holding's sum must not exceed 1.0")
-        else:
-            initial_holdings = np.zeros(self._mu.shape)
+        features = self._features(
+            max_trades=max_trades,
+            max_positions=max_positions,
+            fees_buy=fees_buy,
+            fees_sell=fees_sell,
+            costs_buy=costs_buy,
+            costs_sell=costs_sell,
+            min_long=min_long,
+            min_short=min_short,
+            max_total_short=max_total_short,
+            initial_holdings=initial_holdings,
+            rf_return=rf_return,
+        )
 
         with create_env() as env, gp.Model("efficient_portfolio", env=env) as m:
-            x, x_rf = self._populate_model(
-                m,
-                gamma,
-                max_trades,
-                max_positions,
-                fees_buy,
-                fees_sell,
-                costs_buy,
-                costs_sell,
-                min_long,
-                min_short,
-                max_total_short,
-                initial_holdings,
-                rf_return,
-            )
+            x, x_rf, _, _ = self._populate_model(m, gamma, **features)
 
             m.optimize()
             status = m.Status
@@ -208,6 +302,213 @@ class MeanVariancePortfolio:
         else:
             return None
 
+    @optimod()
+    def efficient_frontier(self, gammas, *, create_env, **kwargs):
+        """Compute efficient portfolios for several risk aversion coefficients
+
+        The model is built only once. Between solves only the weighting of
+        return and risk in the objective changes, and each solve starts from
+        the portfolio found for the neighbouring risk aversion coefficient.
+
+        Parameters
+        ----------
+
+        gammas : sequence of float >= 0
+            Risk aversion coefficients, see
+            :meth:`MeanVariancePortfolio.efficient_portfolio`
+        **kwargs
+            Portfolio features (``max_trades``, ``fees_buy``,
+            ``initial_holdings``, ...) applied to all portfolios, see
+            :meth:`MeanVariancePortfolio.efficient_portfolio`
+
+        Returns
+        -------
+        frontier : DataFrame
+            One row per risk aversion coefficient, in increasing order, with
+            the relative investment into each asset, the ``risk`` and the
+            ``return`` of the portfolio, and the investment ``x_rf`` into the
+            risk-free asset if ``rf_return`` was given. Rows of risk aversion
+            coefficients for which no portfolio was found hold NaN values.
+        """
+        features = self._features(**kwargs)
+        rf_return = features["rf_return"]
+        gammas = np.sort(np.asarray(gammas, dtype=float))
+        if np.any(gammas < 0):
+            raise ValueError("Risk aversion coefficients must be nonnegative")
+
+        frontier = self._result_frame(pd.Index(gammas, name="gamma"), rf_return)
+
+        with create_env() as env, gp.Model("efficient_frontier", env=env) as m:
+            x, x_rf, ret, risk = self._populate_model(m, gammas[0], **features)
+            variables = m.getVars()
+            normalized = False
+
+            for i, gamma in enumerate(gammas):
+                if gamma > 0:
+                    # Maximize mu' x / gamma - 0.5 x' Sigma x instead of
+                    # mu' x - 0.5 gamma x' Sigma x, so that only the linear
+                    # objective coefficients change between solves
+                    if not normalized:
+                        m.setObjective(ret - 0.5 * risk, GRB.MAXIMIZE)
+                        normalized = True
+                    x.Obj = self._mu / gamma
+                    if rf_return is not None:
+                        x_rf.Obj = rf_return / gamma
+
+                m.optimize()
+                if m.Status != GRB.OPTIMAL:
+                    continue
+                result = self._construct_result(x.X, x_rf.X, rf_return)
+                frontier.iloc[i] = _result_values(result)
+                if m.IsMIP:
+                    # Start the next solve from this portfolio
+                    m.setAttr("Start", variables, m.getAttr("X", variables))
+
+        return frontier
+
+    @optimod()
+    def rebalancing_session(self, gamma, *, create_env, **kwargs):
+        """Start a session for rebalancing a portfolio repeatedly
+
+        The model for the given risk aversion coefficient and portfolio
+        features is built once, and kept by the returned
+        :class:`RebalancingSession` until it is closed.  Each call to
+        :meth:`RebalancingSession.rebalance` changes the model data in place
+        and solves the model again.  Solver settings (``verbose``,
+        ``time_limit``, ``solver_params``, ...) apply to all solves in the
+        session.
+
+        Parameters
+        ----------
+
+        gamma : float >= 0
+            Risk aversion coefficient, see
+            :meth:`MeanVariancePortfolio.efficient_portfolio`
+        **kwargs
+            Portfolio features (``max_trades``, ``fees_buy``,
+            ``initial_holdings``, ...), see
+            :meth:`MeanVariancePortfolio.efficient_portfolio`.  Fees, costs,
+            minimum positions and trade or position limits can only be
+            changed later if they are given here, possibly as 0 or as a
+            limit which is not binding.
+
+        Returns
+        -------
+        session : RebalancingSession
+            The session, which can be used as a context manager
+        """
+        features = self._features(**kwargs)
+        return RebalancingSession(self, gamma, features, create_env())
+
+    def _efficient_portfolios(self, gamma, features, workers, create_env):
+        # Rebalance several accounts, given by the rows of initial_holdings
+        holdings = features.pop("initial_holdings")
+        if isinstance(holdings, pd.DataFrame):
+            if self._index is not None and not holdings.columns.equals(self._index):
+                raise ValueError("Misaligned initial holdings columns")
+            accounts = holdings.index
+            holdings = holdings.to_numpy()
+        else:
+            holdings = np.asarray(holdings)
+            accounts = pd.RangeIndex(holdings.shape[0])
+        holdings = holdings.astype(float)
+        if holdings.shape[1] != self._mu.size:
+            raise ValueError("Initial holdings must have one column per asset")
+        if np.any(holdings.sum(axis=1) > 1.0 + _HOLDINGS_TOL):
+            raise ValueError("Initial holding's sum must not exceed 1.0")
+
+        # Separate per-account features from those shared by all accounts
+        batch = {"initial_holdings": holdings}
+        for name in list(features):
+            value = features[name]
+            if isinstance(value, pd.DataFrame):
+                value = value.to_numpy()
+            per_account = np.ndim(value) == (1 if name in _SCALAR_FEATURES else 2)
+            if name != "rf_return" and per_account:
+                value = np.asarray(value, dtype=float)
+                if value.shape[0] != holdings.shape[0]:
+                    raise ValueError(f"{name} must have one entry per account")
+                batch[name] = value
+                features[name] = value[0]
+        # The model for the first account must allow short positions if any
+        # account does
+        if "max_total_short" in batch:
+            features["max_total_short"] = batch["max_total_short"].max()
+        features["initial_holdings"] = holdings[0]
+        features = self._features(**features)
+
+        if accounts.name is None:
+            accounts = accounts.rename("account")
+        portfolios = self._result_frame(accounts, features["rf_return"])
+        # Each worker rebalances a contiguous chunk of accounts
+        chunks = np.array_split(np.arange(holdings.shape[0]), max(workers, 1))
+        rebalance = functools.partial(
+            _rebalance_accounts, self, gamma, features, batch, create_env
+        )
+        if workers <= 1:
+            results = map(rebalance, chunks)
+        else:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers
+            ) as executor:
+                results = list(executor.map(rebalance, chunks))
+        for rows, values in zip(chunks, results):
+            for row, row_values in zip(rows, values):
+                if row_values is not None:
+                    portfolios.iloc[row] = row_values
+        return portfolios
+
+    def _result_frame(self, index, rf_return):
+        # Empty DataFrame for several portfolios, see _result_values
+        assets = (
+            list(range(self._mu.size)) if self._index is None else list(self._index)
+        )
+        columns = assets + ["risk", "return"]
+        if rf_return is not None:
+            columns.append("x_rf")
+        return pd.DataFrame(np.nan, index=index, columns=columns)
+
+    def _features(
+        self,
+        max_trades=None,
+        max_positions=None,
+        fees_buy=None,
+        fees_sell=None,
+        costs_buy=None,
+        costs_sell=None,
+        min_long=None,
+        min_short=None,
+        max_total_short=0.0,
+        initial_holdings=None,
+        rf_return=None,
+    ):
+        # Validate portfolio features and convert them to numpy data
+        fees_buy = self._homogenize_input(fees_buy)
+        fees_sell = self._homogenize_input(fees_sell)
+        costs_buy = self._homogenize_input(costs_buy)
+        costs_sell = self._homogenize_input(costs_sell)
+        initial_holdings = self._homogenize_input(initial_holdings)
+
+        if initial_holdings is not None:
+            if initial_holdings.sum() > 1.0 + _HOLDINGS_TOL:
+                raise ValueError("Initial holding's sum must not exceed 1.0")
+        else:
+            initial_holdings = np.zeros(self._mu.shape)
+
+        return dict(
+            max_trades=max_trades,
+            max_positions=max_positions,
+            fees_buy=fees_buy,
+            fees_sell=fees_sell,
+            costs_buy=costs_buy,
+            costs_sell=costs_sell,
+            min_long=min_long,
+            min_short=min_short,
+            max_total_short=max_total_short,
+            initial_holdings=initial_holdings,
+            rf_return=rf_return,
+        )
+
     def _populate_model(
         self,
         m,
@@ -224,6 +525,24 @@ class MeanVariancePortfolio:
         initial_holdings,
         rf_return,
     ):
+        if all(
+            feature is None
+            for feature in [
+                max_trades,
+                max_positions,
+                fees_buy,
+                fees_sell,
+                costs_buy,
+                costs_sell,
+                min_long,
+                min_short,
+            ]
+        ):
+            # No feature needs binary variables: solve a QP instead of a MIQP
+            return self._populate_continuous_model(
+                m, gamma, max_total_short, initial_holdings, rf_return
+            )
+
         # max rf_return * x_rf + x' * mu - gamma * x' * cov_matrix * x
         # s.t.
         #      x = x_long - x_short  (x is split in positive/negative parts)
@@ -276,7 +595,7 @@ class MeanVariancePortfolio:
 
         x_buy = m.addMVar(shape=self._mu.shape, name="x_buy")
         x_sell = m.addMVar(shape=self._mu.shape, name="x_sell")
-        m.addConstr(x - initial_holdings == x_buy - x_sell)
+        rebalance = m.addConstr(x - initial_holdings == x_buy - x_sell)
 
         # Binaries used to enforce VUB and minimum position/trade size
         b_long = m.addMVar(shape=self._mu.shape, vtype="B", name="position_long")
@@ -292,26 +611,32 @@ class MeanVariancePortfolio:
         # Going short by alpha means that each long position is upper
         # bounded by 1 + alpha, and each short position by alpha.
         # This is implied by the sum(x) == 1 constraint.
-        m.addConstr(x_long <= (1.0 + max_total_short) * b_long)
-        m.addConstr(x_short <= max_total_short * b_short)
+        vub_long = m.addConstr(x_long <= (1.0 + max_total_short) * b_long)
+        vub_short = m.addConstr(x_short <= max_total_short * b_short)
 
-        m.addConstr(x_buy <= (1.0 + max_total_short) * b_buy)
-        m.addConstr(x_sell <= (1.0 + max_total_short) * b_sell)
+        vub_buy = m.addConstr(x_buy <= (1.0 + max_total_short) * b_buy)
+        vub_sell = m.addConstr(x_sell <= (1.0 + max_total_short) * b_sell)
 
         # A position/trade cannot be both short and long
         m.addConstr(b_long + b_short <= 1, name="long_or_short_position")
         m.addConstr(b_buy + b_sell <= 1, name="buy_or_sell")
 
         # Bound total leverage
-        m.addConstr(x_short.sum() <= max_total_short, name="total_short")
+        total_short = m.addConstr(x_short.sum() <= max_total_short, name="total_short")
 
         investment = x.sum()
 
+        # Constraints for the limits that were given, which can then be
+        # changed by a RebalancingSession
+        limits = {}
+
         if max_trades is not None:
-            m.addConstr(b_buy.sum() + b_sell.sum() <= max_trades, name="max_trades")
+            limits["max_trades"] = m.addConstr(
+                b_buy.sum() + b_sell.sum() <= max_trades, name="max_trades"
+            )
 
         if max_positions is not None:
-            m.addConstr(
+            limits["max_positions"] = m.addConstr(
                 b_long.sum() + b_short.sum() <= max_positions, name="max_positions"
             )
 
@@ -330,38 +655,118 @@ class MeanVariancePortfolio:
             investment += x_rf
 
         if min_long is not None:
-            m.addConstr(x_buy >= min_long * b_buy, name="min_buy")
+            limits["min_long"] = m.addConstr(x_buy >= min_long * b_buy, name="min_buy")
 
         if min_short is not None:
-            m.addConstr(x_sell >= min_short * b_sell, name="min_sell")
+            limits["min_short"] = m.addConstr(
+                x_sell >= min_short * b_sell, name="min_sell"
+            )
+
+        fully_invested = m.addConstr(investment == 1, name="fully_invested")
+
+        # Keep hold of the model structure for a RebalancingSession
+        m._portfolio = dict(
+            continuous=False,
+            x_long=x_long,
+            x_short=x_short,
+            x_buy=x_buy,
+            x_sell=x_sell,
+            b_long=b_long,
+            b_short=b_short,
+            b_buy=b_buy,
+            b_sell=b_sell,
+            rebalance=rebalance,
+            vub_long=vub_long,
+            vub_short=vub_short,
+            vub_buy=vub_buy,
+            vub_sell=vub_sell,
+            total_short=total_short,
+            fully_invested=fully_invested,
+            limits=limits,
+        )
+
+        ret, risk = self._set_objective(m, gamma, x, x_rf, rf_return)
+        return (x, x_rf, ret, risk)
+
+    def _populate_continuous_model(
+        self, m, gamma, max_total_short, initial_holdings, rf_return
+    ):
+        # Same model as in _populate_model without the binary variables,
+        # which are not needed if there are no fees, costs, trade or
+        # position limits, or minimum trade sizes:
+        #
+        # max rf_return * x_rf + x' * mu - gamma * x' * cov_matrix * x
+        # s.t.
+        #      x_short >= -x          (only if max_total_short > 0)
+        #      sum(x_short) <= max_total_short
+        #
+        #      sum(x) + x_rf = 1
+        #
+        # The variable upper bounds of _populate_model become simple bounds
+        # on x. Transaction costs stay in the MIQP: without the binaries,
+        # buying and selling the same asset would be a way to burn cash.
+        vub = 1.0 + max_total_short
+        lb = np.maximum(-max_total_short, initial_holdings - vub)
+        ub = np.minimum(vub, initial_holdings + vub)
+        x = m.addMVar(shape=self._mu.shape, lb=lb, ub=ub, name="x")
+
+        # Dummy variable for investment in risk-free asset,
+        x_rf = m.addVar(lb=0.0, ub=0.0, name="x_rf")
+
+        total_short = None
+        if max_total_short > 0:
+            x_short = m.addMVar(shape=self._mu.shape, name="x_short")
+            m.addConstr(x_short >= -x)
+            total_short = m.addConstr(
+                x_short.sum() <= max_total_short, name="total_short"
+            )
+
+        investment = x.sum()
+
+        if rf_return is not None:
+            x_rf.ub = 1.0
+            investment += x_rf
 
         m.addConstr(investment == 1, name="fully_invested")
 
+        m._portfolio = dict(continuous=True, total_short=total_short, limits={})
+
+        ret, risk = self._set_objective(m, gamma, x, x_rf, rf_return)
+        return (x, x_rf, ret, risk)
+
+    def _set_objective(self, m, gamma, x, x_rf, rf_return):
+        # Set the objective mu' x + rf_return * x_rf - 0.5 * gamma * risk,
+        # and return its return and risk expressions
         if not isinstance(self._covariance, tuple):
             # Basic mean-variance weighted objective
-            objexpr = self._mu @ x - 0.5 * gamma * x @ self._covariance @ x
+            risk = x @ self._covariance @ x
         else:
             F, sqrt_d = self._covariance
             # We have given Sigma = F @ F.T + diag(sqrt_d) @ diag(sqrt_d)
             # Auxiliary variables y_F, y_d:
             #   F.T @ x = y_F
-            #   sqrt_d * x = y_d
-
-            objexpr = self._mu @ x
+            #   sqrt_d * x = y_d   (unless Sigma = R.T @ R / T)
 
             y_F = m.addMVar(F.shape[1], lb=-float("inf"), name=f"yF")
             m.addConstr(F.T @ x == y_F, name=f"link_yF_x")
 
-            y_d = m.addMVar(self._mu.size, lb=-float("inf"), name=f"yd")
-            m.addConstr(sqrt_d * x == y_d, name=f"link_yd_x")
+            risk = y_F @ y_F
+
+            if sqrt_d is not None:
+                y_d = m.addMVar(self._mu.size, lb=-float("inf"), name=f"yd")
+                m.addConstr(sqrt_d * x == y_d, name=f"link_yd_x")
 
-            objexpr -= 0.5 * gamma * (y_F @ y_F + y_d @ y_d)
+                risk += y_d @ y_d
 
+        ret = self._mu @ x
         if rf_return is not None:
-            objexpr += rf_return * x_rf
+            ret += rf_return * x_rf
 
-        m.setObjective(objexpr, GRB.MAXIMIZE)
-        return (x, x_rf)
+        if gamma > 0:
+            m.setObjective(ret - 0.5 * gamma * risk, GRB.MAXIMIZE)
+        else:
+            m.setObjective(ret, GRB.MAXIMIZE)
+        return ret, risk
 
     def _construct_result(self, x, x_rf, rf_return):
         if self._result_type == "numpy":
@@ -382,8 +787,9 @@ class MeanVariancePortfolio:
             y = x @ F
             risk += y @ y
 
-            y = x * sqrt_d
-            risk += y @ y
+            if sqrt_d is not None:
+                y = x * sqrt_d
+                risk += y @ y
 
         if rf_return is not None:
             x_rf = x_rf
@@ -406,6 +812,357 @@ class MeanVariancePortfolio:
         return input_data
 
 
+class RebalancingSession:
+    """A mean-variance portfolio model which is kept between rebalancing
+    decisions.
+
+    Sessions are started by
+    :meth:`MeanVariancePortfolio.rebalancing_session`.  Use
+    :meth:`rebalance` to compute a portfolio for the current data: it only
+    changes the data that differs from the previous call, and starts the
+    solve from the previous portfolio.  This is much faster than building a
+    new model when the data changes a little between decisions.  Close the
+    session, or use it as a context manager, to free the model.
+    """
+
+    def __init__(self, portfolio, gamma, features, env):
+        # Own copy of the portfolio, so that mu can be replaced
+        self._portfolio = copy.copy(portfolio)
+        self._n = portfolio._mu.size
+        self._features = {
+            name: (
+                value
+                if value is None or name in _SCALAR_FEATURES
+                else np.broadcast_to(np.asarray(value, dtype=float), (self._n,))
+            )
+            for name, value in features.items()
+        }
+        self._gamma = gamma
+        self._env = env
+        self._model = gp.Model("rebalancing_session", env=env)
+        self._x, self._x_rf, _, _ = self._portfolio._populate_model(
+            self._model, gamma, **features
+        )
+        self._structure = self._model._portfolio
+        self._start = None
+
+    def rebalance(
+        self,
+        mu=None,
+        initial_holdings=None,
+        cov_matrix=None,
+        fees_buy=None,
+        fees_sell=None,
+        costs_buy=None,
+        costs_sell=None,
+        min_long=None,
+        min_short=None,
+        max_trades=None,
+        max_positions=None,
+        max_total_short=None,
+        rf_return=None,
+    ):
+        r"""Compute an efficient portfolio for updated data
+
+        Arguments which are not given keep their values from the previous
+        call, or from the start of the session.  See
+        :meth:`MeanVariancePortfolio.efficient_portfolio` for their meaning.
+
+        Parameters
+        ----------
+
+        mu : 1-d ndarray or Series, optional
+            Vector of expected returns for each asset
+        initial_holdings : 1-d ndarray or Series, optional
+            Current portfolio holdings (sum needs to be <= 1)
+        cov_matrix : 2-d ndarray or DataFrame, optional
+            Covariance matrix :math:`\Sigma`, if the session was started for
+            a :class:`MeanVariancePortfolio` with a dense ``cov_matrix``.
+            This replaces the objective function of the model.
+        fees_buy, fees_sell, costs_buy, costs_sell : float or ndarray, optional
+            Fees and transaction costs
+        min_long, min_short : float, optional
+            Minimum buy and sell volumes
+        max_trades, max_positions : int, optional
+            Trade and position limits
+        max_total_short : float, optional
+            Maximum total short positions
+        rf_return : float, optional
+            Return rate of the risk-free asset
+
+        Returns
+        -------
+        mvp_result : PortfolioResult
+            The efficient portfolio, see
+            :meth:`MeanVariancePortfolio.efficient_portfolio`.  ``None`` if
+            no portfolio was found.
+
+        Raises
+        ------
+        ValueError
+            If a fee, cost or limit is changed which was not given at the
+            start of the session
+        """
+        if self._model is None:
+            raise ValueError("The session is closed")
+
+        if mu is not None:
+            mu = np.asarray(self._portfolio._homogenize_input(mu), dtype=float)
+            if mu.shape != (self._n,):
+                raise ValueError(f"mu must have shape ({self._n},)")
+            self._x.Obj = mu
+            self._portfolio._mu = mu
+
+        if rf_return is not None:
+            self._require("rf_return")
+            self._x_rf.Obj = rf_return
+            self._features["rf_return"] = rf_return
+
+        if cov_matrix is not None:
+            self._set_covariance(cov_matrix)
+
+        if max_total_short is not None:
+            self._set_max_total_short(max_total_short)
+
+        if initial_holdings is not None:
+            initial_holdings = np.asarray(
+                self._portfolio._homogenize_input(initial_holdings), dtype=float
+            )
+            if initial_holdings.sum() > 1.0 + _HOLDINGS_TOL:
+                raise ValueError("Initial holding's sum must not exceed 1.0")
+            self._features["initial_holdings"] = initial_holdings
+            if self._structure["continuous"]:
+                self._set_bounds()
+            else:
+                self._structure["rebalance"].RHS = initial_holdings
+
+        # Coefficients of fees and costs in the fully invested constraint, and
+        # of the binaries in the minimum trade constraints
+        fully_invested = self._structure.get("fully_invested")
+        for name, value, constrs, variables, sign in [
+            ("fees_buy", fees_buy, fully_invested, "b_buy", 1.0),
+            ("fees_sell", fees_sell, fully_invested, "b_sell", 1.0),
+            ("costs_buy", costs_buy, fully_invested, "x_buy", 1.0),
+            ("costs_sell", costs_sell, fully_invested, "x_sell", 1.0),
+            ("min_long", min_long, "min_long", "b_buy", -1.0),
+            ("min_short", min_short, "min_short", "b_sell", -1.0),
+        ]:
+            if value is None:
+                continue
+            self._require(name)
+            if isinstance(constrs, str):
+                constrs = self._structure["limits"][constrs]
+            value = self._portfolio._homogenize_input(value)
+            value = np.broadcast_to(np.asarray(value, dtype=float), (self._n,))
+            _change_coeffs(
+                self._model,
+                constrs,
+                self._structure[variables],
+                sign * self._features[name],
+                sign * value,
+            )
+            self._features[name] = value
+
+        for name, value in [
+            ("max_trades", max_trades),
+            ("max_positions", max_positions),
+        ]:
+            if value is not None:
+                self._require(name)
+                self._structure["limits"][name].RHS = value
+                self._features[name] = value
+
+        return self._solve()
+
+    def close(self):
+        """Free the model and environment of the session"""
+        if self._model is not None:
+            self._model.close()
+            self._env.close()
+            self._model = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _require(self, name):
+        if self._features[name] is None:
+            raise ValueError(f"{name} was not given at the start of the session")
+
+    def _set_covariance(self, cov_matrix):
+        if isinstance(self._portfolio._covariance, tuple):
+            raise ValueError(
+                "cov_matrix can only be changed in a session for a dense "
+                "covariance matrix"
+            )
+        if isinstance(cov_matrix, pd.DataFrame):
+            cov_matrix = cov_matrix.to_numpy()
+        cov_matrix = np.asarray(cov_matrix, dtype=float)
+        if cov_matrix.shape != (self._n, self._n):
+            raise ValueError(f"cov_matrix must have shape ({self._n}, {self._n})")
+        self._portfolio._covariance = cov_matrix
+        self._portfolio._set_objective(
+            self._model,
+            self._gamma,
+            self._x,
+            self._x_rf,
+            self._features["rf_return"],
+        )
+
+    def _set_max_total_short(self, max_total_short):
+        total_short = self._structure["total_short"]
+        if total_short is None:
+            # The continuous model has no short positions at all
+            if max_total_short > 0:
+                raise ValueError(
+                    "max_total_short must be positive at the start of the session"
+                )
+            return
+        old = self._features["max_total_short"]
+        self._features["max_total_short"] = max_total_short
+        total_short.RHS = max_total_short
+        if self._structure["continuous"]:
+            self._set_bounds()
+            return
+        # Variable upper bounds M * b of the long and short positions, and of
+        # the trades
+        for constrs, variables, shift in [
+            ("vub_long", "b_long", 1.0),
+            ("vub_short", "b_short", 0.0),
+            ("vub_buy", "b_buy", 1.0),
+            ("vub_sell", "b_sell", 1.0),
+        ]:
+            _change_coeffs(
+                self._model,
+                self._structure[constrs],
+                self._structure[variables],
+                np.full(self._n, -(shift + old)),
+                np.full(self._n, -(shift + max_total_short)),
+            )
+
+    def _set_bounds(self):
+        # Bounds of x in the continuous model, see _populate_continuous_model
+        max_total_short = self._features["max_total_short"]
+        initial_holdings = self._features["initial_holdings"]
+        vub = 1.0 + max_total_short
+        self._x.LB = np.maximum(-max_total_short, initial_holdings - vub)
+        self._x.UB = np.minimum(vub, initial_holdings + vub)
+
+    def _solve(self):
+        m = self._model
+        if self._start is not None:
+            # Start from the previous portfolio
+            m.setAttr("Start", m.getVars(), self._start)
+
+        m.optimize()
+        if m.Status != GRB.OPTIMAL:
+            if m.Status in [GRB.INFEASIBLE, GRB.INF_OR_UNBD]:
+                print("No portfolio satisfies the constraints!")
+            return None
+
+        if m.IsMIP:
+            self._start = m.getAttr("X", m.getVars())
+        return self._portfolio._construct_result(
+            self._x.X, self._x_rf.X, self._features["rf_return"]
+        )
+
+
+def _result_values(result):
+    # Row of a DataFrame from _result_frame for the given PortfolioResult
+    values = [*np.asarray(result.x), result.risk, result.ret]
+    if result.x_rf is not None:
+        values.append(result.x_rf)
+    return values
+
+
+def _rebalance_accounts(portfolio, gamma, features, batch, create_env, rows):
+    # Compute portfolios for the given rows of the per-account features in
+    # batch, in a single RebalancingSession
+    with RebalancingSession(portfolio, gamma, features, create_env()) as session:
+        values = []
+        for row in rows:
+            update = {name: value[row] for name, value in batch.items()}
+            result = session.rebalance(**update)
+            values.append(None if result is None else _result_values(result))
+        return values
+
+
+def _change_coeffs(model, constrs, variables, old, new):
+    # Change the coefficient of variables[i] in constrs[i] (or in constrs, if
+    # it is a single constraint) from old[i] to new[i], where they differ
+    changed = np.flatnonzero(old != new)
+    if changed.size == 0:
+        return
+    variables = variables.tolist()
+    if constrs.ndim == 0:
+        constrs = [constrs.item()] * len(variables)
+    else:
+        constrs = constrs.tolist()
+    for i in changed:
+        model.chgCoeff(constrs[i], variables[i], new[i])
+
+
+def _factor_model(cov_matrix, risk_model):
+    # Compute (F, sqrt_d) such that cov_matrix = F @ F.T + diag(sqrt_d**2)
+    # from the leading eigenpairs of cov_matrix; the residual is approximated
+    # by its diagonal. Returns None if risk_model="auto" and no such model is
+    # both accurate and smaller than cov_matrix. Results are cached.
+    n = cov_matrix.shape[0]
+    if risk_model != "auto" and not (
+        isinstance(risk_model, numbers.Integral) and 0 <= risk_model <= n
+    ):
+        raise ValueError(f"Unknown risk_model '{risk_model}'")
+
+    data = np.ascontiguousarray(cov_matrix, dtype=float)
+    key = (data.shape, hashlib.blake2b(data.data, digest_size=16).digest(), risk_model)
+    if key in _factor_models:
+        _factor_models.move_to_end(key)
+        return _factor_models[key]
+
+    eigvals, eigvecs = np.linalg.eigh(data)
+    # Leading eigenpairs first; clip negative eigenvalues from rounding
+    eigvals = np.maximum(eigvals[::-1], 0.0)
+    eigvecs = eigvecs[:, ::-1]
+
+    if risk_model == "auto":
+        # Keeping k eigenpairs leaves the residual matrix with eigenvalues
+        # eigvals[k:]. Its diagonal is kept exactly through d, so the error
+        # is its off-diagonal part, with squared Frobenius norm
+        #   sum(eigvals[k:]**2) - sum(diag(residual)**2)
+        residual_diag = np.zeros((n, n + 1))
+        np.cumsum((eigvecs**2 * eigvals)[:, ::-1], axis=1, out=residual_diag[:, 1:])
+        residual_diag = residual_diag[:, ::-1]
+        residual_norm = np.zeros(n + 1)
+        np.cumsum(eigvals[::-1] ** 2, out=residual_norm[1:])
+        residual_norm = residual_norm[::-1]
+        error = residual_norm - (residual_diag**2).sum(axis=0)
+        tolerance = (_FACTOR_RTOL * np.linalg.norm(eigvals)) ** 2
+        rank = np.flatnonzero(error <= tolerance)[0]
+        # The factor model has about n * (rank + 1) nonzeros, the dense
+        # objective about n**2 / 2 terms
+        factors = None
+        if 2 * (rank + 1) < n:
+            factors = _factors(data, eigvals, eigvecs, rank)
+    else:
+        factors = _factors(data, eigvals, eigvecs, risk_model)
+
+    _factor_models[key] = factors
+    if len(_factor_models) > _FACTOR_CACHE_SIZE:
+        _factor_models.popitem(last=False)
+    return factors
+
+
+def _factors(cov_matrix, eigvals, eigvecs, rank):
+    F = eigvecs[:, :rank] * np.sqrt(eigvals[:rank])
+    variances = np.diag(cov_matrix)
+    d = variances - (F**2).sum(axis=1)
+    # Drop the residual diagonal if it is only rounding noise
+    d[d < _FACTOR_RTOL * variances.max()] = 0.0
+    return (F, np.sqrt(d) if d.any() else None)
+
+
 @dataclass
 class PortfolioResult:
     """
@@ -3,17 +3,32 @@ Quadratic Unconstrained Binary Optimization (QUBO)
 --------------------------------------------------
 """
 
+import contextlib
+import functools
 import logging
+import math
+import time
 from dataclasses import dataclass
 
 import gurobipy as gp
 import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.csgraph as csgraph
 from gurobipy import GRB
 
-from gurobi_optimods.utils import optimod
+from gurobi_optimods.incumbents import IncumbentReporter, _solve_components
+from gurobi_optimods.utils import (
+    _mod_context,
+    _size_limit_error,
+    global_mod_logger,
+    optimod,
+)
 
 logger = logging.getLogger(__name__)
 
+# Components with at most this many variables are solved by enumeration
+_MAX_ENUMERATION = 12
+
 
 @dataclass
 class QuboResult:
@@ -38,11 +53,12 @@ def callback(model, where):
         if runtime >= model._next_output_time:
             primal_bound = model.cbGet(GRB.Callback.MIP_OBJBST)
             dual_bound = model.cbGet(GRB.Callback.MIP_OBJBND)
+            gap = abs(primal_bound - dual_bound) / max(abs(primal_bound), 1e-10)
             logger.info(
                 f"Time: {runtime:.0f}s, "
                 f"best objective: {primal_bound:.2f}, "
                 f"best bound: {dual_bound:.2f}, "
-                f"gap: {100.0*(primal_bound - dual_bound)/abs(primal_bound):.2f}% "
+                f"gap: {100.0*gap:.2f}% "
                 f"(use Ctrl+C to interrupt)"
             )
             model._next_output_time += 5
@@ -53,7 +69,15 @@ def callback(model, where):
 
 
 @optimod()
-def solve_qubo(coeff_matrix, *, create_env) -> QuboResult:
+def solve_qubo(
+    coeff_matrix,
+    presolve=True,
+    method="mip",
+    workers=1,
+    on_incumbent=None,
+    *,
+    create_env,
+) -> QuboResult:
     """
     Solve a quadratic unconstrained binary optimization (QUBO) problem, i.e.,
     minimize quadratic function :math:`x'Qx` defined by coefficient matrix
@@ -61,14 +85,385 @@ def solve_qubo(coeff_matrix, *, create_env) -> QuboResult:
 
     Parameters
     ----------
-    coeff_matrix : spmatrix
-        Quadratic coefficient matrix
+    coeff_matrix : ndarray or spmatrix or dict
+        Quadratic coefficient matrix, as a dense array, a scipy.sparse matrix,
+        or a dictionary mapping index pairs ``(i, j)`` to coefficients.
+        Symmetric entries are accumulated.
+    presolve : bool, optional
+        Whether to fix variables whose optimal value can be deduced from the
+        signs of their coefficients before solving (default ``True``)
+    method : str, optional
+        Either ``"mip"`` (default), which solves the problem with Gurobi
+        starting from a local search solution, or ``"heuristic"``, which only
+        runs the local search. The local search runs until it stops improving
+        or the time limit is reached.
+    workers : int, optional
+        Number of threads solving independent parts of the problem in
+        parallel (default ``1``). Each thread uses its own Gurobi environment.
+    on_incumbent : callable, optional
+        Called with an :class:`~gurobi_optimods.incumbents.Incumbent` for each
+        improving solution found during the solve. The solve stops early if
+        it returns True.
 
     Returns
     -------
     QuboResult
         A dataclass containing a 0/1 solution array and its objective value
     """
+    start_time = time.monotonic()
+    if method not in ("mip", "heuristic"):
+        raise ValueError(f"Unknown method: {method}")
+
+    linear, quadratic = _canonicalize(coeff_matrix)
+    n = len(linear)
+
+    solution = np.zeros(n)
+    free = np.ones(n, dtype=bool)
+    reduced_linear, reduced_quadratic = linear, quadratic
+    if presolve:
+        free, solution, reduced_linear = _persistency_presolve(linear, quadratic)
+        reduced_quadratic = quadratic[free][:, free]
+        logger.info(f"QUBO presolve fixed {n - free.sum()} of {n} variables")
+
+    # Objective contribution of the fixed variables
+    constant = _evaluate(linear, quadratic, solution)
+    free_indices = np.flatnonzero(free)
+    components, isolated = _connected_components(reduced_quadratic)
+    # Variables without quadratic terms only depend on their own coefficient
+    solution[free_indices[isolated]] = reduced_linear[isolated] < 0
+    constant += np.minimum(reduced_linear[isolated], 0).sum()
+    logger.info(f"QUBO decomposes into {len(components)} connected components")
+
+    reporter = IncumbentReporter(on_incumbent)
+    params = {"LogToConsole": 0}
+    with create_env(params=params) as env, gp.Model(env=env) as model:
+        time_limit = model.Params.TimeLimit
+    if method == "heuristic":
+        deadline = start_time + time_limit
+    else:
+        # Leave most of the time to the MIP solve
+        deadline = start_time + 0.1 * time_limit
+
+    # Current solution, objective and bound of each component, starting from
+    # the local search solution and a trivial bound, which is
+    # the sum of the negative coefficients. Small components are solved by
+    # enumeration.
+    problems, states, open_components = [], [], []
+    for k, indices in enumerate(components):
+        component_linear = reduced_linear[indices]
+        component_quadratic = reduced_quadratic[indices][:, indices]
+        if len(indices) <= _MAX_ENUMERATION:
+            start, objective = _enumerate(component_linear, component_quadratic)
+            bound = objective
+        else:
+            start, objective = _tabu_search(
+                component_linear, component_quadratic, deadline=deadline
+            )
+            bound = (
+                np.minimum(component_linear, 0).sum()
+                + np.minimum(component_quadratic.data, 0).sum()
+            )
+            open_components.append(k)
+        problems.append((component_linear, component_quadratic))
+        states.append((start, objective, bound))
+    if components:
+        logger.info(
+            "Local search found a solution with objective "
+            f"{sum(objective for _, objective, _ in states) + constant}"
+        )
+
+    def incumbent(states):
+        x = solution.copy()
+        for indices, (component_solution, _, _) in zip(components, states):
+            x[free_indices[indices]] = component_solution
+        objective = sum(objective for _, objective, _ in states)
+        bound = sum(bound for _, _, bound in states)
+        return x, objective + constant, bound + constant
+
+    reporter.report(*incumbent(states))
+
+    def solve_component(env, k, remaining, component_callback):
+        component_solution, bound = _solve_qubo_model(
+            env,
+            *problems[k],
+            states[k][0],
+            {"TimeLimit": remaining},
+            component_callback,
+        )
+        return component_solution, _evaluate(*problems[k], component_solution), bound
+
+    def update_component(k, model, objective, bound):
+        return np.round(model.cbGetSolution(model._x)), objective, bound
+
+    if method == "mip":
+        _solve_components(
+            states,
+            open_components,
+            solve_component,
+            update_component,
+            incumbent,
+            reporter,
+            create_env,
+            deadline=start_time + time_limit,
+            workers=workers,
+            callback=callback,
+            env_params=params,
+        )
+    solution = incumbent(states)[0]
+
+    return QuboResult(
+        solution=solution, objective_value=_evaluate(linear, quadratic, solution)
+    )
+
+
+class QuboSolver:
+    """
+    Solve a sequence of QUBO problems which share the same sparsity pattern,
+    such as a parameter sweep. The model is built once; each call to
+    :meth:`solve` only changes the objective coefficients and starts from
+    the previous solution. Linear coefficients are changed in place, and the
+    quadratic part of the objective is only replaced if its coefficients
+    differ from the previous instance. Use the solver as a context manager,
+    or call :meth:`close` when done, to free the Gurobi environment::
+
+        with QuboSolver(Q0) as solver:
+            results = [solver.solve(Q) for Q in instances]
+
+    Parameters
+    ----------
+    coeff_matrix : ndarray or spmatrix or dict
+        Quadratic coefficient matrix of any instance, defining the sparsity
+        pattern of all instances (see :func:`solve_qubo`)
+    verbose : bool, optional
+        ``verbose=False`` suppresses all console output
+    logfile : str, optional
+        Write all output to the given file path
+    time_limit : float, optional
+        Solver time limit in seconds for each instance
+    solver_params : dict, optional
+        Gurobi parameters to be passed to the solver
+    """
+
+    def __init__(
+        self,
+        coeff_matrix,
+        *,
+        verbose=True,
+        logfile=None,
+        time_limit=None,
+        solver_params=None,
+    ):
+        linear, quadratic = _canonicalize(coeff_matrix)
+        self._pattern = quadratic.copy()
+        self._pattern.data[:] = 1.0
+        self._quadratic = None
+        self._solution = None
+        # Logging handlers are only attached while creating the environment
+        # and during each solve, so that several solvers can coexist
+        self._context = functools.partial(
+            _mod_context,
+            mod_logger=global_mod_logger,
+            log_to_console=verbose,
+            log_to_file=logfile,
+            time_limit=time_limit,
+            user_params=solver_params,
+        )
+        with contextlib.ExitStack() as stack:
+            with self._context() as create_env:
+                env = stack.enter_context(create_env(params={"LogToConsole": 0}))
+            self._model = stack.enter_context(gp.Model(env=env))
+            self._x = self._model.addMVar(len(linear), vtype=GRB.BINARY)
+            self._model._x = self._x
+            self._stack = stack.pop_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Free the Gurobi model and environment"""
+        self._stack.close()
+
+    def solve(self, coeff_matrix, on_incumbent=None) -> QuboResult:
+        """
+        Solve a QUBO instance with the sparsity pattern of the solver
+
+        Parameters
+        ----------
+        coeff_matrix : ndarray or spmatrix or dict
+            Quadratic coefficient matrix of the instance. Its nonzero entries
+            must be within the sparsity pattern of the solver.
+        on_incumbent : callable, optional
+            Called with an :class:`~gurobi_optimods.incumbents.Incumbent` for
+            each improving solution found during the solve. The solve stops
+            early if it returns True.
+
+        Returns
+        -------
+        QuboResult
+            A dataclass containing a 0/1 solution array and its objective
+            value
+        """
+        start_time = time.monotonic()
+        linear, quadratic = _canonicalize(coeff_matrix)
+        if len(linear) != self._x.shape[0]:
+            raise ValueError("Matrix does not have the dimensions of the solver.")
+        if quadratic.multiply(self._pattern).nnz != quadratic.nnz:
+            raise ValueError(
+                "Matrix has nonzeros outside the sparsity pattern of the solver."
+            )
+
+        with self._context():
+            solution = self._solve(start_time, linear, quadratic, on_incumbent)
+        return QuboResult(
+            solution=solution, objective_value=_evaluate(linear, quadratic, solution)
+        )
+
+    def _solve(self, start_time, linear, quadratic, on_incumbent):
+        """Solve the instance in canonical form. Returns the best solution"""
+        model = self._model
+        time_limit = model.Params.TimeLimit
+        # Improve on the previous solution, if any
+        start, objective = _tabu_search(
+            linear,
+            quadratic,
+            start=self._solution,
+            deadline=start_time + 0.1 * time_limit,
+        )
+        logger.info(f"Local search found a solution with objective {objective}")
+        reporter = IncumbentReporter(on_incumbent)
+        reporter.report(start, objective, -math.inf)
+
+        def get_incumbent(model, objective, bound):
+            return np.round(model.cbGetSolution(model._x)), objective, bound
+
+        # gurobipy cannot change quadratic objective coefficients in place,
+        # so the quadratic part is only replaced if it changed. This resets
+        # the linear coefficients, which are then set in place.
+        if self._quadratic is None or (quadratic != self._quadratic).nnz > 0:
+            model.setMObjective(quadratic, None, 0.0, sense=GRB.MINIMIZE)
+            self._quadratic = quadratic
+        self._x.Obj = linear
+        self._x.Start = start
+        model._next_output_time = 5
+        # The time limit covers the local search and the MIP solve
+        model.Params.TimeLimit = max(start_time + time_limit - time.monotonic(), 0.0)
+        try:
+            model.optimize(reporter.callback(get_incumbent, callback))
+        except gp.GurobiError as ge:
+            if ge.errno == GRB.ERROR_SIZE_LIMIT_EXCEEDED:
+                raise _size_limit_error() from None
+            raise
+        finally:
+            model.Params.TimeLimit = time_limit
+        solution = self._x.X.round() if model.SolCount > 0 else start
+        self._solution = solution
+        return solution
+
+
+def _solve_qubo_model(env, linear, quadratic, start, params, callback):
+    """Solve the QUBO in canonical form as a MIQP, starting from the 0/1
+    vector start. Returns the best solution found and the objective bound."""
+    with gp.Model(env=env) as model:
+        for name, value in params.items():
+            model.setParam(name, value)
+        x = model.addMVar(len(linear), vtype=GRB.BINARY)
+        model.setObjective(x @ quadratic @ x + linear @ x, GRB.MINIMIZE)
+        x.Start = start
+
+        model._x = x
+        model._next_output_time = 5
+        model.optimize(callback)
+
+        if model.SolCount == 0:
+            # Stopped before the start solution was processed
+            return start, -math.inf
+
+        return x.X.round(), model.ObjBound
+
+
+def _enumerate(linear, quadratic):
+    """Solve a small QUBO in canonical form by evaluating all solutions.
+    Returns an optimal solution and its objective value."""
+    n = len(linear)
+    x = (np.arange(2**n)[:, None] >> np.arange(n)) & 1
+    objectives = x @ linear + ((x @ quadratic.toarray()) * x).sum(axis=1)
+    best = np.argmin(objectives)
+    return x[best].astype(float), float(objectives[best])
+
+
+def _connected_components(quadratic):
+    """Split the variables of a QUBO in canonical form by the connected
+    components of its interaction graph. Returns a list of index arrays of
+    the components with at least two variables, sorted by decreasing size,
+    and a mask of the variables without quadratic terms."""
+    n = quadratic.shape[0]
+    _, labels = csgraph.connected_components(quadratic, directed=False)
+    sizes = np.bincount(labels, minlength=n)
+    order = np.argsort(labels, kind="stable")
+    splits = np.split(order, np.cumsum(sizes)[:-1])
+    components = sorted(
+        (indices for indices in splits if len(indices) > 1), key=len, reverse=True
+    )
+    return components, sizes[labels] == 1
+
+
+def _evaluate(linear, quadratic, x):
+    """Objective value of the QUBO in canonical form for the 0/1 vector x"""
+    return float(linear @ x + x @ (quadratic @ x))
+
+
+def _persistency_presolve(linear, quadratic):
+    """Fix variables by first-order persistency.
+
+    Setting x_i = 1 changes the objective by linear[i] plus the coefficients
+    of the neighbours j of i with x_j = 1. If this change is nonnegative for
+    any values of the neighbours, then x_i = 0 in some optimal solution, and
+    if it is nonpositive, then x_i = 1. Fixing variables tightens these
+    bounds for their neighbours, so the rules are applied until no more
+    variables are fixed.
+
+    Returns a mask of the free variables, a 0/1 vector holding the values of
+    the fixed variables, and the linear coefficients of the free variables in
+    the reduced problem (which include the effect of variables fixed to 1).
+    """
+    n = len(linear)
+    symmetric = (quadratic + quadratic.T).tocsr()
+    negative = symmetric.minimum(0)
+    positive = symmetric.maximum(0)
+    linear = linear.copy()
+    free = np.ones(n, dtype=bool)
+    values = np.zeros(n)
+    while True:
+        lower = linear + negative @ free
+        upper = linear + positive @ free
+        fix_zero = free & (lower >= 0)
+        fix_one = free & (upper <= 0) & ~fix_zero
+        if not (fix_zero.any() or fix_one.any()):
+            break
+        free &= ~(fix_zero | fix_one)
+        values[fix_one] = 1.0
+        linear += symmetric @ fix_one
+    return free, values, linear[free]
+
+
+def _canonicalize(coeff_matrix):
+    """Convert a QUBO coefficient matrix (dense, scipy.sparse, or a dict of
+    (i, j) -> q) to canonical form. Returns a dense array of linear
+    coefficients (the diagonal) and a strictly upper triangular csr array of
+    quadratic coefficients in which symmetric entries are merged, so that
+    x' Q x = linear @ x + x @ quadratic @ x for binary x."""
+    if isinstance(coeff_matrix, dict):
+        if coeff_matrix:
+            (rows, cols), data = zip(*coeff_matrix.keys()), coeff_matrix.values()
+            rows, cols = np.array(rows), np.array(cols)
+            data = np.fromiter(data, dtype=float, count=len(coeff_matrix))
+            n = max(rows.max(), cols.max()) + 1
+        else:
+            rows, cols, data, n = [], [], [], 0
+        coeff_matrix = sp.coo_array((data, (rows, cols)), shape=(n, n))
 
     if coeff_matrix.ndim != 2:
         raise ValueError("Matrix is not 2-dimensional.")
@@ -77,20 +472,87 @@ def solve_qubo(coeff_matrix, *, create_env) -> QuboResult:
     if shape[0] != shape[1]:
         raise ValueError("Matrix is not quadratic.")
 
-    n = shape[0]
+    if sp.issparse(coeff_matrix):
+        coo = sp.coo_array(coeff_matrix)
+        rows, cols, data = coo.row, coo.col, coo.data.astype(float)
+    else:
+        coeff_matrix = np.asarray(coeff_matrix, dtype=float)
+        rows, cols = np.nonzero(coeff_matrix)
+        data = coeff_matrix[rows, cols]
 
-    params = {"LogToConsole": 0}
+    n = shape[0]
+    diagonal = rows == cols
+    linear = np.bincount(rows[diagonal], weights=data[diagonal], minlength=n)
+    linear = linear.astype(float)
+    rows, cols, data = rows[~diagonal], cols[~diagonal], data[~diagonal]
+    # Move lower triangular entries to their upper triangular counterpart
+    quadratic = sp.csr_array(
+        (data, (np.minimum(rows, cols), np.maximum(rows, cols))), shape=(n, n)
+    )
+    quadratic.sum_duplicates()
+    quadratic.eliminate_zeros()
+    return linear, quadratic
 
-    with create_env(params=params) as env, gp.Model(env=env) as model:
-        x = model.addMVar(n, vtype=GRB.BINARY)
-        model.setObjective(x @ coeff_matrix @ x, GRB.MINIMIZE)
 
-        model._next_output_time = 5
-        model.optimize(callback)
+def _tabu_search(
+    linear, quadratic, start=None, deadline=float("inf"), max_stall=None, seed=0
+):
+    """One-flip tabu search for the QUBO in canonical form.
 
-        if model.SolCount == 0:
-            raise ValueError(
-                "No solution found, potentially because of a very low time limit."
-            )
+    Each move flips the variable which improves the objective most (or
+    worsens it least), among variables which were not flipped in the last few
+    moves. A variable may be flipped despite being tabu if this gives a new
+    best solution. The objective change of flipping each variable is kept up
+    to date, and a move only updates it for the neighbours of the flipped
+    variable. Choosing the move is a vectorized scan over all variables, so
+    a move costs O(n) in total; for dense QUBOs the degree is close to n
+    anyway. The search starts from the 0/1 vector start (by default, the
+    zero vector) and stops after max_stall moves (by default, the larger of
+    1000 and the number of variables) without finding a new best solution,
+    or at the deadline. Returns the best solution and its objective value.
+    """
+    n = len(linear)
+    if max_stall is None:
+        max_stall = max(1000, n)
+    symmetric = (quadratic + quadratic.T).tocsr()
+    indptr, indices, data = symmetric.indptr, symmetric.indices, symmetric.data
+    rng = np.random.default_rng(seed)
+    tenure = min(10, n // 4) + 1
 
-        return QuboResult(solution=x.X.round(), objective_value=model.ObjVal)
+    x = np.zeros(n) if start is None else np.array(start, dtype=float)
+    # Objective change of flipping each variable
+    delta = (1.0 - 2.0 * x) * (linear + symmetric @ x)
+    objective = _evaluate(linear, quadratic, x)
+    best_x, best_objective, at_best = x.copy(), objective, False
+    tabu_until = np.zeros(n, dtype=np.int64)
+    iteration = last_improvement = 0
+    while n > 0 and iteration - last_improvement < max_stall:
+        if iteration % 100 == 0 and time.monotonic() >= deadline:
+            break
+        allowed = (tabu_until <= iteration) | (
+            objective + delta < best_objective - 1e-9
+        )
+        i = np.argmin(np.where(allowed, delta, np.inf))
+        if not allowed[i]:
+            i = np.argmin(delta)
+        if at_best and delta[i] >= 0:
+            # Leaving the best solution found so far
+            best_x, at_best = x.copy(), False
+        objective += delta[i]
+        # Flipping x_i changes the effect of flipping each neighbour j by
+        # +-q_ij, with the sign depending on the direction of both flips
+        neighbours = indices[indptr[i] : indptr[i + 1]]
+        sign = 1.0 - 2.0 * x[i]
+        delta[neighbours] += (
+            sign * (1.0 - 2.0 * x[neighbours]) * data[indptr[i] : indptr[i + 1]]
+        )
+        delta[i] = -delta[i]
+        x[i] = 1.0 - x[i]
+        tabu_until[i] = iteration + tenure + rng.integers(tenure)
+        iteration += 1
+        if objective < best_objective - 1e-9:
+            best_objective, at_best = objective, True
+            last_improvement = iteration
+    if at_best:
+        best_x = x.copy()
+    return best_x, _evaluate(linear, quadratic, best_x)
@@ -3,13 +3,51 @@ Regression
 ----------
 """
 
+import abc
+import collections
+import concurrent.futures
+import copy
+import mmap
+import pathlib
+import tempfile
+import time
+from dataclasses import dataclass
+
 import gurobipy as gp
+import numpy as np
+import scipy.sparse as sp
 from gurobipy import GRB
 
 from gurobi_optimods.utils import optimod
 
 
-class RegressionBase:
+@dataclass
+class FitManyResult:
+    """
+    Data class representing the fits of a regression model to several subsets
+    of the training data
+
+    Attributes
+    ----------
+    coef : ndarray
+        Coefficients of each fit, stacked along the first axis
+    intercept : ndarray
+        Intercept of each fit
+    time : ndarray
+        Wall-clock time in seconds taken by each fit, including building the
+        model
+    test_error : ndarray or None
+        Mean absolute error of each fit on its held-out records (only set by
+        :meth:`~RegressionBase.cross_val_fit`)
+    """
+
+    coef: np.ndarray
+    intercept: np.ndarray
+    time: np.ndarray
+    test_error: np.ndarray = None
+
+
+class RegressionBase(abc.ABC):
     """Base class for linear regression models which fit coefficients and
     an intercept term"""
 
@@ -21,51 +59,569 @@ class RegressionBase:
         """Predict target value from test data
 
         :param X_test: Feature data for a new unseen dataset
-        :type X_test: :class:`np.array`
-        :return: Outputs predicted by the model for the feature data
+        :type X_test: :class:`np.array` or :class:`scipy.sparse.sparray`
+        :return: Outputs predicted by the model for the feature data. If
+            several sets of coefficients were fitted, the trailing axes of
+            the output correspond to the leading axes of ``coef_``.
         :rtype: :class:`np.array`
         """
-        return (X_test * self.coef_).sum(axis=1) + self.intercept_
+        return _predict(X_test, self.coef_, self.intercept_)
+
+    @optimod()
+    def fit_many(self, X_train, y_train, subsets, workers=1, *, create_env, **kwargs):
+        """Fit the model to several subsets of the training data, for example
+        bootstrap resamples. The fitted attributes of this model are not
+        changed.
+
+        With ``workers > 1``, the fits run in parallel worker processes. Each
+        worker creates one Gurobi environment for all of its fits, and reads
+        the feature data from a single memory-mapped copy shared by all
+        workers.
+
+        Parameters
+        ----------
+
+        X_train : ndarray, sparray or DataFrame
+            Training set feature values
+        y_train : ndarray or Series
+            Training set output values
+        subsets : sequence of ndarray
+            Row indices of the records used by each fit. Indices may repeat.
+        workers : int, optional
+            Number of worker processes (default ``1``, which fits in this
+            process)
+        **kwargs
+            Passed on to each ``fit``, e.g. ``formulation``
+
+        Returns
+        -------
+        FitManyResult
+            Coefficients, intercept and time of each fit
+        """
+        fits = _fit_subsets(
+            self, X_train, y_train, subsets, workers, create_env, kwargs
+        )
+        coef, intercept, times = zip(*fits)
+        return FitManyResult(
+            coef=np.array(coef), intercept=np.array(intercept), time=np.array(times)
+        )
+
+    def cross_val_fit(
+        self, X_train, y_train, n_splits=5, shuffle=False, seed=None, **kwargs
+    ):
+        """Fit the model to k folds of the training data and report its error
+        on each held-out fold. The fitted attributes of this model are not
+        changed.
+
+        Parameters
+        ----------
+
+        X_train : ndarray, sparray or DataFrame
+            Training set feature values
+        y_train : ndarray or Series
+            Training set output values
+        n_splits : int, optional
+            Number of folds (default ``5``)
+        shuffle : bool, optional
+            Whether to shuffle the records before splitting them into folds
+            (default ``False``)
+        seed : int, optional
+            Random seed used to shuffle the records
+        **kwargs
+            Passed on to :meth:`fit_many`, e.g. ``workers`` or ``verbose``
+
+        Returns
+        -------
+        FitManyResult
+            Coefficients, intercept and time of each fit, and the mean
+            absolute error on each held-out fold
+        """
+        X_train = _feature_array(X_train)
+        records = X_train.shape[0]
+        if shuffle:
+            indices = np.random.default_rng(seed).permutation(records)
+        else:
+            indices = np.arange(records)
+        folds = np.array_split(indices, n_splits)
+        subsets = [
+            np.sort(np.concatenate(folds[:k] + folds[k + 1 :])) for k in range(n_splits)
+        ]
+        result = self.fit_many(X_train, y_train, subsets, **kwargs)
+
+        y_train = np.asarray(y_train, dtype=float)
+        test_error = []
+        for fold, coef, intercept in zip(folds, result.coef, result.intercept):
+            y_pred = _predict(X_train[fold], coef, intercept)
+            # Broadcast targets over any quantile axis of the predictions
+            y_test = y_train[fold]
+            y_test = np.expand_dims(
+                y_test, tuple(range(1, y_pred.ndim - y_test.ndim + 1))
+            )
+            test_error.append(np.abs(y_pred - y_test).mean(axis=0))
+        result.test_error = np.array(test_error)
+        return result
+
+    @abc.abstractmethod
+    def _fit(self, env, X_train, y_train):
+        """Fit the model using the given Gurobi environment"""
+
+
+def _predict(X_test, coef, intercept):
+    coef = np.asarray(coef)
+    if coef.ndim == 1:
+        return X_test @ coef + intercept
+    y_pred = X_test @ coef.reshape(-1, coef.shape[-1]).T
+    return np.asarray(y_pred).reshape((-1,) + coef.shape[:-1]) + intercept
+
+
+def _fit_subsets(estimator, X_train, y_train, subsets, workers, create_env, kwargs):
+    """Fit estimator to the given subsets of records, returning the
+    coefficients, intercept and wall-clock time of each fit"""
+    estimator = copy.copy(estimator)
+    X_train = _feature_array(X_train)
+    y_train = np.asarray(y_train, dtype=float)
+    if workers <= 1:
+        with create_env() as env:
+            return [
+                _fit_subset(estimator, env, X_train, y_train, rows, kwargs)
+                for rows in subsets
+            ]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        features = _shared_features(X_train, pathlib.Path(tmpdir))
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(estimator, create_env, features, y_train),
+        ) as executor:
+            fits = executor.map(_fit_worker_subset, subsets, [kwargs] * len(subsets))
+            return list(fits)
+
+
+def _feature_array(X):
+    """Return feature data which can be indexed by rows. Arrays (including
+    memory-mapped arrays) and sparse arrays are kept, other data such as
+    DataFrames is converted to an array."""
+    if sp.issparse(X) or isinstance(X, np.ndarray):
+        return X
+    return np.asarray(X, dtype=float)
+
+
+def _fit_subset(estimator, env, X_train, y_train, rows, kwargs):
+    start = time.monotonic()
+    estimator._fit(env, X_train[rows], y_train[rows], **kwargs)
+    return estimator.coef_, estimator.intercept_, time.monotonic() - start
+
+
+def _shared_features(X_train, tmpdir):
+    """Return a picklable description of memory-mapped feature data, writing
+    X_train to tmpdir unless it is already a memory-mapped array"""
+    if sp.issparse(X_train):
+        X_train = sp.csr_array(X_train)
+        arrays = {}
+        for name in ["data", "indices", "indptr"]:
+            arrays[name] = tmpdir / f"{name}.npy"
+            np.save(arrays[name], getattr(X_train, name))
+        return ("csr", arrays, X_train.shape)
+    if (
+        isinstance(X_train, np.memmap)
+        and isinstance(X_train.base, mmap.mmap)
+        and (X_train.flags.c_contiguous or X_train.flags.f_contiguous)
+    ):
+        return (
+            "memmap",
+            X_train.filename,
+            dict(
+                dtype=X_train.dtype,
+                offset=X_train.offset,
+                shape=X_train.shape,
+                order="C" if X_train.flags.c_contiguous else "F",
+            ),
+        )
+    path = tmpdir / "X_train.npy"
+    np.save(path, np.asarray(X_train))
+    return ("npy", path)
+
+
+def _load_shared_features(spec):
+    if spec[0] == "csr":
+        _, arrays, shape = spec
+        data, indices, indptr = (
+            np.load(arrays[name], mmap_mode="r")
+            for name in ["data", "indices", "indptr"]
+        )
+        return sp.csr_array((data, indices, indptr), shape=shape)
+    if spec[0] == "memmap":
+        _, filename, kwargs = spec
+        return np.memmap(filename, mode="r", **kwargs)
+    return np.load(spec[1], mmap_mode="r")
+
+
+# State of a worker process started by _fit_subsets
+_worker = {}
+
+
+def _init_worker(estimator, create_env, features, y_train):
+    _worker["estimator"] = estimator
+    _worker["env"] = create_env()
+    _worker["X_train"] = _load_shared_features(features)
+    _worker["y_train"] = y_train
+
+
+def _fit_worker_subset(rows, kwargs):
+    return _fit_subset(
+        _worker["estimator"],
+        _worker["env"],
+        _worker["X_train"],
+        _worker["y_train"],
+        rows,
+        kwargs,
+    )
+
+
+def _design_matrix(X, block_size=65536):
+    """Convert feature data to a csr array. Dense data is converted in blocks
+    of rows, so that memory-mapped arrays are never fully loaded."""
+    if sp.issparse(X):
+        return sp.csr_array(X)
+    records = X.shape[0]
+    if records <= block_size:
+        return sp.csr_array(np.asarray(X, dtype=float))
+    return sp.vstack(
+        [
+            sp.csr_array(np.asarray(X[start : start + block_size], dtype=float))
+            for start in range(0, records, block_size)
+        ],
+        format="csr",
+    )
 
 
 class LADRegression(RegressionBase):
     """Least absolute deviations (L1-norm) regressor"""
 
+    def __init__(self):
+        super().__init__()
+        self._stream = None
+
     @optimod()
-    def fit(self, X_train, y_train, *, create_env):
+    def fit(self, X_train, y_train, formulation="auto", *, create_env):
         """Fit the model to training data.
 
         Parameters
         ----------
 
-        X_train : ndarray
-            Training set feature values
+        X_train : ndarray or sparray
+            Training set feature values. Sparse arrays and memory-mapped
+            arrays are supported; only the nonzero values are added to the
+            model.
         y_train : ndarray
             Training set output values
+        formulation : str, optional
+            Either ``"primal"``, which solves an LP with a constraint for each
+            record, ``"dual"``, which solves its dual LP with a constraint for
+            each feature and recovers the coefficients from the dual values,
+            or ``"auto"`` (default), which picks the dual formulation when
+            there are more records than features.
+        """
+        self._close_stream()
+        with create_env() as env:
+            self._fit(env, X_train, y_train, formulation)
+
+    def _fit(self, env, X_train, y_train, formulation="auto"):
+        X_train = _design_matrix(X_train)
+        y_train = np.asarray(y_train, dtype=float)
+        with gp.Model(env=env) as model:
+            lp = _QuantileModel(model, X_train, formulation)
+            self.coef_, self.intercept_ = lp.solve(y_train, 1.0, 1.0)
+
+    @optimod()
+    def partial_fit(self, X_batch, y_batch, window=None, *, create_env):
+        """Fit the model to a new batch of training data, together with the
+        batches passed in earlier calls.
+
+        The first call builds an LP which is kept for later calls. Each call
+        adds error variables and fit constraints for the new records, and
+        re-solves the LP starting from the previous optimal solution. Solver
+        settings (``verbose``, ``solver_params``, ...) are taken from the
+        first call. The LP holds a Gurobi environment until :meth:`close` or
+        :meth:`fit` is called.
+
+        Parameters
+        ----------
+
+        X_batch : ndarray or sparray
+            Feature values of the new records
+        y_batch : ndarray
+            Output values of the new records
+        window : int, optional
+            If given, only the ``window`` most recent records are used: the
+            oldest records are removed from the LP before re-solving. Call
+            :meth:`close`, or use the regressor as a context manager, to free
+            the LP when no more batches follow.
+        """
+        X_batch = _design_matrix(X_batch)
+        y_batch = np.asarray(y_batch, dtype=float)
+        if self._stream is None:
+            self._stream = _LADStream(create_env(), X_batch.shape[1])
+        elif X_batch.shape[1] != self._stream.n_features_in:
+            raise ValueError(
+                f"X_batch has {X_batch.shape[1]} features, but the model was "
+                f"fitted with {self._stream.n_features_in} features"
+            )
+        self._stream.add(X_batch, y_batch)
+        if window is not None and self._stream.records > window:
+            self._stream.remove_oldest(self._stream.records - window)
+        self.coef_, self.intercept_ = self._stream.solve()
+
+    def close(self):
+        """Free the LP and Gurobi environment kept by :meth:`partial_fit`.
+        The fitted coefficients are kept; a later call to :meth:`partial_fit`
+        starts a new LP."""
+        self._close_stream()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _close_stream(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    def __getstate__(self):
+        # The LP kept by partial_fit cannot be pickled
+        state = self.__dict__.copy()
+        state["_stream"] = None
+        return state
+
+
+class QuantileRegression(RegressionBase):
+    """Quantile regressor, fitting one or more quantiles of one or more
+    target variables
+
+    The coefficients minimize the pinball loss: residuals of records above
+    the fitted value are weighted by the quantile :math:`\\tau`, residuals
+    below by :math:`1 - \\tau`. The median (:math:`\\tau = 0.5`) gives the
+    same fit as :class:`LADRegression`.
+
+    Parameters
+    ----------
+
+    quantiles : float or sequence of float, optional
+        Quantile(s) to fit, each strictly between 0 and 1 (default ``0.5``)
+    """
+
+    def __init__(self, quantiles=0.5):
+        super().__init__()
+        self.quantiles = quantiles
+
+    @optimod()
+    def fit(self, X_train, y_train, formulation="auto", *, create_env):
+        """Fit the model to training data.
+
+        All quantiles and targets are fitted by the same LP: only its
+        objective weights (for a new quantile) or right hand side (for a new
+        target) change between solves, and each solve starts from the optimal
+        basis of the previous one.
+
+        After fitting, ``coef_`` has shape ``(n_quantiles, n_targets,
+        n_features)`` and ``intercept_`` has shape ``(n_quantiles,
+        n_targets)``. The quantile axis is dropped if ``quantiles`` is a
+        single number, and the target axis if ``y_train`` is 1-dimensional.
+
+        Parameters
+        ----------
+
+        X_train : ndarray or sparray
+            Training set feature values. Sparse arrays and memory-mapped
+            arrays are supported.
+        y_train : ndarray
+            Training set output values, either 1-dimensional or with one
+            column per target
+        formulation : str, optional
+            Either ``"primal"``, ``"dual"`` or ``"auto"`` (default); see
+            :meth:`LADRegression.fit`
         """
+        with create_env() as env:
+            self._fit(env, X_train, y_train, formulation)
+
+    def _fit(self, env, X_train, y_train, formulation="auto"):
+        quantiles = np.asarray(self.quantiles, dtype=float)
+        if np.any(quantiles <= 0.0) or np.any(quantiles >= 1.0):
+            raise ValueError("Quantiles must be strictly between 0 and 1")
+
+        X_train = _design_matrix(X_train)
+        y_train = np.asarray(y_train, dtype=float)
+        targets = y_train.reshape(y_train.shape[0], -1)
+        n_features_in = X_train.shape[1]
+        coef = np.empty((quantiles.size, targets.shape[1], n_features_in))
+        intercept = np.empty((quantiles.size, targets.shape[1]))
+
+        with gp.Model(env=env) as model:
+            lp = _QuantileModel(model, X_train, formulation)
+            for j in range(targets.shape[1]):
+                for i, quantile in enumerate(quantiles.flat):
+                    coef[i, j], intercept[i, j] = lp.solve(
+                        targets[:, j], quantile, 1.0 - quantile
+                    )
+
+        shape = quantiles.shape + y_train.shape[1:]
+        self.coef_ = coef.reshape(shape + (n_features_in,))
+        self.intercept_ = intercept.reshape(shape)
+        if not shape:
+            self.intercept_ = self.intercept_.item()
+
+
+class _QuantileModel:
+    """An LP fitting the coefficients and intercept of a linear model to
+    feature data X, minimizing the sum of positive residuals times pos_weight
+    plus negative residuals times neg_weight.
+
+    The model is built once for X, using either the primal formulation (a
+    constraint per record) or its dual (a constraint per feature), and can
+    then be solved for different targets and weights. Gurobi solves each
+    modified LP starting from the previous basis.
+    """
+
+    def __init__(self, model, X_train, formulation="auto"):
+        if formulation not in ("auto", "primal", "dual"):
+            raise ValueError(f"Unknown formulation '{formulation}'")
 
-        # Metadata about the input data
         records, n_features_in = X_train.shape
+        if formulation == "auto":
+            formulation = "dual" if records > n_features_in + 1 else "primal"
+        self.model = model
+        self.formulation = formulation
+
+        if formulation == "primal":
+            # Create unbounded variables for each column coefficient, and
+            # bound magnitudes using additional variables. Keep intercept
+            # separate.
+            self.coeff = model.addMVar(n_features_in, lb=-GRB.INFINITY, name="coeff")
+            self.intercept = model.addVar(lb=-GRB.INFINITY, name="intercept")
+            self.pos_error = model.addMVar(records, name="pos_error")
+            self.neg_error = model.addMVar(records, name="neg_error")
+
+            # Create linear relationship with deviation variables, as a single
+            # sparse constraint matrix [X, 1, I, -I] over all variables in the
+            # order they were created
+            identity = sp.identity(records, format="csr")
+            relation = sp.hstack(
+                [X_train, np.ones((records, 1)), identity, -identity], format="csr"
+            )
+            self.fit = model.addMConstr(
+                relation, None, GRB.EQUAL, np.zeros(records), name="fit"
+            )
+            model.ModelSense = GRB.MINIMIZE
+        else:
+            # One bounded variable per record, and one constraint per feature
+            # plus one for the intercept:
+            #   max y'u s.t. [X, 1]'u = 0, -neg_weight <= u <= pos_weight
+            # The coefficients are the dual values of the constraints.
+            self.residual_sign = model.addMVar(
+                records, lb=-1.0, ub=1.0, name="residual_sign"
+            )
+            relation = sp.hstack([X_train, np.ones((records, 1))], format="csc").T
+            self.fit = model.addMConstr(
+                relation,
+                self.residual_sign,
+                GRB.EQUAL,
+                np.zeros(n_features_in + 1),
+                name="fit",
+            )
+            model.ModelSense = GRB.MAXIMIZE
+
+    def solve(self, y_train, pos_weight, neg_weight):
+        """Fit the model to targets y_train with the given residual weights,
+        returning the coefficients and intercept"""
+        if self.formulation == "primal":
+            self.fit.RHS = y_train
+            self.pos_error.Obj = pos_weight
+            self.neg_error.Obj = neg_weight
+            self.model.optimize()
+            return self.coeff.X, self.intercept.X
+        else:
+            self.residual_sign.Obj = y_train
+            self.residual_sign.LB = -neg_weight
+            self.residual_sign.UB = pos_weight
+            self.model.optimize()
+            pi = self.fit.Pi
+            return pi[:-1], pi[-1]
+
+
+class _LADStream:
+    """A primal LAD regression LP to which records can be added, and from
+    which the oldest records can be removed, between solves.
+
+    Each solve starts from the previous optimal solution: this is still
+    feasible after removing records, and is extended to new records by
+    setting their error variables to the residuals of the current fit. The
+    dual values of the fit constraints are likewise extended by the signs of
+    the new residuals."""
+
+    def __init__(self, env, n_features_in):
+        self.env = env
+        self.n_features_in = n_features_in
+        self.model = gp.Model(env=env)
+        self.model.Params.LPWarmStart = 2
+        self.coeff = self.model.addMVar(n_features_in, lb=-GRB.INFINITY, name="coeff")
+        self.intercept = self.model.addVar(lb=-GRB.INFINITY, name="intercept")
+        self.solution = None
+        # Fit constraints, error variables and start values for each batch of
+        # records, oldest first
+        self.batches = collections.deque()
+        self.records = 0
+
+    def add(self, X_batch, y_batch):
+        records = X_batch.shape[0]
+        pos_error = self.model.addMVar(records, obj=1.0, name="pos_error")
+        neg_error = self.model.addMVar(records, obj=1.0, name="neg_error")
+        relation = X_batch @ self.coeff + self.intercept + pos_error - neg_error
+        fit = self.model.addConstr(relation == y_batch, name="fit")
+        start = None
+        if self.solution is not None:
+            coeff, intercept = self.solution
+            residual = y_batch - X_batch @ coeff - intercept
+            start = (
+                np.sign(residual),
+                np.maximum(residual, 0.0),
+                np.maximum(-residual, 0.0),
+            )
+        self.batches.append((fit, pos_error, neg_error, start))
+        self.records += records
+
+    def remove_oldest(self, records):
+        while records > 0:
+            fit, pos_error, neg_error, start = self.batches.popleft()
+            count = min(records, fit.shape[0])
+            self.model.remove(fit[:count])
+            self.model.remove(pos_error[:count])
+            self.model.remove(neg_error[:count])
+            if count < fit.shape[0]:
+                if start is not None:
+                    start = tuple(values[count:] for values in start)
+                self.batches.appendleft(
+                    (fit[count:], pos_error[count:], neg_error[count:], start)
+                )
+            records -= count
+            self.records -= count
+
+    def solve(self):
+        if self.solution is not None:
+            self.model.update()
+            self.coeff.PStart, self.intercept.PStart = self.solution
+            for fit, pos_error, neg_error, start in self.batches:
+                fit.DStart, pos_error.PStart, neg_error.PStart = start
+        self.model.optimize()
+        self.solution = (self.coeff.X, self.intercept.X)
+        self.batches = collections.deque(
+            (fit, pos_error, neg_error, (fit.Pi, pos_error.X, neg_error.X))
+            for fit, pos_error, neg_error, _ in self.batches
+        )
+        return self.solution
 
-        # Create model
-        with create_env() as env, gp.Model(env=env) as model:
-            # Create unbounded variables for each column coefficient, and bound
-            # magnitudes using additional variables. Keep intercept separate.
-            intercept = model.addVar(lb=-GRB.INFINITY, name="intercept")
-            coeff = model.addMVar(n_features_in, lb=-GRB.INFINITY, name="coeff")
-            pos_error = model.addMVar(records, name="pos_error")
-            neg_error = model.addMVar(records, name="neg_error")
-
-            # Create linear relationship with deviation variables
-            relation = (X_train * coeff).sum(axis=1) + intercept + pos_error - neg_error
-            model.addConstr(relation == y_train, name="fit")
-
-            # Minimize least absolute deviations
-            abs_error = pos_error + neg_error
-            mean_abs_error = abs_error.sum()
-            model.setObjective(mean_abs_error, sense=GRB.MINIMIZE)
-
-            # Solve and store results
-            model.optimize()
-            self.intercept_ = intercept.X
-            self.coef_ = coeff.X
+    def close(self):
+        self.model.dispose()
+        self.env.dispose()
@@ -12,12 +12,22 @@ import numpy as np
 import pandas as pd
 from gurobipy import GRB
 
+from gurobi_optimods.portfolio import _factor_model
 from gurobi_optimods.utils import optimod
 
 
 @optimod()
-def max_sharpe_ratio(cov_matrix, mu, rf_rate=0, *, create_env):
-    """
+def max_sharpe_ratio(
+    cov_matrix=None,
+    mu=None,
+    rf_rate=0,
+    *,
+    cov_factors=None,
+    returns=None,
+    risk_model="dense",
+    create_env,
+):
+    r"""
     Solve the problem of finding a portfolio that maximizes the
     Sharpe ratio.
 
@@ -29,6 +39,24 @@ def max_sharpe_ratio(cov_matrix, mu, rf_rate=0, *, create_env):
         Expected return rates :math:`\mu`
     rf_rate : float >= 0, optional
         Non-negative risk-free rate of return (defaults to ``0``)
+    cov_factors : tuple of ndarray, optional
+        Covariance factors that constitute :math:`\Sigma = B K B^T + diag(d)`.
+        Can be given instead of ``cov_matrix`` for large numbers of assets.
+
+            * ``cov_factors[0]``: (n, k) ndarray :math:`B`
+            * ``cov_factors[1]``: (k, k) ndarray :math:`K`, SPD
+            * ``cov_factors[2]``: (n,) ndarray :math:`d`, nonnegative
+    returns : ndarray or DataFrame, optional
+        (T, n) matrix :math:`R` of centred returns over :math:`T` periods,
+        such that :math:`\Sigma = R^T R / T`. Can be given instead of
+        ``cov_matrix`` if there are more assets than periods.
+    risk_model : str or int, optional
+        How a ``cov_matrix`` is modelled.  With ``"dense"`` (the default),
+        the matrix is used as given.  With ``"auto"``, it is replaced by a
+        factor model :math:`\Sigma = F F^T + diag(d)` from its leading
+        eigenvectors, if this model matches :math:`\Sigma` up to numerical
+        noise and is smaller.  An integer sets the number of factors
+        instead, which approximates :math:`\Sigma`.
 
     Returns
     -------
@@ -41,19 +69,56 @@ def max_sharpe_ratio(cov_matrix, mu, rf_rate=0, *, create_env):
         * ``result.ret``: The estimated return :math:`\mu^T x` of the portfolio
         * ``result.risk``: The estimated risk :math:`x^T \Sigma x` of the
           portfolio
+
+    Raises
+    ------
+    LinAlgError
+        If the matrix K in ``cov_factors`` is not positive definite
     """
     indices = None
 
-    if isinstance(cov_matrix, pd.DataFrame):
-        indices = cov_matrix.index
-        cov_matrix = cov_matrix.to_numpy()
-    elif not isinstance(cov_matrix, np.ndarray):
-        raise TypeError(f"Unknown covariance matrix type: {type(cov_matrix)}")
-
-    if cov_matrix.ndim != 2:
-        raise ValueError(
-            f"Covariance matrix should be in 2 dimensions, not {cov_matrix.ndim}"
-        )
+    if sum(data is not None for data in [cov_matrix, cov_factors, returns]) > 1:
+        raise TypeError("Only one of cov_matrix, cov_factors and returns can be given")
+    if risk_model != "dense" and cov_matrix is None:
+        raise TypeError("risk_model can only be given with cov_matrix")
+
+    if returns is not None:
+        if isinstance(returns, pd.DataFrame):
+            indices = returns.columns
+            returns = returns.to_numpy()
+        elif not isinstance(returns, np.ndarray):
+            raise TypeError(f"Unknown returns matrix type: {type(returns)}")
+
+        if returns.ndim != 2:
+            raise ValueError(
+                f"Returns matrix should be in 2 dimensions, not {returns.ndim}"
+            )
+
+        # Sigma = F @ F.T with F = R.T / sqrt(T)
+        covariance = (returns.T / math.sqrt(returns.shape[0]), None)
+    elif cov_factors is not None:
+        # Sigma = F @ F.T + diag(d) with F = B @ chol(K), as in
+        # MeanVariancePortfolio; an error from chol propagates
+        B, K, d = cov_factors
+        F = B @ np.linalg.cholesky(K)
+        covariance = (F, np.sqrt(d))
+    else:
+        if isinstance(cov_matrix, pd.DataFrame):
+            indices = cov_matrix.index
+            cov_matrix = cov_matrix.to_numpy()
+        elif not isinstance(cov_matrix, np.ndarray):
+            raise TypeError(f"Unknown covariance matrix type: {type(cov_matrix)}")
+
+        if cov_matrix.ndim != 2:
+            raise ValueError(
+                f"Covariance matrix should be in 2 dimensions, not {cov_matrix.ndim}"
+            )
+
+        covariance = cov_matrix
+        if risk_model != "dense":
+            factors = _factor_model(cov_matrix, risk_model)
+            if factors is not None:
+                covariance = factors
 
     if isinstance(mu, pd.Series):
         if indices is None:
@@ -76,7 +141,7 @@ def max_sharpe_ratio(cov_matrix, mu, rf_rate=0, *, create_env):
             f"No expected returns are greater than risk-free return rate of {rf_rate}"
         )
 
-    result = _max_sharpe_ratio_numpy(cov_matrix, mu, rf_rate, create_env)
+    result = _max_sharpe_ratio_numpy(covariance, mu, rf_rate, create_env)
 
     if indices is not None:
         result.x = pd.Series(data=result.x, index=indices)
@@ -84,25 +149,57 @@ def max_sharpe_ratio(cov_matrix, mu, rf_rate=0, *, create_env):
     return result
 
 
-def _max_sharpe_ratio_numpy(cov_matrix, mu, rf_rate, create_env):
+def _max_sharpe_ratio_numpy(covariance, mu, rf_rate, create_env):
+    # covariance is either the matrix Sigma, or a tuple (F, sqrt_d) such
+    # that Sigma = F @ F.T + diag(sqrt_d**2); sqrt_d may be None
     with create_env() as env, gp.Model("sharpe_ratio", env=env) as model:
         y = model.addMVar(mu.size, name="y")
         model.addConstr((mu - rf_rate) @ y == 1)
-        model.setObjective(y @ cov_matrix @ y, sense=GRB.MINIMIZE)
+
+        if isinstance(covariance, tuple):
+            # Auxiliary variables z_F = F.T @ y and z_d = sqrt_d * y, so
+            # y' Sigma y = z_F' z_F + z_d' z_d
+            F, sqrt_d = covariance
+            z_F = model.addMVar(F.shape[1], lb=-float("inf"), name="zF")
+            model.addConstr(F.T @ y == z_F)
+            risk = z_F @ z_F
+            if sqrt_d is not None:
+                z_d = model.addMVar(mu.size, lb=-float("inf"), name="zd")
+                model.addConstr(sqrt_d * y == z_d)
+                risk += z_d @ z_d
+            model.setObjective(risk, sense=GRB.MINIMIZE)
+        else:
+            model.setObjective(y @ covariance @ y, sense=GRB.MINIMIZE)
 
         model.optimize()
 
-        # Translate solution to original variable space
-        x = y.X / y.X.sum()
-        ret = mu @ x
-        risk = x @ cov_matrix @ x
-        sharpe_ratio = (ret - rf_rate) / math.sqrt(risk)
-        return SharpeRatioResult(x, sharpe_ratio, ret, risk)
+        return _sharpe_ratio_result(y.X, covariance, mu, rf_rate)
+
+
+def _sharpe_ratio_result(y, covariance, mu, rf_rate):
+    # Translate solution to original variable space
+    x = y / y.sum()
+    ret = mu @ x
+    risk = _risk(covariance, x)
+    sharpe_ratio = (ret - rf_rate) / math.sqrt(risk)
+    return SharpeRatioResult(x, sharpe_ratio, ret, risk)
+
+
+def _risk(covariance, x):
+    if isinstance(covariance, tuple):
+        F, sqrt_d = covariance
+        z = x @ F
+        risk = z @ z
+        if sqrt_d is not None:
+            z = x * sqrt_d
+            risk += z @ z
+        return risk
+    return x @ covariance @ x
 
 
 @dataclass
 class SharpeRatioResult:
-    """
+    r"""
     Data class representing the portfolio that maximizes the Sharpe ratio.
 
 
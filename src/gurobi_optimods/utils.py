@@ -16,11 +16,15 @@ The mod then gets some arguments for free:
 Parameters can also be passed as a dictionary to create_env if the Mod requires
 some specific settings.
 
+Mods which are generator functions keep these settings while the caller
+iterates over them, until the generator is exhausted or closed.
+
 Note that this captures output via the gurobipy and optimod python loggers. It
 may not work as expected when multithreading in Python.
 """
 
 import functools
+import inspect
 import logging
 import re
 import sys
@@ -89,15 +93,9 @@ def _mod_context(
     if time_limit is not None:
         user_params["TimeLimit"] = float(time_limit)
 
-    # Environment factory for decorated mod to use
-    def create_env(params=None):
-        final_params = {}
-        final_params.update(decorator_params)
-        if params:
-            final_params.update(params)
-        if user_params:
-            final_params.update(user_params)
-        return gp.Env(params=final_params)
+    # Environment factory for decorated mod to use. This is picklable, so
+    # that mods can create environments in worker processes.
+    create_env = functools.partial(_create_env, decorator_params, user_params)
 
     try:
         yield create_env
@@ -112,11 +110,32 @@ def _mod_context(
             fh.close()
 
 
+def _create_env(decorator_params, user_params, params=None):
+    final_params = {}
+    final_params.update(decorator_params)
+    if params:
+        final_params.update(params)
+    if user_params:
+        final_params.update(user_params)
+    return gp.Env(params=final_params)
+
+
+def _size_limit_error():
+    return ValueError(
+        "Given data exceeds Gurobi trial license limits; please see "
+        "https://support.gurobi.com/hc/en-us/articles/15801588452241 "
+        "to resolve this issue"
+    )
+
+
 def optimod(mod_logger=None):
     if mod_logger is None:
         mod_logger = global_mod_logger
 
     def optimod_decorator(func):
+        if inspect.isgeneratorfunction(func):
+            return _optimod_generator(func, mod_logger)
+
         @functools.wraps(func)
         def optimod_decorated(
             *args,
@@ -146,13 +165,44 @@ def optimod(mod_logger=None):
                 # so raise a more optimods-appropriate error. Raise here
                 # (instead of directly in the except block above) to avoid a
                 # confusing double stack trace.
-                raise ValueError(
-                    "Given data exceeds Gurobi trial license limits; please see "
-                    "https://support.gurobi.com/hc/en-us/articles/15801588452241 "
-                    "to resolve this issue"
-                )
+                raise _size_limit_error()
 
         optimod_decorated._decorated_mod = True
         return optimod_decorated
 
     return optimod_decorator
+
+
+def _optimod_generator(func, mod_logger):
+    # As optimod_decorated, but the mod context stays open while the caller
+    # iterates, since the models are only built and solved during iteration
+    @functools.wraps(func)
+    def optimod_decorated(
+        *args,
+        verbose=True,
+        logfile=None,
+        time_limit=None,
+        solver_params=None,
+        **kwargs,
+    ):
+        with _mod_context(
+            mod_logger=mod_logger,
+            log_to_console=verbose,
+            log_to_file=logfile,
+            time_limit=time_limit,
+            user_params=solver_params,
+        ) as create_env:
+            try:
+                yield from func(*args, create_env=create_env, **kwargs)
+                return
+
+            except gp.GurobiError as ge:
+                if ge.errno == gp.GRB.ERROR_SIZE_LIMIT_EXCEEDED:
+                    pass  # fall through
+                else:
+                    raise
+
+            raise _size_limit_error()
+
+    optimod_decorated._decorated_mod = True
+    return optimod_decorated
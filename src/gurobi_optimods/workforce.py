@@ -11,6 +11,7 @@ import gurobipy_pandas as gppd
 import pandas as pd
 from gurobipy import GRB
 
+from gurobi_optimods.incumbents import IncumbentReporter
 from gurobi_optimods.utils import optimod
 
 logger = logging.getLogger(__name__)
@@ -23,6 +24,7 @@ def solve_workforce_scheduling(
     worker_limits: pd.DataFrame,
     preferences: Optional[str] = None,
     rolling_limits: bool = False,
+    on_incumbent=None,
     *,
     create_env,
 ) -> pd.DataFrame:
@@ -49,6 +51,11 @@ def solve_workforce_scheduling(
         Whether to enforce worker shift limits on a rolling window basis. If
         True, worker_limits must contain an additional 'Window' column
         specifying the rolling window for each worker.
+    on_incumbent : callable, optional
+        Called with an :class:`~gurobi_optimods.incumbents.Incumbent` for each
+        improving schedule found during the solve, holding the shift
+        assignments in the same format as the result. The solve stops early
+        if it returns True.
 
     Returns
     -------
@@ -59,7 +66,7 @@ def solve_workforce_scheduling(
     ------
     ValueError
         If a feasible set of shift assignments cannot be constructed from the
-        input data
+        input data, or if the solve stops before any is found
     """
     with create_env() as env, gp.Model(env=env) as m:
         # Create binary variables for all valid shift assignments and
@@ -121,13 +128,28 @@ def solve_workforce_scheduling(
         # input availability dataframe. Raise an exception if a feasible schedule
         # does not exist.
 
-        m.optimize()
+        variables = assignments["assign"].tolist()
+
+        def get_incumbent(model, objective, bound):
+            values = model.cbGetSolution(variables)
+            return _assigned_shifts(assignments, values), objective, bound
+
+        reporter = IncumbentReporter(on_incumbent, sense=GRB.MAXIMIZE)
+        m.optimize(reporter.callback(get_incumbent))
         if m.Status == GRB.INFEASIBLE:
             raise ValueError("Infeasible roster")
+        if m.SolCount == 0:
+            raise ValueError("No roster found before the solve stopped")
 
-        return (
-            assignments.assign(assign=lambda df: df["assign"].gppd.X)
-            .query("assign > 0.9")
-            .drop(columns=["assign"])
-            .reset_index()
-        )
+        return _assigned_shifts(assignments, assignments["assign"].gppd.X)
+
+
+def _assigned_shifts(assignments, values):
+    """Return the shift assignments with the given variable values as a
+    subset of the availability dataframe"""
+    return (
+        assignments.assign(assign=values)
+        .query("assign > 0.9")
+        .drop(columns=["assign"])
+        .reset_index()
+    )
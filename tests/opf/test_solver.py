@@ -133,6 +133,21 @@ class TestAPICase9(unittest.TestCase):
         self.assert_approx_equal(solution["gen"][1]["Pg"], 134.377585, tol=1e-1)
         self.assert_approx_equal(solution["branch"][2]["Pt"], -56.2622, tol=1e-1)
 
+    def test_dc_branchswitching_incumbents(self):
+        incumbents = []
+        solution = solve_opf(
+            self.case,
+            opftype="DC",
+            branch_switching=True,
+            on_incumbent=incumbents.append,
+        )
+        self.assertGreaterEqual(len(incumbents), 1)
+        self.assert_approx_equal(incumbents[-1].objective, solution["f"], tol=1e-6)
+        self.assertEqual(
+            incumbents[-1].solution,
+            [branch["switching"] for branch in solution["branch"]],
+        )
+
     def test_ac(self):
         solution = solve_opf(self.case, opftype="AC")
         self.assertEqual(solution["success"], 1)
@@ -0,0 +1,137 @@
+import io
+import itertools
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_allclose
+
+from gurobi_optimods.backtest import rolling_backtest
+from gurobi_optimods.datasets import load_portfolio
+from gurobi_optimods.portfolio import MeanVariancePortfolio, PortfolioResult
+from gurobi_optimods.sharpe_ratio import SharpeRatioResult, max_sharpe_ratio
+
+
+class TestRollingBacktest(unittest.TestCase):
+    def setUp(self):
+        self.data = load_portfolio()
+        self.window = 50
+
+    def windows(self, step):
+        for end in range(self.window, len(self.data.index) + 1, step):
+            yield self.data.iloc[end - self.window : end]
+
+    def test_sharpe_ratio(self):
+        for step in [1, 7, 60]:
+            with self.subTest(step=step):
+                portfolios = list(
+                    rolling_backtest(self.data, self.window, step=step, verbose=False)
+                )
+                windows = list(self.windows(step))
+                self.assertEqual(len(portfolios), len(windows))
+                for (date, pf), data in zip(portfolios, windows):
+                    self.assertEqual(date, data.index[-1])
+                    expected = max_sharpe_ratio(data.cov(), data.mean(), verbose=False)
+                    self.assertIsInstance(pf, SharpeRatioResult)
+                    self.assertTrue(pf.x.index.equals(self.data.columns))
+                    self.assertAlmostEqual(
+                        pf.sharpe_ratio, expected.sharpe_ratio, delta=1e-6
+                    )
+
+    def test_efficient_portfolio(self):
+        gamma = 100.0
+        portfolios = rolling_backtest(self.data, self.window, step=20, gamma=gamma)
+        for (date, pf), data in zip(portfolios, self.windows(20)):
+            self.assertEqual(date, data.index[-1])
+            self.assertIsInstance(pf, PortfolioResult)
+            mvp = MeanVariancePortfolio(data.mean(), data.cov())
+            expected = mvp.efficient_portfolio(gamma, verbose=False)
+            assert_allclose(pf.x, expected.x, atol=1e-5)
+            self.assertAlmostEqual(pf.ret, expected.ret)
+            self.assertAlmostEqual(pf.risk, expected.risk)
+
+    def test_rebalancing(self):
+        # Each window is rebalanced from the portfolio of the previous one
+        gamma = 100.0
+        features = dict(max_trades=3, fees_buy=0.001)
+        holdings = np.full(self.data.shape[1], 0.1)
+        portfolios = rolling_backtest(
+            self.data,
+            self.window,
+            step=20,
+            gamma=gamma,
+            initial_holdings=holdings,
+            verbose=False,
+            **features,
+        )
+        for (date, pf), data in zip(portfolios, self.windows(20)):
+            mvp = MeanVariancePortfolio(data.mean(), data.cov())
+            expected = mvp.efficient_portfolio(
+                gamma, initial_holdings=holdings, verbose=False, **features
+            )
+            self.assertAlmostEqual(
+                pf.ret - 0.5 * gamma * pf.risk,
+                expected.ret - 0.5 * gamma * expected.risk,
+                places=5,
+            )
+            trades = np.abs(pf.x.to_numpy() - holdings) > 1e-6
+            self.assertLessEqual(trades.sum(), 3)
+            holdings = pf.x.to_numpy()
+
+    def test_rebalancing_without_fees(self):
+        # Without fees, the portfolios are fully invested, and are rebalanced
+        # although their sum may exceed 1 within the solver tolerances
+        holdings = np.zeros(self.data.shape[1])
+        portfolios = list(
+            rolling_backtest(
+                self.data,
+                30,
+                step=5,
+                gamma=10.0,
+                initial_holdings=holdings,
+                verbose=False,
+            )
+        )
+        self.assertEqual(len(portfolios), (len(self.data.index) - 30) // 5 + 1)
+        for _, pf in portfolios:
+            self.assertAlmostEqual(pf.x.sum(), 1.0, places=6)
+
+    def test_lazy(self):
+        portfolios = rolling_backtest(self.data, self.window, verbose=False)
+        first = list(itertools.islice(portfolios, 2))
+        self.assertEqual([date for date, _ in first], [49, 50])
+
+    def test_logfile(self):
+        with tempfile.TemporaryDirectory() as tempdir, redirect_stdout(io.StringIO()):
+            logfile = os.path.join(tempdir, "tmp.log")
+            portfolios = list(
+                rolling_backtest(self.data, self.window, step=100, logfile=logfile)
+            )
+            logfile_text = Path(logfile).read_text()
+
+        self.assertEqual(logfile_text.count("Optimal objective"), len(portfolios))
+
+    def test_invalid(self):
+        with self.assertRaises(TypeError):
+            next(rolling_backtest(self.data.to_numpy(), self.window))
+        with self.assertRaises(ValueError):
+            next(rolling_backtest(self.data, 1))
+        with self.assertRaises(ValueError):
+            next(rolling_backtest(self.data, len(self.data.index) + 1))
+        with self.assertRaises(ValueError):
+            next(rolling_backtest(self.data, self.window, step=0))
+        with self.assertRaises(TypeError):
+            next(rolling_backtest(self.data, self.window, max_trades=2))
+
+    def test_no_positive_returns(self):
+        data = pd.DataFrame(
+            np.random.default_rng(0).normal(-1.0, 0.1, size=(10, 3)),
+            columns=["A", "B", "C"],
+        )
+        portfolios = list(rolling_backtest(data, 5, verbose=False))
+        self.assertEqual(len(portfolios), 6)
+        self.assertTrue(all(pf is None for _, pf in portfolios))
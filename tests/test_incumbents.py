@@ -0,0 +1,146 @@
+import time
+import unittest
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+from gurobipy import GRB
+
+from gurobi_optimods.incumbents import IncumbentReporter, IncumbentStream
+from gurobi_optimods.mwis import (
+    maximum_weighted_clique,
+    maximum_weighted_independent_set,
+)
+from gurobi_optimods.qubo import solve_qubo
+
+
+def counting_mod(n, on_incumbent=None):
+    # Reports n improving solutions, or fewer if asked to stop
+    reporter = IncumbentReporter(on_incumbent)
+    for i in range(n):
+        if reporter.report(i, -i, -n):
+            return i
+    return n
+
+
+def waiting_mod(on_incumbent=None):
+    # Reports a solution, then waits until asked to stop
+    reporter = IncumbentReporter(on_incumbent)
+    reporter.report(None, 0.0, 0.0)
+    deadline = time.monotonic() + 10
+    while not reporter.stopped and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return reporter.stopped
+
+
+class TestIncumbentReporter(unittest.TestCase):
+    def test_improving(self):
+        seen = []
+        reporter = IncumbentReporter(seen.append)
+        for objective in [3.0, 2.0, 2.0, 4.0, 1.0]:
+            reporter.report(objective, objective, 0.0)
+        self.assertEqual([incumbent.objective for incumbent in seen], [3.0, 2.0, 1.0])
+        self.assertTrue(all(incumbent.time >= 0 for incumbent in seen))
+
+    def test_maximize(self):
+        seen = []
+        reporter = IncumbentReporter(seen.append, sense=GRB.MAXIMIZE)
+        for objective in [1.0, 3.0, 2.0]:
+            reporter.report(None, objective, 5.0)
+        self.assertEqual([incumbent.objective for incumbent in seen], [1.0, 3.0])
+
+    def test_stop(self):
+        reporter = IncumbentReporter(lambda incumbent: incumbent.objective < 2)
+        self.assertFalse(reporter.report(None, 3.0, 0.0))
+        self.assertTrue(reporter.report(None, 1.0, 0.0))
+        self.assertTrue(reporter.stopped)
+
+    def test_no_subscriber(self):
+        reporter = IncumbentReporter()
+        self.assertFalse(reporter.report(None, 1.0, 0.0))
+        self.assertIsNone(reporter.callback(lambda model, objective, bound: None))
+
+
+class TestIncumbentStream(unittest.TestCase):
+    def test_iterate(self):
+        stream = IncumbentStream(counting_mod, 5)
+        self.assertEqual([incumbent.solution for incumbent in stream], list(range(5)))
+        self.assertEqual(stream.result, 5)
+
+    def test_stop(self):
+        stream = IncumbentStream(waiting_mod)
+        for incumbent in stream:
+            stream.stop()
+        self.assertTrue(stream.result)
+
+    def test_error(self):
+        stream = IncumbentStream(counting_mod, "five")
+        self.assertEqual(list(stream), [])
+        with self.assertRaises(TypeError):
+            stream.result
+
+
+class TestModIncumbents(unittest.TestCase):
+    def test_qubo(self):
+        rng = np.random.default_rng(0)
+        Q = rng.integers(-5, 6, (10, 10))
+        seen = []
+        result = solve_qubo(Q, on_incumbent=seen.append)
+        self.assertGreaterEqual(len(seen), 1)
+        for incumbent in seen:
+            solution = incumbent.solution
+            self.assertEqual(solution @ Q @ solution, incumbent.objective)
+            self.assertLessEqual(incumbent.bound, incumbent.objective)
+        self.assertEqual(seen[-1].objective, result.objective_value)
+
+    def test_qubo_stream(self):
+        Q = np.array([[-1, 2, 2], [0, -1, 2], [0, 0, -1]])
+        stream = IncumbentStream(solve_qubo, Q, presolve=False, verbose=False)
+        objectives = [incumbent.objective for incumbent in stream]
+        self.assertEqual(objectives[-1], -1)
+        self.assertEqual(stream.result.objective_value, -1)
+
+    def test_mwis(self):
+        graph = nx.gnp_random_graph(50, 0.2, seed=0)
+        adjacency = sp.triu(nx.to_scipy_sparse_array(graph))
+        weights = np.random.default_rng(0).integers(1, 100, 50)
+        for reductions in [True, False]:
+            with self.subTest(reductions=reductions):
+                seen = []
+                result = maximum_weighted_independent_set(
+                    adjacency, weights, reductions=reductions, on_incumbent=seen.append
+                )
+                for incumbent in seen:
+                    x = incumbent.solution
+                    self.assertEqual(adjacency[x][:, x].nnz, 0)
+                    self.assertEqual(weights[x].sum(), incumbent.objective)
+                    self.assertGreaterEqual(incumbent.bound, result.f)
+                self.assertEqual(seen[-1].objective, result.f)
+
+    def test_mwis_stop(self):
+        graph = nx.gnp_random_graph(50, 0.2, seed=0)
+        adjacency = sp.triu(nx.to_scipy_sparse_array(graph))
+        weights = np.random.default_rng(0).integers(1, 100, 50)
+        seen = []
+        result = maximum_weighted_independent_set(
+            adjacency,
+            weights,
+            reductions=False,
+            on_incumbent=lambda incumbent: seen.append(incumbent) or True,
+        )
+        self.assertEqual(len(seen), 1)
+        self.assertEqual(result.f, seen[0].objective)
+
+    def test_clique(self):
+        graph = nx.gnp_random_graph(40, 0.3, seed=1)
+        adjacency = sp.triu(nx.to_scipy_sparse_array(graph))
+        weights = np.random.default_rng(1).integers(1, 100, 40)
+        seen = []
+        result = maximum_weighted_clique(adjacency, weights, on_incumbent=seen.append)
+        for incumbent in seen:
+            x = incumbent.solution
+            self.assertEqual(
+                graph.subgraph(x).number_of_edges(), len(x) * (len(x) - 1) // 2
+            )
+            self.assertGreaterEqual(incumbent.bound, result.f)
+        self.assertEqual(seen[-1].objective, result.f)
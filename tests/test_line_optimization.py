@@ -236,6 +236,62 @@ class Testlop(unittest.TestCase):
         self.assertEqual(obj_cost, 21)
         self.assertEqual(final_lines, [("L1", 3)])
 
+    def test_incumbents(self):
+        edge_data = pd.read_csv(io.StringIO(edges))
+        node_data = pd.read_csv(io.StringIO(nodes))
+        linepath_data = pd.read_csv(io.StringIO(linepath))
+        line_data = pd.read_csv(io.StringIO(lines))
+        demand_data = pd.read_csv(io.StringIO(demand))
+        frequencies = [1, 2, 3]
+        for shortest_paths in [False] if nx is None else [False, True]:
+            with self.subTest(shortest_paths=shortest_paths):
+                incumbents = []
+                obj_cost, final_lines = lop.line_optimization(
+                    node_data,
+                    edge_data,
+                    line_data,
+                    linepath_data,
+                    demand_data,
+                    frequencies,
+                    shortest_paths,
+                    on_incumbent=incumbents.append,
+                )
+                self.assertGreaterEqual(len(incumbents), 1)
+                self.assertEqual(incumbents[-1].objective, obj_cost)
+                self.assertEqual(incumbents[-1].solution, final_lines)
+
+    def test_incumbents_stop(self):
+        edge_data = pd.read_csv(io.StringIO(edges))
+        node_data = pd.read_csv(io.StringIO(nodes))
+        linepath_data = pd.read_csv(io.StringIO(linepath))
+        line_data = pd.read_csv(io.StringIO(lines))
+        demand_data = pd.read_csv(io.StringIO(demand))
+        frequencies = [1, 2, 3]
+        data = (node_data, edge_data, line_data, linepath_data, demand_data)
+
+        # Stopping at the first line concept returns it
+        incumbents = []
+        obj_cost, final_lines = lop.line_optimization(
+            *data,
+            frequencies,
+            False,
+            on_incumbent=lambda incumbent: incumbents.append(incumbent) or True,
+        )
+        self.assertEqual(len(incumbents), 1)
+        self.assertEqual(incumbents[0].objective, obj_cost)
+        self.assertEqual(incumbents[0].solution, final_lines)
+
+        # A subscriber which has already stopped ends the solve before the
+        # first line concept is found
+        class Stopped:
+            stopped = True
+
+            def __call__(self, incumbent):
+                return True
+
+        with self.assertRaisesRegex(ValueError, "before the solve stopped"):
+            lop.line_optimization(*data, frequencies, False, on_incumbent=Stopped())
+
     @unittest.skipIf(nx is None, "networkx is not installed")
     def test_shortestPath(self):
         edge_data = pd.read_csv(io.StringIO(edges))
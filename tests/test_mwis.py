@@ -12,6 +12,12 @@ except ImportError:
     nx = None
 
 from gurobi_optimods.mwis import (
+    _greedy_clique_cover,
+    _greedy_independent_set,
+    _heuristic_independent_set,
+    _reconstruct_solution,
+    _reduce_graph,
+    _symmetric_adjacency,
     maximum_weighted_clique,
     maximum_weighted_independent_set,
 )
@@ -60,6 +66,26 @@ def get_graph(num_vertices, density, seed, graph_type, scipy_func=sp.csr_matrix)
         return pd.DataFrame(edges, columns=["node1", "node2"])
 
 
+def get_sparse_graph(num_vertices, num_edges, rng):
+    """Create the upper triangular adjacency matrix for a random sparse graph,
+        from num_edges random vertex pairs (loops and duplicates are dropped).
+
+    Args:
+        num_vertices (int): Number of vertices.
+        num_edges (int): Number of vertex pairs to draw.
+        rng (Generator): Random number generator.
+
+    Returns:
+        graph: The csr_array graph.
+    """
+    rows, cols = rng.integers(0, num_vertices, (2, num_edges))
+    keep = rows < cols
+    return sp.coo_array(
+        (np.ones(keep.sum()), (rows[keep], cols[keep])),
+        shape=(num_vertices, num_vertices),
+    ).tocsr()
+
+
 class TestMWISScipySparse(unittest.TestCase):
     def test_random_graph(self):
         for density in [np.random.random() for _ in range(5)]:
@@ -265,6 +291,19 @@ class TestMISPandas(unittest.TestCase):
         self.assertGreaterEqual(len(mwis.x), 1)
         self.assertLessEqual(mwis.f, weights["weights"].sum())
 
+    def test_labelled_vertices(self):
+        frame = pd.DataFrame({"node1": ["a", "b"], "node2": ["b", "c"]})
+        weights = pd.DataFrame({"weights": [3, 4, 2]}, index=["a", "b", "c"])
+        mwis = maximum_weighted_independent_set(frame, weights)
+        assert_array_equal(mwis.x, np.array([0, 2]))
+        self.assertEqual(mwis.f, 5)
+
+    def test_unknown_vertex(self):
+        frame = pd.DataFrame({"node1": [0, 1], "node2": [1, 5]})
+        weights = pd.DataFrame({"weights": [1, 1, 1]})
+        with self.assertRaises(ValueError):
+            maximum_weighted_independent_set(frame, weights)
+
 
 class TestMWCPandas(unittest.TestCase):
     def test_random_graph(self):
@@ -536,3 +575,218 @@ class TestMWCAll(unittest.TestCase):
                             graph_nx = get_graph(num_vertices, density, seed, "Graph")
                             mwc_nx = maximum_weighted_clique(graph_nx, weights)
                             self.assertEqual(mwc_nx.f, mwc_sp.f)
+
+
+class TestMWISCliqueFormulation(unittest.TestCase):
+    def test_known_graph(self):
+        rows = [0, 0, 0, 1, 1, 2, 2, 3, 4, 4, 5, 6]
+        cols = [1, 3, 4, 3, 5, 3, 6, 7, 5, 7, 6, 7]
+        graph = sp.csr_matrix((np.ones(12), (rows, cols)), shape=(8, 8))
+        weights = np.array([2**i for i in range(8)])
+        mwis = maximum_weighted_independent_set(graph, weights, formulation="clique")
+        assert_array_equal(mwis.x, np.array([0, 2, 5, 7]))
+        self.assertEqual(mwis.f, 165)
+
+    def test_unknown_formulation(self):
+        graph = get_graph(10, 0.5, 0, "spmatrix")
+        weights = np.random.randint(1, 100, size=10)
+        with self.assertRaises(ValueError):
+            maximum_weighted_independent_set(graph, weights, formulation="star")
+
+    def test_clique_cover(self):
+        for density in [0.1, 0.5, 0.9, 1.0]:
+            with self.subTest(density=density):
+                graph = get_graph(30, density, 0, "spmatrix").tocoo()
+                adjacency = _symmetric_adjacency(30, graph.row, graph.col)
+                cliques = _greedy_clique_cover(adjacency)
+                covered = set()
+                for clique in cliques:
+                    for i, j in combinations(sorted(clique), 2):
+                        # Every clique must be a clique of the graph
+                        self.assertTrue(adjacency[i, j])
+                        covered.add((i, j))
+                self.assertEqual(covered, set(zip(graph.row, graph.col)))
+                self.assertLessEqual(len(cliques), graph.nnz)
+
+    def test_complete_graph(self):
+        graph = get_graph(15, 1, 0, "spmatrix")
+        weights = np.random.randint(1, 100, size=15)
+        mwis = maximum_weighted_independent_set(graph, weights, formulation="clique")
+        self.assertEqual(len(mwis.x), 1)
+        self.assertEqual(mwis.f, weights.max())
+
+    def test_all_approaches(self):
+        for density in [0.2, 0.5, 0.8]:
+            for seed in range(3):
+                with self.subTest(density=density, seed=seed):
+                    num_vertices = 20
+                    weights = np.random.randint(1, 100, size=num_vertices)
+                    graph_sp = get_graph(num_vertices, density, seed, "spmatrix")
+                    graph_pd = get_graph(num_vertices, density, seed, "DataFrame")
+                    weights_pd = pd.DataFrame(weights, columns=["weights"])
+
+                    expected = maximum_weighted_independent_set(graph_sp, weights)
+                    mwis_sp = maximum_weighted_independent_set(
+                        graph_sp, weights, formulation="clique"
+                    )
+                    mwis_pd = maximum_weighted_independent_set(
+                        graph_pd, weights_pd, formulation="clique"
+                    )
+                    self.assertEqual(mwis_sp.f, expected.f)
+                    self.assertEqual(mwis_pd.f, expected.f)
+
+                    if nx is not None:
+                        graph_nx = get_graph(num_vertices, density, seed, "Graph")
+                        mwis_nx = maximum_weighted_independent_set(
+                            graph_nx, weights, formulation="clique"
+                        )
+                        self.assertEqual(mwis_nx.f, expected.f)
+
+
+class TestMWCDecomposition(unittest.TestCase):
+    def assertIsClique(self, graph, clique):
+        adjacency = (graph + graph.T).tocsr()
+        for i, j in combinations(clique, 2):
+            self.assertTrue(adjacency[i, j])
+
+    def test_sparse_large_graph(self):
+        # The complement of this graph has ~50M edges; it must never be built
+        rng = np.random.default_rng(0)
+        num_vertices = 10000
+        graph = get_sparse_graph(num_vertices, 30000, rng)
+        weights = rng.integers(1, 100, size=num_vertices)
+        mwc = maximum_weighted_clique(graph, weights, verbose=False)
+        self.assertIsClique(graph, mwc.x)
+        self.assertGreaterEqual(mwc.f, weights.max())
+
+    @unittest.skipIf(nx is None, "networkx is not installed")
+    def test_compare_networkx(self):
+        for num_vertices, density in [(40, 0.3), (50, 0.5), (30, 0.9)]:
+            for seed in range(3):
+                with self.subTest(num_vertices=num_vertices, seed=seed):
+                    graph = get_graph(num_vertices, density, seed, "Graph")
+                    weights = np.random.randint(1, 100, size=num_vertices)
+                    nx.set_node_attributes(
+                        graph, dict(enumerate(weights.tolist())), "weight"
+                    )
+                    _, expected = nx.max_weight_clique(graph, weight="weight")
+                    graph_sp = get_graph(num_vertices, density, seed, "spmatrix")
+                    mwc = maximum_weighted_clique(graph_sp, weights)
+                    self.assertIsClique(graph_sp, mwc.x)
+                    self.assertEqual(mwc.f, expected)
+
+
+class TestMWISReductions(unittest.TestCase):
+    def test_known_graph_fully_reduced(self):
+        rows = [0, 0, 0, 1, 1, 2, 2, 3, 4, 4, 5, 6]
+        cols = [1, 3, 4, 3, 5, 3, 6, 7, 5, 7, 6, 7]
+        weights = np.array([2**i for i in range(8)])
+        adjacency = _symmetric_adjacency(8, rows, cols)
+        kernel, _, _, decisions = _reduce_graph(adjacency, weights)
+        self.assertEqual(len(kernel), 0)
+        assert_array_equal(
+            _reconstruct_solution(np.array([], dtype=int), decisions),
+            np.array([0, 2, 5, 7]),
+        )
+
+    def test_fold(self):
+        # 5-cycle with unit weights: vertex 0 is folded with its neighbours
+        adjacency = _symmetric_adjacency(5, [0, 1, 2, 3, 0], [1, 2, 3, 4, 4])
+        kernel, _, _, decisions = _reduce_graph(adjacency, np.ones(5))
+        self.assertEqual(decisions[0], ("fold", 0, (1, 4)))
+        self.assertEqual(len(kernel), 0)
+        mwis = _reconstruct_solution(kernel, decisions)
+        self.assertEqual(len(mwis), 2)
+        self.assertEqual(adjacency[mwis][:, mwis].nnz, 0)
+
+    def test_sparse_random_graphs(self):
+        rng = np.random.default_rng(0)
+        for trial in range(50):
+            with self.subTest(trial=trial):
+                num_vertices = rng.integers(5, 50)
+                num_edges = rng.integers(0, 2 * num_vertices)
+                graph = get_sparse_graph(num_vertices, num_edges, rng)
+                weights = rng.integers(1, 10, size=num_vertices)
+                mwis = maximum_weighted_independent_set(graph, weights)
+                expected = maximum_weighted_independent_set(
+                    graph, weights, reductions=False
+                )
+                self.assertEqual(mwis.f, expected.f)
+                adjacency = (graph + graph.T).toarray()
+                self.assertEqual(adjacency[np.ix_(mwis.x, mwis.x)].sum(), 0)
+
+    def test_workers(self):
+        num_vertices, density = 10, 0.5
+        blocks = [
+            get_graph(num_vertices, density, seed, "spmatrix") for seed in range(4)
+        ]
+        graph = sp.block_diag(blocks, format="csr")
+        weights = np.random.randint(1, 100, size=graph.shape[0])
+        expected = maximum_weighted_independent_set(graph, weights, reductions=False)
+        mwis = maximum_weighted_independent_set(graph, weights, workers=3)
+        self.assertEqual(mwis.f, expected.f)
+
+
+class TestMWISHeuristic(unittest.TestCase):
+    def random_graph(self, rng, num_vertices):
+        num_edges = rng.integers(num_vertices, 5 * num_vertices)
+        return get_sparse_graph(num_vertices, num_edges, rng)
+
+    def test_heuristic_solution(self):
+        rng = np.random.default_rng(0)
+        for trial in range(20):
+            with self.subTest(trial=trial):
+                graph = self.random_graph(rng, 100)
+                weights = rng.integers(1, 100, size=100).astype(float)
+                adjacency = _symmetric_adjacency(
+                    100, graph.tocoo().row, graph.tocoo().col
+                )
+                greedy = np.flatnonzero(_greedy_independent_set(adjacency, weights))
+                improved = _heuristic_independent_set(adjacency, weights)
+                for independent_set in [greedy, improved]:
+                    self.assertEqual(
+                        adjacency[independent_set][:, independent_set].nnz, 0
+                    )
+                self.assertGreaterEqual(weights[improved].sum(), weights[greedy].sum())
+                # Nothing can be inserted into a locally optimal solution
+                free = np.ones(100, dtype=bool)
+                free[improved] = False
+                free[adjacency[improved].indices] = False
+                self.assertFalse(free.any())
+
+    def test_optimal_result(self):
+        graph = self.random_graph(np.random.default_rng(1), 50)
+        weights = np.random.randint(1, 100, size=50)
+        mwis = maximum_weighted_independent_set(graph, weights)
+        self.assertEqual(mwis.bound, mwis.f)
+        self.assertEqual(mwis.gap, 0.0)
+
+    def test_anytime(self):
+        # Without any time to solve, the heuristic solution is returned
+        rng = np.random.default_rng(2)
+        graph = self.random_graph(rng, 200)
+        weights = rng.integers(1, 100, size=200)
+        for time_limit in [0.0, 0.2]:
+            with self.subTest(time_limit=time_limit):
+                mwis = maximum_weighted_independent_set(
+                    graph, weights, reductions=False, time_limit=time_limit
+                )
+                adjacency = (graph + graph.T).tocsr()
+                self.assertEqual(adjacency[mwis.x][:, mwis.x].nnz, 0)
+                self.assertGreater(mwis.f, 0)
+                self.assertGreaterEqual(mwis.bound, mwis.f)
+                self.assertGreaterEqual(mwis.gap, 0.0)
+
+    def test_anytime_clique(self):
+        rng = np.random.default_rng(3)
+        graph = self.random_graph(rng, 200)
+        weights = rng.integers(1, 100, size=200)
+        mwc = maximum_weighted_clique(graph, weights, time_limit=0.0)
+        adjacency = (graph + graph.T).tocsr()
+        self.assertEqual(mwc.f, weights[mwc.x].sum())
+        for i, j in combinations(mwc.x, 2):
+            self.assertTrue(adjacency[i, j])
+        self.assertGreaterEqual(mwc.bound, mwc.f)
+        exact = maximum_weighted_clique(graph, weights)
+        self.assertEqual(exact.gap, 0.0)
+        self.assertLessEqual(exact.f, mwc.bound)
@@ -61,6 +61,12 @@ class TestMVPBasic(unittest.TestCase):
                 mu, cov_matrix=cov_matrix, cov_factors=(L, K, e)
             )
 
+        with self.assertRaises(TypeError):
+            mvp = MeanVariancePortfolio(mu, cov_matrix=cov_matrix, returns=data)
+
+        with self.assertRaises(ValueError):
+            mvp = MeanVariancePortfolio(mu, returns=mu.to_numpy())
+
     def test_init_2(self):
         # cov_factors must always be a triple
         data = load_portfolio()
@@ -289,7 +295,28 @@ class TestMVPFeatures(unittest.TestCase):
         self.assertGreaterEqual(x[x < 0].sum(), -0.1 - 1e-6)
         self.assertLess(x[x < 0].sum(), -1e-3)
         self.assertAlmostEqual(x.sum(), 1.0)
-        self.assertAlmostEqual(np.abs(x).sum(), 1.0 + 2 * 0.1)
+        self.assertAlmostEqual(np.abs(x).sum(), 1.0 + 2 * 0.1, places=6)
+
+    def test_continuous(self):
+        data = load_portfolio()
+        cov_matrix = data.cov()
+        mu = data.mean()
+        gamma = 100.0
+
+        mvp = MeanVariancePortfolio(mu, cov_matrix)
+
+        # Without fees, costs or trading limits, no binaries are needed
+        with redirect_stdout(io.StringIO()) as console:
+            x = mvp.efficient_portfolio(gamma, max_total_short=0.1).x
+        self.assertNotIn("binary", console.getvalue())
+
+        # A non-binding limit switches to the MIQP, with the same result
+        with redirect_stdout(io.StringIO()) as console:
+            x_other = mvp.efficient_portfolio(
+                gamma, max_total_short=0.1, max_positions=mu.shape[0]
+            ).x
+        self.assertIn("binary", console.getvalue())
+        assert_allclose(x.to_numpy(), x_other.to_numpy(), atol=1e-5)
 
     def test_min_short_0(self):
         data = load_portfolio()
@@ -305,7 +332,7 @@ class TestMVPFeatures(unittest.TestCase):
 
         # Adding a min_short constraint doesn't change a thing
         x_other = mvp.efficient_portfolio(gamma, min_short=0.01).x
-        assert_allclose(x.to_numpy(), x_other.to_numpy())
+        assert_allclose(x.to_numpy(), x_other.to_numpy(), atol=1e-5)
 
     def test_min_short_1(self):
         data = load_portfolio()
@@ -710,7 +737,7 @@ class TestMVPFeatures(unittest.TestCase):
         x_factors = mvp_factors.efficient_portfolio(gamma).x
         x_Sigma = mvp_Sigma.efficient_portfolio(gamma).x
 
-        assert_allclose(x_factors, x_Sigma, atol=1e-6)
+        assert_allclose(x_factors, x_Sigma, atol=1e-5)
 
     def test_risk_factors_auxdata_0(self):
         data = load_portfolio()
@@ -770,6 +797,92 @@ class TestMVPFeatures(unittest.TestCase):
         self.assertAlmostEqual(pf.ret, mu @ pf.x)
         self.assertAlmostEqual(pf.risk, cov_matrix @ pf.x @ pf.x)
 
+    def test_returns_equivalent(self):
+        # Fewer periods than needed for a meaningful covariance matrix
+        data = load_portfolio().iloc[:8]
+        returns = data - data.mean()
+        cov_matrix = data.cov(ddof=0)
+        mu = data.mean()
+        gamma = 100.0
+
+        mvp_returns = MeanVariancePortfolio(mu, returns=returns)
+        mvp_Sigma = MeanVariancePortfolio(mu, cov_matrix)
+
+        pf = mvp_returns.efficient_portfolio(gamma)
+        x_Sigma = mvp_Sigma.efficient_portfolio(gamma).x
+
+        self.assertTrue(pf.x.index.equals(mu.index))
+        assert_allclose(pf.x, x_Sigma, atol=1e-5)
+        self.assertAlmostEqual(pf.ret, mu @ pf.x)
+        self.assertAlmostEqual(pf.risk, cov_matrix.to_numpy() @ pf.x @ pf.x)
+
+        x_returns = mvp_returns.efficient_portfolio(gamma, max_positions=3).x
+        x_Sigma = mvp_Sigma.efficient_portfolio(gamma, max_positions=3).x
+        assert_allclose(x_returns, x_Sigma, atol=1e-5)
+
+    def test_risk_model_auto(self):
+        # Covariance from three periods has rank two
+        data = load_portfolio().iloc[:3]
+        cov_matrix = data.cov()
+        mu = data.mean()
+        gamma = 100.0
+
+        mvp_auto = MeanVariancePortfolio(mu, cov_matrix, risk_model="auto")
+        mvp_Sigma = MeanVariancePortfolio(mu, cov_matrix)
+
+        with redirect_stdout(io.StringIO()) as console:
+            pf = mvp_auto.efficient_portfolio(gamma)
+        self.assertIn("Model has 2 quadratic objective terms", console.getvalue())
+        x_Sigma = mvp_Sigma.efficient_portfolio(gamma).x
+
+        assert_allclose(pf.x, x_Sigma, atol=1e-5)
+        self.assertAlmostEqual(pf.risk, cov_matrix.to_numpy() @ pf.x @ pf.x)
+
+        # A full rank covariance matrix is kept as it is
+        data = load_portfolio()
+        mvp_auto = MeanVariancePortfolio(data.mean(), data.cov(), risk_model="auto")
+        with redirect_stdout(io.StringIO()) as console:
+            mvp_auto.efficient_portfolio(gamma)
+        self.assertIn("Model has 55 quadratic objective terms", console.getvalue())
+
+    def test_risk_model_rank(self):
+        data = load_portfolio()
+        cov_matrix = data.cov()
+        mu = data.mean()
+        gamma = 100.0
+
+        # All factors reproduce the covariance matrix
+        mvp_factors = MeanVariancePortfolio(mu, cov_matrix, risk_model=mu.size)
+        mvp_Sigma = MeanVariancePortfolio(mu, cov_matrix)
+        x_factors = mvp_factors.efficient_portfolio(gamma).x
+        x_Sigma = mvp_Sigma.efficient_portfolio(gamma).x
+        assert_allclose(x_factors, x_Sigma, atol=1e-5)
+
+        # Fewer factors approximate it, keeping the variances
+        mvp_factors = MeanVariancePortfolio(mu, cov_matrix, risk_model=2)
+        pf = mvp_factors.efficient_portfolio(gamma)
+        self.assertAlmostEqual(pf.x.sum(), 1.0)
+
+        with self.assertRaises(ValueError):
+            MeanVariancePortfolio(mu, cov_matrix, risk_model="sparse")
+        with self.assertRaises(ValueError):
+            MeanVariancePortfolio(mu, cov_matrix, risk_model=mu.size + 1)
+        with self.assertRaises(TypeError):
+            MeanVariancePortfolio(mu, returns=data, risk_model="auto")
+
+    def test_risk_model_cache(self):
+        data = load_portfolio().iloc[:3]
+        cov_matrix = data.cov()
+        mu = data.mean()
+
+        # The factorization is reused for the same matrix
+        mvp_1 = MeanVariancePortfolio(mu, cov_matrix, risk_model="auto")
+        mvp_2 = MeanVariancePortfolio(mu, cov_matrix.copy(), risk_model="auto")
+        self.assertIs(mvp_1._covariance, mvp_2._covariance)
+
+        mvp_3 = MeanVariancePortfolio(mu, 2 * cov_matrix, risk_model="auto")
+        self.assertIsNot(mvp_1._covariance, mvp_3._covariance)
+
     def test_costs_per_asset_long(self):
         data = load_portfolio()
         cov_matrix = data.cov()
@@ -938,3 +1051,252 @@ class TestMVPFeatures(unittest.TestCase):
 
         self.assertGreater(pf.x_rf, 0.1)
         self.assertAlmostEqual(pf.ret, mu @ pf.x + 0.0025 * pf.x_rf)
+
+
+class TestEfficientFrontier(unittest.TestCase):
+    def setUp(self):
+        data = load_portfolio()
+        self.mvp = MeanVariancePortfolio(data.mean(), data.cov())
+        self.gammas = [10.0, 0.0, 1.0, 100.0]
+
+    def test_frontier(self):
+        frontier = self.mvp.efficient_frontier(self.gammas, verbose=False)
+        self.assertEqual(list(frontier.index), sorted(self.gammas))
+        self.assertEqual(list(frontier.columns[-2:]), ["risk", "return"])
+        for gamma in self.gammas:
+            pf = self.mvp.efficient_portfolio(gamma, verbose=False)
+            assert_allclose(frontier.loc[gamma, pf.x.index], pf.x, atol=1e-4)
+            self.assertAlmostEqual(frontier.loc[gamma, "risk"], pf.risk)
+            self.assertAlmostEqual(frontier.loc[gamma, "return"], pf.ret)
+        # Risk and return decrease with increasing risk aversion
+        self.assertTrue(frontier["risk"].is_monotonic_decreasing)
+        self.assertTrue(frontier["return"].is_monotonic_decreasing)
+
+    def test_frontier_features(self):
+        features = dict(max_positions=2, fees_buy=0.001, rf_return=0.0005)
+        frontier = self.mvp.efficient_frontier(self.gammas, verbose=False, **features)
+        self.assertEqual(frontier.columns[-1], "x_rf")
+        for gamma in self.gammas:
+            pf = self.mvp.efficient_portfolio(gamma, verbose=False, **features)
+            self.assertAlmostEqual(frontier.loc[gamma, "return"], pf.ret, places=6)
+            self.assertAlmostEqual(frontier.loc[gamma, "x_rf"], pf.x_rf, places=4)
+
+    def test_frontier_infeasible(self):
+        frontier = self.mvp.efficient_frontier(
+            [1.0],
+            max_positions=1,
+            min_long=0.5,
+            initial_holdings=np.full(10, 0.1),
+            max_trades=1,
+            verbose=False,
+        )
+        self.assertTrue(frontier.isna().all(axis=None))
+
+    def test_frontier_invalid(self):
+        with self.assertRaises(ValueError):
+            self.mvp.efficient_frontier([-1.0, 1.0], verbose=False)
+        with self.assertRaises(TypeError):
+            self.mvp.efficient_frontier([1.0], max_assets=2, verbose=False)
+
+
+class TestRebalancingSession(unittest.TestCase):
+    def setUp(self):
+        data = load_portfolio()
+        self.mu = data.mean()
+        self.cov_matrix = data.cov()
+        self.mvp = MeanVariancePortfolio(self.mu, self.cov_matrix)
+        self.gamma = 100.0
+
+    def assertSamePortfolio(self, pf, features, mu=None):
+        # Compare to a portfolio computed from scratch, by objective value
+        # since the MIP may have several optimal solutions
+        mu = self.mu if mu is None else mu
+        mvp = MeanVariancePortfolio(mu, self.cov_matrix)
+        expected = mvp.efficient_portfolio(self.gamma, **features)
+        self.assertAlmostEqual(
+            pf.ret - 0.5 * self.gamma * pf.risk,
+            expected.ret - 0.5 * self.gamma * expected.risk,
+            places=4,
+        )
+        self.assertAlmostEqual(pf.x.sum() + (pf.x_rf or 0.0), 1.0, places=2)
+
+    def test_rebalance(self):
+        x0 = np.full(self.mu.size, 0.1)
+        features = dict(
+            max_trades=4,
+            fees_buy=0.001,
+            costs_sell=0.002,
+            min_long=0.02,
+            max_total_short=0.1,
+            initial_holdings=x0,
+            rf_return=0.001,
+        )
+        updates = [
+            dict(),
+            dict(mu=1.1 * self.mu),
+            dict(initial_holdings=0.9 * x0, fees_buy=np.linspace(0, 0.002, 10)),
+            dict(max_trades=2, min_long=0.05, costs_sell=0.0),
+            dict(max_total_short=0.3, rf_return=0.002),
+        ]
+
+        mu = self.mu
+        with self.mvp.rebalancing_session(self.gamma, **features) as session:
+            for update in updates:
+                pf = session.rebalance(**update)
+                mu = update.pop("mu", mu)
+                features.update(update)
+                self.assertSamePortfolio(pf, features, mu)
+                self.assertTrue(pf.x.index.equals(self.mu.index))
+                trades = np.abs(pf.x.to_numpy() - features["initial_holdings"])
+                self.assertLessEqual((trades > 1e-6).sum(), features["max_trades"])
+
+        # The portfolio model is unchanged
+        pf = self.mvp.efficient_portfolio(self.gamma)
+        self.assertAlmostEqual(pf.ret, self.mu @ pf.x)
+
+    def test_rebalance_continuous(self):
+        x0 = np.full(self.mu.size, 0.1)
+        features = dict(max_total_short=0.1, initial_holdings=x0)
+        with self.mvp.rebalancing_session(self.gamma, **features) as session:
+            pf = session.rebalance()
+            self.assertSamePortfolio(pf, features)
+
+            mu = 0.9 * self.mu + 0.0005
+            pf = session.rebalance(mu=mu, max_total_short=0.2)
+            features["max_total_short"] = 0.2
+            self.assertSamePortfolio(pf, features, mu)
+
+            with self.assertRaises(ValueError):
+                session.rebalance(fees_buy=0.01)
+
+    def test_rebalance_covariance(self):
+        features = dict(max_positions=5, min_long=0.05)
+        cov_matrix = 1.2 * self.cov_matrix
+        with self.mvp.rebalancing_session(self.gamma, **features) as session:
+            pf = session.rebalance(cov_matrix=cov_matrix)
+            expected = MeanVariancePortfolio(self.mu, cov_matrix).efficient_portfolio(
+                self.gamma, **features
+            )
+            self.assertAlmostEqual(pf.risk, expected.risk, places=6)
+            self.assertAlmostEqual(pf.ret, expected.ret, places=6)
+
+            with self.assertRaises(ValueError):
+                session.rebalance(cov_matrix=cov_matrix.iloc[:5, :5])
+
+    def test_rebalance_chained(self):
+        # Each portfolio is rebalanced again, although its sum may slightly
+        # exceed 1 due to the solver tolerances
+        data = load_portfolio()
+        x0 = np.zeros(self.mu.size)
+        for end in range(30, len(data.index) + 1, 5):
+            window = data.iloc[end - 30 : end]
+            mvp = MeanVariancePortfolio(window.mean(), window.cov())
+            with mvp.rebalancing_session(10.0, initial_holdings=x0) as session:
+                pf = session.rebalance()
+                again = session.rebalance(initial_holdings=pf.x)
+                self.assertAlmostEqual(again.ret, pf.ret, places=5)
+            mvp.efficient_portfolio(10.0, initial_holdings=pf.x)
+            mvp.efficient_portfolio(10.0, initial_holdings=np.vstack([pf.x, x0]))
+
+    def test_invalid(self):
+        session = self.mvp.rebalancing_session(self.gamma, max_trades=3)
+        with self.assertRaises(ValueError):
+            session.rebalance(fees_sell=0.01)
+        with self.assertRaises(ValueError):
+            session.rebalance(rf_return=0.01)
+        with self.assertRaises(ValueError):
+            session.rebalance(initial_holdings=np.full(self.mu.size, 0.2))
+        with self.assertRaises(ValueError):
+            session.rebalance(mu=self.mu.to_numpy()[:5])
+        session.close()
+        with self.assertRaises(ValueError):
+            session.rebalance()
+
+        with self.mvp.rebalancing_session(self.gamma) as session:
+            with self.assertRaises(ValueError):
+                session.rebalance(max_total_short=0.1)
+
+
+class TestAccounts(unittest.TestCase):
+    def setUp(self):
+        data = load_portfolio()
+        self.mu = data.mean()
+        self.mvp = MeanVariancePortfolio(self.mu, data.cov())
+        self.gamma = 100.0
+        rng = np.random.default_rng(0)
+        self.holdings = pd.DataFrame(
+            0.98 * rng.dirichlet(np.ones(self.mu.size), size=6),
+            index=[f"account{i}" for i in range(6)],
+            columns=self.mu.index,
+        )
+
+    def test_accounts(self):
+        max_trades = np.array([1, 2, 3, 1, 2, 3])
+        fees_buy = np.linspace(0.0, 0.002, 60).reshape(6, 10)
+        features = dict(costs_sell=0.001, max_total_short=0.1)
+        portfolios = self.mvp.efficient_portfolio(
+            self.gamma,
+            initial_holdings=self.holdings,
+            max_trades=max_trades,
+            fees_buy=fees_buy,
+            **features,
+        )
+
+        self.assertTrue(portfolios.index.equals(self.holdings.index))
+        self.assertEqual(
+            list(portfolios.columns), list(self.mu.index) + ["risk", "return"]
+        )
+        for i, account in enumerate(self.holdings.index):
+            pf = self.mvp.efficient_portfolio(
+                self.gamma,
+                initial_holdings=self.holdings.loc[account],
+                max_trades=max_trades[i],
+                fees_buy=fees_buy[i],
+                **features,
+            )
+            row = portfolios.loc[account]
+            self.assertAlmostEqual(
+                row["return"] - 0.5 * self.gamma * row["risk"],
+                pf.ret - 0.5 * self.gamma * pf.risk,
+                places=4,
+            )
+            trades = np.abs(row[self.mu.index] - self.holdings.loc[account])
+            self.assertLessEqual((trades > 1e-6).sum(), max_trades[i])
+
+    def test_accounts_workers(self):
+        holdings = self.holdings.to_numpy()
+        serial = self.mvp.efficient_portfolio(
+            self.gamma, initial_holdings=holdings, max_total_short=[0.0, 0.2] * 3
+        )
+        parallel = self.mvp.efficient_portfolio(
+            self.gamma,
+            initial_holdings=holdings,
+            max_total_short=[0.0, 0.2] * 3,
+            workers=2,
+        )
+        self.assertEqual(serial.index.name, "account")
+        assert_allclose(serial, parallel, atol=1e-6)
+        self.assertTrue((serial.iloc[::2][self.mu.index] >= -1e-6).all(axis=None))
+
+    def test_accounts_infeasible(self):
+        # Without trades, the second account cannot be fully invested
+        portfolios = self.mvp.efficient_portfolio(
+            self.gamma,
+            initial_holdings=self.holdings,
+            max_trades=[10, 0, 10, 10, 10, 10],
+            verbose=False,
+        )
+        self.assertTrue(portfolios.iloc[1].isna().all())
+        self.assertFalse(portfolios.drop(index="account1").isna().any(axis=None))
+
+    def test_accounts_invalid(self):
+        with self.assertRaises(ValueError):
+            self.mvp.efficient_portfolio(
+                self.gamma, initial_holdings=self.holdings, max_trades=[1, 2]
+            )
+        with self.assertRaises(ValueError):
+            self.mvp.efficient_portfolio(self.gamma, initial_holdings=2 * self.holdings)
+        with self.assertRaises(ValueError):
+            self.mvp.efficient_portfolio(
+                self.gamma, initial_holdings=self.holdings.iloc[:, :5]
+            )
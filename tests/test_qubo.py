@@ -1,10 +1,24 @@
+import io
+import itertools
+import pathlib
+import tempfile
+import time
 import unittest
+from contextlib import redirect_stdout
 
 import numpy as np
 import scipy.sparse as sp
 from numpy.testing import assert_array_equal
 
-from gurobi_optimods.qubo import solve_qubo
+from gurobi_optimods.datasets import load_ising, load_qubo
+from gurobi_optimods.qubo import (
+    QuboSolver,
+    _canonicalize,
+    _connected_components,
+    _persistency_presolve,
+    solve_qubo,
+)
+from gurobi_optimods.utils import global_mod_logger
 
 
 class TestQubo(unittest.TestCase):
@@ -56,6 +70,103 @@ class TestQubo(unittest.TestCase):
         self.assertEqual(result.objective_value, -2)
         assert_array_equal(result.solution, np.array([1, 0, 1]))
 
+    def test_dict(self):
+        Q = {(0, 1): -1, (0, 2): -2, (1, 2): 3}
+        result = solve_qubo(Q)
+        self.assertEqual(result.objective_value, -2)
+        assert_array_equal(result.solution, np.array([1, 0, 1]))
+
+    def test_canonical_form(self):
+        Q = np.array([[1, -2, 0], [4, -3, 0], [0, 1, 2]])
+        linear, quadratic = _canonicalize(Q)
+        assert_array_equal(linear, np.array([1, -3, 2]))
+        assert_array_equal(
+            quadratic.toarray(), np.array([[0, 2, 0], [0, 0, 1], [0, 0, 0]])
+        )
+        # Dense, sparse and dict inputs have the same canonical form
+        for other in [
+            sp.coo_array(Q),
+            sp.csr_matrix(Q.T),
+            {(int(i), int(j)): Q[i, j] for i, j in zip(*np.nonzero(Q))},
+        ]:
+            other_linear, other_quadratic = _canonicalize(other)
+            assert_array_equal(other_linear, linear)
+            assert_array_equal(other_quadratic.toarray(), quadratic.toarray())
+
+    def test_presolve(self):
+        # x0 is fixed to 1, which allows fixing x2 to 0, then x1 to 1 and x3 to 0
+        Q = np.array([[-3, 1, 1, 0], [0, -2, 4, 0], [0, 0, 1, -2], [0, 0, 0, 1]])
+        linear, quadratic = _canonicalize(Q)
+        free, values, reduced_linear = _persistency_presolve(linear, quadratic)
+        self.assertFalse(free.any())
+        assert_array_equal(values, np.array([1, 1, 0, 0]))
+        self.assertEqual(reduced_linear.shape, (0,))
+
+    def test_presolve_frustrated(self):
+        # No variable can be fixed in a frustrated triangle
+        Q = np.array([[-1, 2, 2], [0, -1, 2], [0, 0, -1]])
+        linear, quadratic = _canonicalize(Q)
+        free, _, reduced_linear = _persistency_presolve(linear, quadratic)
+        self.assertTrue(free.all())
+        assert_array_equal(reduced_linear, linear)
+        result = solve_qubo(Q)
+        self.assertEqual(result.objective_value, -1)
+
+    def test_presolve_optimal(self):
+        rng = np.random.default_rng(0)
+        for _ in range(10):
+            Q = rng.integers(-5, 6, (8, 8)) * (rng.random((8, 8)) < 0.4)
+            result = solve_qubo(Q, verbose=False)
+            reference = solve_qubo(Q, presolve=False, verbose=False)
+            self.assertEqual(result.objective_value, reference.objective_value)
+            self.assertEqual(
+                result.solution @ Q @ result.solution, result.objective_value
+            )
+
+    def test_heuristic(self):
+        rng = np.random.default_rng(0)
+        for _ in range(10):
+            Q = rng.integers(-5, 6, (8, 8)) * (rng.random((8, 8)) < 0.5)
+            result = solve_qubo(Q, method="heuristic", verbose=False)
+            reference = solve_qubo(Q, presolve=False, verbose=False)
+            self.assertEqual(result.objective_value, reference.objective_value)
+
+    def test_heuristic_time_limit(self):
+        Q = sp.random(1000, 1000, 0.01, random_state=0)
+        Q = sp.coo_matrix((Q.data - 0.5, (Q.row, Q.col)))
+        result = solve_qubo(Q, method="heuristic", time_limit=0.5)
+        self.assertLess(result.objective_value, 0.0)
+        self.assertAlmostEqual(
+            result.solution @ Q @ result.solution, result.objective_value
+        )
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            solve_qubo(np.eye(2), method="annealing")
+
+    def test_connected_components(self):
+        Q = sp.coo_array(([1, 1, 1], ([0, 1, 3], [4, 3, 5])), shape=(6, 6))
+        linear, quadratic = _canonicalize(Q)
+        components, isolated = _connected_components(quadratic)
+        self.assertEqual([c.tolist() for c in components], [[1, 3, 5], [0, 4]])
+        assert_array_equal(isolated, [False, False, True, False, False, False])
+
+    def test_components(self):
+        # Blocks which are too large to be enumerated
+        rng = np.random.default_rng(0)
+        blocks = [rng.integers(-5, 6, (14, 14)) for _ in range(3)]
+        Q = sp.block_diag(blocks + [np.array([[-1]])])
+        expected = sum(
+            solve_qubo(block, verbose=False).objective_value for block in blocks
+        )
+        for workers in [1, 2]:
+            with self.subTest(workers=workers):
+                result = solve_qubo(Q, workers=workers, presolve=False)
+                self.assertEqual(result.objective_value, expected - 1)
+                self.assertEqual(
+                    result.solution @ Q @ result.solution, result.objective_value
+                )
+
     def test_large_matrix_time_limit(self):
         # Should get a solution quickly, but take forever without a time limit.
         # Largest model size solvable by the trial license.
@@ -64,3 +175,130 @@ class TestQubo(unittest.TestCase):
         result = solve_qubo(Q, time_limit=0.5)
         self.assertLess(result.objective_value, 0.0)
         self.assertEqual(result.solution.shape, (200,))
+
+
+class TestQuboSolver(unittest.TestCase):
+    def test_instances(self):
+        rng = np.random.default_rng(0)
+        pattern = sp.random(30, 30, 0.2, random_state=0, format="coo")
+        with QuboSolver(pattern, verbose=False) as solver:
+            for _ in range(3):
+                data = rng.integers(-5, 6, size=pattern.nnz)
+                Q = sp.coo_array((data, (pattern.row, pattern.col)), shape=(30, 30))
+                result = solver.solve(Q)
+                expected = solve_qubo(Q, verbose=False)
+                self.assertEqual(result.objective_value, expected.objective_value)
+                self.assertEqual(
+                    result.solution @ Q @ result.solution, result.objective_value
+                )
+
+    def test_linear_sweep(self):
+        # Only the diagonal changes between instances
+        rng = np.random.default_rng(1)
+        Q = rng.integers(-5, 6, size=(20, 20))
+        with QuboSolver(Q, verbose=False) as solver:
+            for shift in [-4, 0, 4]:
+                Q_shift = Q + shift * np.eye(20, dtype=int)
+                result = solver.solve(Q_shift)
+                expected = solve_qubo(Q_shift, verbose=False)
+                self.assertEqual(result.objective_value, expected.objective_value)
+                self.assertEqual(
+                    result.solution @ Q_shift @ result.solution,
+                    result.objective_value,
+                )
+
+    def test_time_limit(self):
+        # The time limit covers the local search and the MIP solve
+        Q = np.random.default_rng(0).integers(-5, 6, size=(200, 200))
+        with QuboSolver(Q, verbose=False, time_limit=1.0) as solver:
+            for _ in range(2):
+                start_time = time.monotonic()
+                solver.solve(Q)
+                self.assertLess(time.monotonic() - start_time, 1.05)
+            self.assertEqual(solver._model.Params.TimeLimit, 1.0)
+
+    def test_logging(self):
+        # Each solver logs only its own solves, once
+        Q = np.array([[1, -2, 0], [0, 1, 0], [0, 0, -1]])
+        with redirect_stdout(io.StringIO()) as buffer_stdout, QuboSolver(
+            Q
+        ) as first, QuboSolver(Q) as second:
+            first.solve(Q)
+            second.solve(Q)
+        self.assertEqual(buffer_stdout.getvalue().count("Local search found"), 2)
+        self.assertEqual(global_mod_logger.handlers, [])
+
+    def test_pattern(self):
+        Q = np.array([[1, -2, 0], [0, 1, 0], [0, 0, -1]])
+        with QuboSolver(Q, verbose=False) as solver:
+            # Entries may change sign and become zero, or move to the lower
+            # triangle
+            result = solver.solve(np.array([[-1, 0, 0], [3, -1, 0], [0, 0, 0]]))
+            self.assertEqual(result.objective_value, -1)
+            with self.assertRaises(ValueError):
+                solver.solve(np.array([[1, 0, -2], [0, 1, 0], [0, 0, -1]]))
+            with self.assertRaises(ValueError):
+                solver.solve(np.eye(4))
+
+
+class TestLoaders(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.tmpdir.name)
+        self.Q = sp.random(20, 20, 0.2, random_state=0, format="coo")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_triplets(self, filename, header=""):
+        path = self.path / filename
+        with open(path, "w") as f:
+            f.write(header)
+            for i, j, q in zip(self.Q.row, self.Q.col, self.Q.data):
+                f.write(f"{i} {j} {float(q)!r}\n")
+        return path
+
+    def test_coo(self):
+        path = self.write_triplets("instance.txt", header="# comment\n")
+        assert_array_equal(load_qubo(path).toarray(), self.Q.toarray())
+
+    def test_qbsolv(self):
+        path = self.write_triplets(
+            "instance.qubo", header=f"c comment\np qubo 0 25 0 {self.Q.nnz}\n"
+        )
+        Q = load_qubo(path)
+        self.assertEqual(Q.shape, (25, 25))
+        assert_array_equal(Q.toarray()[:20, :20], self.Q.toarray())
+
+    def test_npz(self):
+        sp.save_npz(self.path / "coo.npz", self.Q, compressed=False)
+        sp.save_npz(self.path / "csr.npz", self.Q.tocsr())
+        np.savez(
+            self.path / "arrays.npz", row=self.Q.row, col=self.Q.col, data=self.Q.data
+        )
+        for filename in ["coo.npz", "csr.npz", "arrays.npz"]:
+            with self.subTest(filename=filename):
+                Q = load_qubo(self.path / filename)
+                assert_array_equal(Q.toarray(), self.Q.toarray())
+
+    def test_unknown_format(self):
+        path = self.write_triplets("instance.txt")
+        with self.assertRaises(ValueError):
+            load_qubo(path, format="mtx")
+
+    def test_ising(self):
+        rng = np.random.default_rng(0)
+        h = rng.normal(size=6)
+        J = np.triu(rng.normal(size=(6, 6)), 1)
+        rows, cols = np.nonzero(J)
+        with open(self.path / "ising.txt", "w") as f:
+            for i in range(6):
+                f.write(f"{i} {i} {float(h[i])!r}\n")
+            for i, j in zip(rows, cols):
+                f.write(f"{i} {j} {float(J[i, j])!r}\n")
+        Q, offset = load_ising(self.path / "ising.txt")
+        Q = Q.toarray()
+        for x in itertools.product([0, 1], repeat=6):
+            x = np.array(x)
+            s = 2 * x - 1
+            self.assertAlmostEqual(x @ Q @ x + offset, h @ s + s @ J @ s)
@@ -1,9 +1,14 @@
+import pathlib
+import tempfile
 import unittest
 
+import gurobipy as gp
 import numpy as np
+import pandas as pd
+import scipy.sparse as sp
 from numpy.testing import assert_allclose
 
-from gurobi_optimods.regression import LADRegression
+from gurobi_optimods.regression import LADRegression, QuantileRegression, RegressionBase
 
 
 class TestLADRegression(unittest.TestCase):
@@ -32,3 +37,205 @@ class TestLADRegression(unittest.TestCase):
         # Check predictions are the right shape
         y_pred = reg.predict(np.random.random((30, 5)))
         self.assertEqual(y_pred.shape, (30,))
+
+    def test_sparse(self):
+        # Sparse feature data gives the same fit as dense data
+        rng = np.random.default_rng(0)
+        X_train = sp.random(200, 8, density=0.3, random_state=0, format="csr")
+        y_train = X_train @ np.arange(8.0) + rng.normal(size=200)
+        dense = LADRegression()
+        dense.fit(X_train.toarray(), y_train)
+        sparse = LADRegression()
+        sparse.fit(X_train, y_train)
+        assert_allclose(sparse.coef_, dense.coef_)
+        assert_allclose(sparse.intercept_, dense.intercept_)
+
+        X_test = sp.random(20, 8, density=0.3, random_state=1, format="csr")
+        assert_allclose(sparse.predict(X_test), dense.predict(X_test.toarray()))
+
+    def test_memmap(self):
+        rng = np.random.default_rng(0)
+        X_train = rng.random((100, 5))
+        y_train = X_train @ np.arange(5.0) + 1.0
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = pathlib.Path(tmpdir) / "X_train.npy"
+            np.save(path, X_train)
+            X_mmap = np.load(path, mmap_mode="r")
+            reg = LADRegression()
+            reg.fit(X_mmap, y_train)
+            del X_mmap
+        assert_allclose(reg.coef_, np.arange(5.0), atol=1e-6)
+        assert_allclose(reg.intercept_, 1.0, atol=1e-6)
+
+    def test_formulations(self):
+        # Both formulations reach the same total absolute error
+        rng = np.random.default_rng(0)
+        X_train = rng.random((150, 4))
+        y_train = X_train @ np.arange(4.0) + rng.laplace(size=150)
+        errors = []
+        for formulation in ["primal", "dual"]:
+            reg = LADRegression()
+            reg.fit(X_train, y_train, formulation=formulation)
+            errors.append(np.abs(reg.predict(X_train) - y_train).sum())
+        assert_allclose(errors[0], errors[1])
+
+    def test_unknown_formulation(self):
+        with self.assertRaises(ValueError):
+            LADRegression().fit(np.ones((2, 1)), np.ones(2), formulation="simplex")
+
+
+class TestQuantileRegression(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X_train = rng.random((200, 3))
+        self.y_train = np.column_stack(
+            [
+                self.X_train @ np.arange(3.0) + rng.normal(size=200),
+                self.X_train @ np.ones(3) + rng.exponential(size=200),
+            ]
+        )
+
+    def test_median(self):
+        # The median regression is the LAD regression
+        lad = LADRegression()
+        lad.fit(self.X_train, self.y_train[:, 0])
+        reg = QuantileRegression()
+        reg.fit(self.X_train, self.y_train[:, 0])
+        assert_allclose(reg.coef_, lad.coef_)
+        assert_allclose(reg.intercept_, lad.intercept_)
+
+    def test_quantiles_and_targets(self):
+        quantiles = [0.1, 0.5, 0.9]
+        reg = QuantileRegression(quantiles)
+        reg.fit(self.X_train, self.y_train)
+        self.assertEqual(reg.coef_.shape, (3, 2, 3))
+        self.assertEqual(reg.intercept_.shape, (3, 2))
+        y_pred = reg.predict(self.X_train)
+        self.assertEqual(y_pred.shape, (200, 3, 2))
+
+        for i, quantile in enumerate(quantiles):
+            for j in range(2):
+                with self.subTest(quantile=quantile, target=j):
+                    # Same fit as for a single quantile and target
+                    single = QuantileRegression(quantile)
+                    single.fit(self.X_train, self.y_train[:, j], formulation="primal")
+                    assert_allclose(reg.coef_[i, j], single.coef_, atol=1e-8)
+                    assert_allclose(
+                        single.predict(self.X_train), y_pred[:, i, j], atol=1e-8
+                    )
+                    # About the right fraction of points lies below the fit
+                    below = np.mean(self.y_train[:, j] <= y_pred[:, i, j] + 1e-8)
+                    self.assertAlmostEqual(below, quantile, delta=0.05)
+
+    def test_invalid_quantile(self):
+        with self.assertRaises(ValueError):
+            QuantileRegression([0.5, 1.0]).fit(self.X_train, self.y_train)
+
+
+class TestFitMany(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X_train = rng.random((120, 4))
+        self.y_train = self.X_train @ np.arange(4.0) + rng.normal(size=120)
+        self.subsets = [np.arange(60), np.arange(60, 120), rng.integers(0, 120, 120)]
+
+    def test_fit_many(self):
+        reg = LADRegression()
+        result = reg.fit_many(self.X_train, self.y_train, self.subsets)
+        self.assertEqual(result.coef.shape, (3, 4))
+        self.assertEqual(result.intercept.shape, (3,))
+        self.assertEqual(result.time.shape, (3,))
+        self.assertIsNone(result.test_error)
+        self.assertIsNone(reg.coef_)
+        for rows, coef in zip(self.subsets, result.coef):
+            single = LADRegression()
+            single.fit(self.X_train[rows], self.y_train[rows])
+            assert_allclose(coef, single.coef_)
+
+    def test_workers(self):
+        reg = LADRegression()
+        serial = reg.fit_many(self.X_train, self.y_train, self.subsets)
+        for X_train in [self.X_train, sp.csr_array(self.X_train)]:
+            with self.subTest(sparse=sp.issparse(X_train)):
+                parallel = reg.fit_many(X_train, self.y_train, self.subsets, workers=2)
+                assert_allclose(parallel.coef, serial.coef)
+                assert_allclose(parallel.intercept, serial.intercept)
+
+    def test_cross_val_fit(self):
+        reg = QuantileRegression([0.25, 0.75])
+        result = reg.cross_val_fit(
+            self.X_train, self.y_train, n_splits=3, shuffle=True, seed=0
+        )
+        self.assertEqual(result.coef.shape, (3, 2, 4))
+        self.assertEqual(result.test_error.shape, (3, 2))
+        self.assertTrue(np.all(result.test_error > 0))
+
+    def test_dataframe(self):
+        X_train = pd.DataFrame(self.X_train, columns=list("abcd"))
+        y_train = pd.Series(self.y_train)
+        expected = LADRegression().cross_val_fit(self.X_train, self.y_train, 3)
+        for workers in [1, 2]:
+            with self.subTest(workers=workers):
+                result = LADRegression().cross_val_fit(
+                    X_train, y_train, 3, workers=workers
+                )
+                assert_allclose(result.coef, expected.coef)
+                assert_allclose(result.test_error, expected.test_error)
+
+    def test_abstract(self):
+        # Subclasses must implement _fit to be instantiated
+        class Unfitted(RegressionBase):
+            pass
+
+        with self.assertRaises(TypeError):
+            Unfitted()
+
+
+class TestPartialFit(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X_train = rng.random((400, 4))
+        self.y_train = self.X_train @ np.arange(4.0) + rng.laplace(size=400)
+
+    def batches(self):
+        for start in range(0, 400, 100):
+            yield self.X_train[start : start + 100], self.y_train[start : start + 100]
+
+    def test_all_records(self):
+        reg = LADRegression()
+        for X_batch, y_batch in self.batches():
+            reg.partial_fit(sp.csr_array(X_batch), y_batch)
+        full = LADRegression()
+        full.fit(self.X_train, self.y_train, formulation="primal")
+        assert_allclose(reg.coef_, full.coef_, atol=1e-8)
+        assert_allclose(reg.intercept_, full.intercept_, atol=1e-8)
+
+    def test_window(self):
+        reg = LADRegression()
+        for X_batch, y_batch in self.batches():
+            reg.partial_fit(X_batch, y_batch, window=250)
+        full = LADRegression()
+        full.fit(self.X_train[150:], self.y_train[150:], formulation="primal")
+        assert_allclose(reg.coef_, full.coef_, atol=1e-8)
+        assert_allclose(reg.intercept_, full.intercept_, atol=1e-8)
+
+    def test_close(self):
+        with LADRegression() as reg:
+            for X_batch, y_batch in self.batches():
+                reg.partial_fit(X_batch, y_batch)
+            model = reg._stream.model
+        self.assertIsNone(reg._stream)
+        with self.assertRaises(gp.GurobiError):
+            model.NumVars
+        # The fit is kept, and later batches start a new LP
+        self.assertEqual(reg.predict(self.X_train[:5]).shape, (5,))
+        reg.partial_fit(self.X_train[:100], self.y_train[:100])
+        self.assertEqual(reg._stream.records, 100)
+        reg.close()
+        reg.close()
+
+    def test_features(self):
+        reg = LADRegression()
+        reg.partial_fit(self.X_train[:100], self.y_train[:100])
+        with self.assertRaises(ValueError):
+            reg.partial_fit(self.X_train[100:200, :3], self.y_train[100:200])
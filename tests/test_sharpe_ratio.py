@@ -98,6 +98,76 @@ class TestSharpeRatio(unittest.TestCase):
         self.assertAlmostEqual(pf.x.sum(), 1, delta=1e-6)
         self.assertAlmostEqual(pf.sharpe_ratio, pf.ret / math.sqrt(pf.risk), delta=1e-6)
 
+    def test_returns_inputs(self):
+        data = load_sharpe_ratio()
+        returns = data.returns.iloc[:40]
+        cov_matrix = returns.T @ returns / len(returns.index)
+
+        pf = max_sharpe_ratio(mu=data.mu, returns=returns)
+        pf_Sigma = max_sharpe_ratio(cov_matrix, data.mu)
+        self.assertIsInstance(pf.x, pd.Series)
+        self.assertTrue(data.mu.index.identical(pf.x.index))
+        self.assertAlmostEqual(pf.x.sum(), 1, delta=1e-6)
+        self.assertAlmostEqual(pf.sharpe_ratio, pf_Sigma.sharpe_ratio, delta=1e-6)
+        self.assertAlmostEqual(pf.risk, pf_Sigma.risk, delta=1e-6)
+        self.assertAlmostEqual(pf.sharpe_ratio, pf.ret / math.sqrt(pf.risk), delta=1e-6)
+
+        pf = max_sharpe_ratio(mu=data.mu.to_numpy(), returns=returns.to_numpy())
+        self.assertIsInstance(pf.x, np.ndarray)
+        self.assertAlmostEqual(pf.sharpe_ratio, pf_Sigma.sharpe_ratio, delta=1e-6)
+
+        with self.assertRaises(TypeError):
+            max_sharpe_ratio(cov_matrix, data.mu, returns=returns)
+
+        with self.assertRaises(ValueError):
+            max_sharpe_ratio(mu=data.mu, returns=data.mu.to_numpy())
+
+    def test_risk_model(self):
+        data = load_sharpe_ratio()
+        pf_Sigma = max_sharpe_ratio(data.cov_matrix, data.mu)
+
+        pf = max_sharpe_ratio(data.cov_matrix, data.mu, risk_model=data.mu.size)
+        self.assertIsInstance(pf.x, pd.Series)
+        self.assertAlmostEqual(pf.sharpe_ratio, pf_Sigma.sharpe_ratio, delta=1e-6)
+        self.assertAlmostEqual(pf.risk, pf_Sigma.risk, delta=1e-6)
+
+        # Full rank, so the dense matrix is kept
+        pf = max_sharpe_ratio(data.cov_matrix, data.mu, risk_model="auto")
+        self.assertAlmostEqual(pf.sharpe_ratio, pf_Sigma.sharpe_ratio, delta=1e-6)
+
+        with self.assertRaises(ValueError):
+            max_sharpe_ratio(data.cov_matrix, data.mu, risk_model="sparse")
+
+        with self.assertRaises(TypeError):
+            max_sharpe_ratio(mu=data.mu, returns=data.returns, risk_model="auto")
+
+    def test_cov_factors(self):
+        rng = np.random.default_rng(2)
+        n, k = 30, 3
+        B = rng.normal(size=(n, k))
+        K = np.diag(rng.uniform(0.5, 1.5, size=k))
+        d = rng.uniform(0.1, 0.5, size=n)
+        mu = rng.uniform(-0.1, 0.3, size=n)
+        cov_matrix = B @ K @ B.T + np.diag(d)
+
+        pf = max_sharpe_ratio(mu=mu, cov_factors=(B, K, d))
+        pf_Sigma = max_sharpe_ratio(cov_matrix, mu)
+        self.assertIsInstance(pf.x, np.ndarray)
+        self.assertAlmostEqual(pf.x.sum(), 1, delta=1e-6)
+        self.assertAlmostEqual(pf.sharpe_ratio, pf_Sigma.sharpe_ratio, delta=1e-6)
+        self.assertAlmostEqual(pf.risk, pf.x @ cov_matrix @ pf.x, delta=1e-6)
+
+        index = [f"A{i}" for i in range(n)]
+        pf = max_sharpe_ratio(mu=pd.Series(mu, index=index), cov_factors=(B, K, d))
+        self.assertIsInstance(pf.x, pd.Series)
+        self.assertEqual(list(pf.x.index), index)
+
+        with self.assertRaises(TypeError):
+            max_sharpe_ratio(cov_matrix, mu, cov_factors=(B, K, d))
+
+        with self.assertRaises(np.linalg.LinAlgError):
+            max_sharpe_ratio(mu=mu, cov_factors=(B, -K, d))
+
     def test_mismatched_indices(self):
         data = load_sharpe_ratio()
 
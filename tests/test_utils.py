@@ -15,7 +15,7 @@ from pathlib import Path
 import gurobipy as gp
 from gurobipy import GRB
 
-from gurobi_optimods.utils import optimod
+from gurobi_optimods.utils import global_mod_logger, grb_logger, optimod
 
 
 class TestOptimodDecorator(unittest.TestCase):
@@ -129,6 +129,50 @@ class TestOptimodDecorator(unittest.TestCase):
         self.assertEqual(buffer_stderr.getvalue(), "")
 
 
+class TestOptimodGenerator(unittest.TestCase):
+    def setUp(self):
+        @optimod()
+        def mod(count, *, create_env):
+            with create_env() as env, gp.Model(env=env) as model:
+                for i in range(count):
+                    model.optimize()
+                    yield i
+
+        self.mod = mod
+
+    def test_logfile(self):
+        # The log file captures the solves made while iterating
+
+        with tempfile.TemporaryDirectory() as tempdir, redirect_stdout(
+            io.StringIO()
+        ) as buffer_stdout:
+            logfile = os.path.join(tempdir, "tmp.log")
+            self.assertEqual(list(self.mod(2, logfile=logfile)), [0, 1])
+            logfile_text = Path(logfile).read_text()
+
+        self.assertEqual(buffer_stdout.getvalue().count("Gurobi Optimizer"), 2)
+        self.assertEqual(logfile_text.count("Gurobi Optimizer"), 2)
+
+    def test_close(self):
+        # Handlers are removed when the iteration is stopped early
+
+        with tempfile.TemporaryDirectory() as tempdir, redirect_stdout(io.StringIO()):
+            logfile = os.path.join(tempdir, "tmp.log")
+            results = self.mod(3, logfile=logfile)
+            self.assertEqual(next(results), 0)
+            self.assertEqual(len(grb_logger.handlers), 1)
+            results.close()
+
+        self.assertEqual(grb_logger.handlers, [])
+        self.assertEqual(global_mod_logger.handlers, [])
+
+    def test_time_limit(self):
+        with redirect_stdout(io.StringIO()) as buffer_stdout:
+            list(self.mod(1, time_limit=10))
+
+        self.assertIn("Set parameter TimeLimit to value 10", buffer_stdout.getvalue())
+
+
 class TestOverrideParams(unittest.TestCase):
     def test_mod_override_outputflag(self):
         # The mod can pass custom parameters which override those created
@@ -123,6 +123,65 @@ class TestWorkforceScheduling(unittest.TestCase):
             expected,
         )
 
+    def test_incumbents(self):
+        availability = read_csv(
+            """
+            Worker,Shift,Preference
+            Alice,2022-07-02,1.0
+            Alice,2022-07-03,2.0
+            Bob,2022-07-02,2.0
+            Bob,2022-07-03,1.0
+            """
+        )
+        shift_requirements = read_csv(
+            """
+            Shift,Required
+            2022-07-02,1
+            2022-07-03,1
+            """
+        )
+        worker_limits = read_csv(
+            """
+            Worker,MinShifts,MaxShifts
+            Bob,0,2
+            Alice,0,2
+            """
+        )
+
+        incumbents = []
+        assignments = solve_workforce_scheduling(
+            availability=availability,
+            shift_requirements=shift_requirements,
+            worker_limits=worker_limits,
+            preferences="Preference",
+            on_incumbent=incumbents.append,
+        )
+
+        self.assertGreaterEqual(len(incumbents), 1)
+        for incumbent in incumbents:
+            self.assertIsInstance(incumbent.solution, pd.DataFrame)
+            self.assertEqual(
+                incumbent.solution["Preference"].sum(), incumbent.objective
+            )
+        assert_frame_equal(incumbents[-1].solution, assignments)
+
+        # A subscriber which has already stopped ends the solve before the
+        # first schedule is found
+        class Stopped:
+            stopped = True
+
+            def __call__(self, incumbent):
+                return True
+
+        with self.assertRaisesRegex(ValueError, "before the solve stopped"):
+            solve_workforce_scheduling(
+                availability=availability,
+                shift_requirements=shift_requirements,
+                worker_limits=worker_limits,
+                preferences="Preference",
+                on_incumbent=Stopped(),
+            )
+
     def test_no_preferences(self):
         # Choose a feasible assignment, no preferences provided
         availability = read_csv(